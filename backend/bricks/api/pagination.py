@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+from ..constants import HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
+
+
+class HistoryPagination(CursorPagination):
+    """Pages through history chronologically with opaque `cursor`s, so pages
+    stay consistent as new history is logged and deep pages are as quick as
+    the first. `limit` sets the page size."""
+    ordering = ('timestamp', 'id')
+    page_size = HISTORY_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = HISTORY_MAX_PAGE_SIZE
@@ -3,8 +3,19 @@ from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
+from datetime import timedelta
+
+from .pagination import HistoryPagination
 from .serializers import BrickSerializer, BrickHistorySerializer, StatusSerializer
+from ..history import export_csv, export_ndjson, filter_history, parse_timestamp
+from ..index import bits_to_hex, bits_to_ids, status_index
+from ..operations import apply_status_operations, parse_status_operations
+from ..rollups import reliability as wall_reliability
+from ..snapshots import state_at
 from ..models import Brick, BrickHistory, Status
 from ..constants import *
 
@@ -16,7 +27,7 @@ class StatusViewSet(ModelViewSet):
 
 # View set for Brick model
 class BrickViewSet(ModelViewSet):
-    queryset = Brick.objects.all()
+    queryset = Brick.objects.prefetch_related('statuses')
     serializer_class = BrickSerializer
 
     def create(self, request, *args, **kwargs):
@@ -40,45 +51,94 @@ class BrickViewSet(ModelViewSet):
                 raise ValidationError({"status_id": "status_id is required."})
             if not action_type:
                 raise ValidationError({"action_type": "action_type is required."})
-            try:
-                status_obj = Status.objects.get(id=status_id)
-            except Status.DoesNotExist:
-                raise ValidationError({"status_id": f"Status with id {status_id} does not exist."})
-            
-            # Flag to detect if history logging needed
-            valid_change = False
-
-            # Handle add status
-            if action_type == ACTION_TYPE_ADD:
-                # Only add if not already added
-                if status_obj not in brick.statuses.all():
-                    brick.statuses.add(status_obj)
-                    valid_change = True
-            # Handle remove status
-            elif action_type == ACTION_TYPE_REMOVE:
-                if status_obj in brick.statuses.all():
-                    brick.statuses.remove(status_obj)
-                    valid_change = True
-            # Raise error for other status action types
-            else: raise ValidationError({"action_type": f"Invalid action_type \" {action_type}\". Please use {ACTION_TYPE_ADD} or {ACTION_TYPE_REMOVE}\'"})
-
-            # Save the brick and brick history if needed 
-            if valid_change:
-                brick.save()
-                BrickHistory.objects.create(
-                    brick=brick, 
-                    status=status_obj, 
-                    action_type=action_type
-                )
-
-            # Return updated data with serializer
-            serializer = BrickSerializer(brick)
+            if action_type not in (ACTION_TYPE_ADD, ACTION_TYPE_REMOVE):
+                raise ValidationError({"action_type": f"Invalid action_type \" {action_type}\". Please use {ACTION_TYPE_ADD} or {ACTION_TYPE_REMOVE}\'"})
+
+            # Only logged if the brick's statuses actually change
+            apply_status_operations([(brick.id, int(status_id), action_type)])
+
+            # Return updated data with serializer, re-read as the prefetched
+            #   statuses are from before the change
+            serializer = BrickSerializer(Brick.objects.prefetch_related('statuses').get(pk=brick.pk))
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Exception as e:
             # TODO - Validation error cleaning needed here
             raise ValidationError({'detail': f"Brick status modification failed: {str(e)}"})    
         
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """Adds and removes statuses of many bricks at once, from a list of
+        `operations` ({brick_id, status_id, action_type}) applied in order as
+        one. Returns the `changes` that took effect, as history items."""
+        operations = parse_status_operations(request.data.get('operations'))
+        history = apply_status_operations(operations)
+        serializer = BrickHistorySerializer(history, many=True)
+        return Response({'changes': serializer.data}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='by-status')
+    def by_status(self, request):
+        """Returns the bricks with each status from the in-memory status index,
+        as lists of ids, or with `as=bits` as bitsets in hex (bit n-1 set for
+        brick n). Given any of `all`, `any` or `none` (comma separated status 
+        ids), returns just the `bricks` with all of the first, at least one of
+        the second and none of the third instead."""
+        as_bits = request.query_params.get('as', 'ids')
+        if as_bits not in ('ids', 'bits'): raise ValidationError({'detail': "as must be ids or bits."})
+        encode = bits_to_hex if as_bits == 'bits' else bits_to_ids
+
+        try:
+            sets = {name: [int(n) for n in request.query_params.get(name, '').split(',') if n.strip()]
+                    for name in ('all', 'any', 'none')}
+        except ValueError:
+            raise ValidationError({'detail': "Statuses must be comma separated ids."})
+
+        index = status_index()
+        if any(sets.values()):
+            bits = index.query(with_all=sets['all'], with_any=sets['any'], without=sets['none'])
+            return Response({'num_bricks': NUM_BRICKS, 'bricks': encode(bits)})
+        statuses = index.statuses()
+        return Response({'num_bricks': NUM_BRICKS,
+                         'statuses': {status_id: encode(bits) for status_id, bits in sorted(statuses.items())}})
+
+    @action(detail=False, methods=['get'], url_path='state')
+    def state(self, request):
+        """Returns the bricks with each status as they were at the time `at` (an
+        ISO 8601 timestamp), rebuilt from history: as lists of ids, or with
+        `as=bits` as bitsets in hex (see `by_status`). Also returns the time of
+        the `checkpoint` snapshot it was rebuilt from (null if none) and the
+        number of history items `replayed` on top of it."""
+        at = parse_timestamp(request.query_params.get('at'), 'at')
+        as_bits = request.query_params.get('as', 'ids')
+        if as_bits not in ('ids', 'bits'): raise ValidationError({'detail': "as must be ids or bits."})
+        encode = bits_to_hex if as_bits == 'bits' else bits_to_ids
+
+        statuses, snapshot, replayed = state_at(at)
+        known = Status.objects.values_list('id', flat=True)
+        return Response({
+            'at': at, 'checkpoint': snapshot.timestamp if snapshot else None, 'replayed': replayed,
+            'num_bricks': NUM_BRICKS,
+            'statuses': {status_id: encode(statuses.get(status_id, 0)) for status_id in sorted(known)},
+        })
+
+    @action(detail=False, methods=['get'], url_path='reliability')
+    def reliability(self, request):
+        """Returns the reliability of every brick and of the whole wall over the
+        days `from` to `to` (YYYY-MM-DD, defaulting to the RELIABILITY_DAYS up
+        to today) from the daily rollups: the seconds spent with each status
+        and with any, the number of faults and the mean time between failures
+        in seconds (see `bricks.rollups.reliability`)."""
+        params = request.query_params
+        try:
+            last = parse_date(params['to']) if params.get('to') else timezone.localdate()
+            first = parse_date(params['from']) if params.get('from') \
+                else last and last - timedelta(days=RELIABILITY_DAYS - 1)
+        except ValueError:
+            first = last = None
+        if first is None or last is None: raise ValidationError({'detail': "from and to must be dates (YYYY-MM-DD)."})
+        if first > last: raise ValidationError({'detail': "from must not be after to."})
+        return Response(wall_reliability(first, last), status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['get'], url_path='statuses')
     def statuses(self, request, pk=None):
         try:
@@ -90,17 +150,50 @@ class BrickViewSet(ModelViewSet):
         except Exception as e:
             raise ValidationError({'detail': f"Status retrieval failed: {str(e)}"})
 
+    def paginated_history(self, request, history):
+        """Returns a page of `history`, filtered by the request's query 
+        parameters (see `bricks.history.filter_history`)."""
+        paginator = HistoryPagination()
+        page = paginator.paginate_queryset(filter_history(history, request.query_params), request, view=self)
+        serializer = BrickHistorySerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['get'], url_path='history')
     def history(self, request, pk=None):
-        try:
-            brick = self.get_object()
-            # Fetch the history items associated with the brick using ForeignKey
-            brick_history = BrickHistory.objects.filter(brick=brick).order_by('timestamp')  # Retrieve history chronologically
-            serializer = BrickHistorySerializer(brick_history, many=True, context={'request': request})
-            
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Exception as e:
-            raise ValidationError({'detail': f"History retrieval failed: {str(e)}"})
+        """Returns a page of the brick's history, chronologically, with the
+        cursors of the `next` and `previous` pages. Takes the filters of
+        `wall_history`."""
+        brick = self.get_object()
+        return self.paginated_history(request, BrickHistory.objects.filter(brick=brick).select_related('status'))
+
+    @action(detail=False, methods=['get'], url_path='history')
+    def wall_history(self, request):
+        """Returns a page of the history of every brick, chronologically, with
+        the cursors of the `next` and `previous` pages. Can be filtered by 
+        `status` (comma separated ids), `action` (add or remove), and `since`
+        and `until` (ISO 8601 timestamps). `limit` sets the page size."""
+        return self.paginated_history(request, BrickHistory.objects.select_related('status'))
+
+    @action(detail=False, methods=['get'], url_path='history/export')
+    def export_history(self, request):
+        """Streams the history of every brick, chronologically, as newline
+        delimited JSON, or with `as=csv` as CSV, written as it's read from the
+        database. Takes the filters of `wall_history`, plus `brick`."""
+        as_format = request.query_params.get('as', 'ndjson')
+        if as_format not in ('ndjson', 'csv'): raise ValidationError({'detail': "as must be ndjson or csv."})
+        history = filter_history(BrickHistory.objects.all(), request.query_params)
+        if request.query_params.get('brick'):
+            try:
+                history = history.filter(brick_id=int(request.query_params['brick']))
+            except ValueError:
+                raise ValidationError({'detail': "brick must be an id."})
+
+        if as_format == 'csv':
+            response = StreamingHttpResponse(export_csv(history), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(export_ndjson(history), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename=brick_history.{as_format}'
+        return response
 
 """
 TODO: Note - the url_path renaming in the '@action's in this file DO NOT WORK in
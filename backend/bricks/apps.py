@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BricksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bricks'
+
+    def ready(self):
+        # Keep the status index current
+        from . import signals
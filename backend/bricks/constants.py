@@ -11,3 +11,18 @@ ACTION_TYPE_CHOICES = [
 
 # WALL CONTRAINTS
 NUM_BRICKS = int(getenv('NUM_BRICKS', '226'))   # The number of bricks displayed on the melb connect wall
+
+# STATUS INDEX
+STATUS_INDEX_TTL = int(getenv('STATUS_INDEX_TTL', '60'))   # Seconds:  The in-memory status index is rebuilt when older than this
+
+# HISTORY SNAPSHOTS
+SNAPSHOT_INTERVAL = int(getenv('SNAPSHOT_INTERVAL', '1000'))   # History items logged between snapshots of the whole wall
+
+# RELIABILITY ROLLUPS
+RELIABILITY_DAYS = int(getenv('RELIABILITY_DAYS', '30'))             # Days:  Default period of reliability queries, up to today
+ROLLUP_REBUILD_BATCH = int(getenv('ROLLUP_REBUILD_BATCH', '5000'))   # History items replayed at a time when rebuilding rollups
+
+# HISTORY
+HISTORY_PAGE_SIZE = int(getenv('HISTORY_PAGE_SIZE', '100'))           # History items per page, by default
+HISTORY_MAX_PAGE_SIZE = int(getenv('HISTORY_MAX_PAGE_SIZE', '1000'))   # Most history items a page can be asked for
+HISTORY_EXPORT_CHUNK = int(getenv('HISTORY_EXPORT_CHUNK', '2000'))     # History items read from the database at a time when exporting
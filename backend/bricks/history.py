@@ -0,0 +1,68 @@
+# bricks/history.py
+# Filtering and exporting BrickHistory. Exports are written row by row as the
+#   history is read from the database in chunks, so they can be streamed
+#   however much history there is.
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.serializers import ValidationError
+
+import csv
+import json
+from datetime import datetime
+
+from .constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE, HISTORY_EXPORT_CHUNK
+
+EXPORT_FIELDS = ['id', 'brick', 'status_id', 'status', 'action_type', 'timestamp']
+
+def parse_timestamp(value: str, name: str) -> datetime:
+    """Converts an ISO 8601 timestamp from the query parameter `name` to an
+    aware datetime (a '+' in its offset decoded as a space is restored).
+    Raises a ValidationError if it's malformed."""
+    timestamp = parse_datetime((value or '').replace(' ', '+'))
+    if timestamp is None: raise ValidationError({'detail': f"{name} must be an ISO 8601 timestamp."})
+    return timezone.make_aware(timestamp) if timezone.is_naive(timestamp) else timestamp
+
+def filter_history(history: QuerySet, params) -> QuerySet:
+    """Filters `history` by the query `params` given: `status` (comma 
+    separated status ids), `action` (add or remove), and `since` and `until`
+    (ISO 8601 timestamps, inclusive). Raises a ValidationError if any are
+    malformed."""
+    if params.get('status'):
+        try:
+            history = history.filter(status_id__in=[int(n) for n in params['status'].split(',') if n.strip()])
+        except ValueError:
+            raise ValidationError({'detail': "status must be comma separated ids."})
+    if params.get('action'):
+        if params['action'] not in (ACTION_TYPE_ADD, ACTION_TYPE_REMOVE):
+            raise ValidationError({'detail': f"action must be {ACTION_TYPE_ADD} or {ACTION_TYPE_REMOVE}."})
+        history = history.filter(action_type=params['action'])
+    if params.get('since'): history = history.filter(timestamp__gte=parse_timestamp(params['since'], 'since'))
+    if params.get('until'): history = history.filter(timestamp__lte=parse_timestamp(params['until'], 'until'))
+    return history
+
+def export_rows(history: QuerySet, chunk_size: int=HISTORY_EXPORT_CHUNK):
+    """Yields the EXPORT_FIELDS of each item of `history` in chronological
+    order, reading `chunk_size` items from the database at a time."""
+    rows = history.order_by('timestamp', 'id') \
+        .values_list('id', 'brick_id', 'status_id', 'status__name', 'action_type', 'timestamp')
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield [*row[:-1], row[-1].isoformat()]
+
+def export_ndjson(history: QuerySet):
+    """Yields `history` as newline delimited JSON, an object per line."""
+    for row in export_rows(history):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+class Line:
+    """A file-like object the csv module writes single lines to, returning
+    them rather than storing them."""
+    def write(self, line: str) -> str:
+        return line
+
+def export_csv(history: QuerySet):
+    """Yields `history` as CSV, a header then a line per item."""
+    writer = csv.writer(Line())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(history): yield writer.writerow(row)
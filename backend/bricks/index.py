@@ -0,0 +1,110 @@
+# bricks/index.py
+# An in-memory index of which bricks have each status: one NUM_BRICKS-bit int
+#   per status, with bit n-1 set if brick n has it. Built from the brick-status
+#   through table in one query, then kept current by m2m_changed signals (see
+#   `bricks.signals`) and by bulk operations, which bypass them. Each process
+#   has its own index, so it is also rebuilt every STATUS_INDEX_TTL seconds to
+#   pick up changes made by other processes (or rolled back).
+
+from rest_framework.serializers import ValidationError
+
+import threading
+import time
+
+from .constants import NUM_BRICKS, STATUS_INDEX_TTL
+from .models import Status
+
+ALL_BRICKS = (1 << NUM_BRICKS) - 1
+
+def brick_bit(brick_id: int) -> int:
+    """Returns the bit of brick `brick_id` in a bitset."""
+    return 1 << (brick_id - 1)
+
+def bits_to_ids(bits: int) -> list[int]:
+    """Returns the brick ids set in `bits`, in order."""
+    ids = []
+    while bits:
+        low = bits & -bits
+        ids.append(low.bit_length())
+        bits ^= low
+    return ids
+
+def bits_to_hex(bits: int) -> str:
+    """Returns `bits` as a fixed width hex string (JSON numbers can't hold
+    NUM_BRICKS bits)."""
+    return format(bits, f'0{(NUM_BRICKS + 3) // 4}x')
+
+
+class StatusIndex:
+    """Bitsets of the bricks with each status, built on first use."""
+    def __init__(self, ttl: float=STATUS_INDEX_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.bits = None
+        self.built_at = 0.0
+        # Counts changes, so a build that raced with one can tell
+        self.generation = 0
+
+    def build(self) -> dict[int, int]:
+        """Rebuilds the index from the database, in one query (statuses are
+        joined to their bricks, so statuses without any are included). If the
+        index changed while reading, the result may have missed the change, so
+        it's returned but not kept. Returns the bitset of each status id."""
+        with self.lock: generation = self.generation
+        bits = {}
+        for status_id, brick_id in Status.objects.values_list('id', 'bricks__id'):
+            bits[status_id] = bits.get(status_id, 0) | (brick_bit(brick_id) if brick_id else 0)
+        with self.lock:
+            if self.generation == generation: self.bits, self.built_at = bits, time.monotonic()
+        return dict(bits)
+
+    def statuses(self) -> dict[int, int]:
+        """Returns a copy of the bitset of each status id, rebuilding the index
+        first if it hasn't been built or is past its TTL."""
+        with self.lock:
+            if self.bits is not None and time.monotonic() - self.built_at <= self.ttl: return dict(self.bits)
+        return self.build()
+
+    def update(self, added=(), removed=()) -> None:
+        """Records (brick id, status id) pairs `added` and `removed`. Only
+        counts the change if the index hasn't been built (it's read in full
+        when it is)."""
+        with self.lock:
+            self.generation += 1
+            if self.bits is None: return
+            for brick_id, status_id in added:
+                self.bits[status_id] = self.bits.get(status_id, 0) | brick_bit(brick_id)
+            for brick_id, status_id in removed:
+                self.bits[status_id] = self.bits.get(status_id, 0) & ~brick_bit(brick_id)
+
+    def invalidate(self) -> None:
+        """Drops the index, to be rebuilt when next read."""
+        with self.lock:
+            self.generation += 1
+            self.bits = None
+
+    def query(self, with_all=(), with_any=(), without=()) -> int:
+        """Returns the bitset of bricks with all of the status ids `with_all`,
+        at least one of `with_any` and none of `without`. Raises a
+        ValidationError if any status is unknown."""
+        statuses = self.statuses()
+        unknown = (set(with_all) | set(with_any) | set(without)) - set(statuses)
+        if unknown: raise ValidationError({'detail': f"Unknown statuses: {', '.join(map(str, sorted(unknown)))}."})
+
+        bits = ALL_BRICKS
+        for status_id in with_all: bits &= statuses[status_id]
+        if with_any:
+            any_bits = 0
+            for status_id in with_any: any_bits |= statuses[status_id]
+            bits &= any_bits
+        for status_id in without: bits &= ~statuses[status_id]
+        return bits
+
+# Index for this process, created on first use
+_status_index = None
+
+def status_index() -> StatusIndex:
+    """Returns the status index of this process."""
+    global _status_index
+    if _status_index is None: _status_index = StatusIndex()
+    return _status_index
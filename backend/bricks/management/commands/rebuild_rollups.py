@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ...constants import ROLLUP_REBUILD_BATCH
+from ...rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = "Rebuilds the brick reliability rollups from scratch, from the whole of BrickHistory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ROLLUP_REBUILD_BATCH,
+                            help="History items replayed at a time.")
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the rollups from {count} history items."))
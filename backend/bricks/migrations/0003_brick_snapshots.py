@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-18 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bricks', '0002_add_default_statuses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrickSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('last_history_id', models.PositiveBigIntegerField()),
+                ('state', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='brickhistory',
+            index=models.Index(fields=['brick', 'timestamp'], name='bricks_bric_brick_i_89cb99_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bricks', '0003_brick_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrickRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('seconds', models.FloatField(default=0)),
+                ('faults', models.PositiveIntegerField(default=0)),
+                ('brick', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='bricks.brick')),
+                ('status', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bricks.status')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'brick'], name='bricks_bric_day_0bd39e_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__isnull', False)), fields=('brick', 'status', 'day'), name='unique_brick_status_rollup'), models.UniqueConstraint(condition=models.Q(('status__isnull', True)), fields=('brick', 'day'), name='unique_brick_faulty_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BrickStatusSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('brick', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_spans', to='bricks.brick')),
+                ('status', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='bricks.status')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__isnull', False)), fields=('brick', 'status'), name='unique_brick_status_span'), models.UniqueConstraint(condition=models.Q(('status__isnull', True)), fields=('brick',), name='unique_brick_faulty_span')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bricks', '0004_brick_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='brickhistory',
+            index=models.Index(fields=['timestamp', 'id'], name='bricks_bric_timesta_413dfc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brickhistory',
+            index=models.Index(fields=['status', 'timestamp'], name='bricks_bric_status__7aee71_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brickhistory',
+            index=models.Index(fields=['action_type', 'timestamp'], name='bricks_bric_action__dbb939_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bricks', '0005_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bricksnapshot',
+            name='last_history_id',
+            field=models.PositiveBigIntegerField(unique=True),
+        ),
+    ]
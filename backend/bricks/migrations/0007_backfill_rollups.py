@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.utils import timezone
+
+# Fills in the rollups added by 0004 for history logged before they existed, as
+#   `manage.py rebuild_rollups` does. Statuses bricks have without any history
+#   to replay are then given open spans from now, so they count from here on.
+def backfill_rollups(apps, schema_editor):
+    BrickHistory = apps.get_model('bricks', 'BrickHistory')
+    Brick = apps.get_model('bricks', 'Brick')
+    BrickStatusSpan = apps.get_model('bricks', 'BrickStatusSpan')
+
+    if BrickHistory.objects.exists():
+        # Replayed with the app's own code, as the rollups are kept by it
+        from bricks.rollups import rebuild_rollups
+        rebuild_rollups()
+
+    now = timezone.now()
+    open_spans = set(BrickStatusSpan.objects.values_list('brick_id', 'status_id'))
+    spans = []
+    for brick_id, status_id in Brick.statuses.through.objects.values_list('brick_id', 'status_id'):
+        for key in ((brick_id, status_id), (brick_id, None)):
+            if key in open_spans: continue
+            open_spans.add(key)
+            spans.append(BrickStatusSpan(brick_id=key[0], status_id=key[1], started_at=now))
+    BrickStatusSpan.objects.bulk_create(spans)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('bricks', '0006_unique_snapshots'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -26,5 +26,70 @@ class BrickHistory(models.Model):
     action_type = models.CharField(max_length=10, choices=ACTION_TYPE_CHOICES)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['brick', 'timestamp']),
+            models.Index(fields=['timestamp', 'id']),
+            models.Index(fields=['status', 'timestamp']),
+            models.Index(fields=['action_type', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.brick} - {self.status} - {self.action_type} on {self.timestamp}"
+
+
+class BrickSnapshot(models.Model):
+    """The statuses of every brick as of a history item, so past states of the 
+    wall can be rebuilt from the nearest snapshot (see `bricks.snapshots`)."""
+    # Time of the last history item included
+    timestamp = models.DateTimeField(db_index=True)
+    # Last history item included (every item up to it is), one snapshot each
+    last_history_id = models.PositiveBigIntegerField(unique=True)
+    # Bitset of the bricks with each status id, in hex (see `bricks.index`)
+    state = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Snapshot at {self.timestamp}"
+
+class BrickRollup(models.Model):
+    """Reliability totals of a brick for a day, per status, or for any status
+    (i.e. being faulty) when `status` is null, kept up to date as history is
+    logged (see `bricks.rollups`)."""
+    brick = models.ForeignKey('Brick', related_name='rollups', on_delete=models.CASCADE)
+    status = models.ForeignKey('Status', null=True, blank=True, on_delete=models.CASCADE)
+    day = models.DateField()
+    # Seconds of the day the brick spent with the status, in spans since ended
+    seconds = models.FloatField(default=0)
+    # Times the brick took on the status that day
+    faults = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['brick', 'status', 'day'], condition=models.Q(status__isnull=False),
+                                    name='unique_brick_status_rollup'),
+            models.UniqueConstraint(fields=['brick', 'day'], condition=models.Q(status__isnull=True),
+                                    name='unique_brick_faulty_rollup'),
+        ]
+        indexes = [models.Index(fields=['day', 'brick'])]
+
+    def __str__(self):
+        return f"{self.brick} - {self.status or 'Any status'} on {self.day}"
+
+
+class BrickStatusSpan(models.Model):
+    """A status a brick currently has (or, when `status` is null, that it has
+    any status), since when. Its time is added to the rollups when it ends."""
+    brick = models.ForeignKey('Brick', related_name='status_spans', on_delete=models.CASCADE)
+    status = models.ForeignKey('Status', null=True, blank=True, on_delete=models.CASCADE)
+    started_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['brick', 'status'], condition=models.Q(status__isnull=False),
+                                    name='unique_brick_status_span'),
+            models.UniqueConstraint(fields=['brick'], condition=models.Q(status__isnull=True),
+                                    name='unique_brick_faulty_span'),
+        ]
+
     def __str__(self):
-        return f"{self.brick} - {self.status} - {self.action_type} on {self.timestamp}"
\ No newline at end of file
+        return f"{self.brick} - {self.status or 'Any status'} since {self.started_at}"
@@ -0,0 +1,75 @@
+# bricks/operations.py
+# Adding and removing statuses of many bricks at once. Operations are reduced
+#   to the effective changes with set arithmetic against the brick-status
+#   through table, then applied (with their history) in one transaction, in a
+#   constant number of queries however many bricks they touch.
+
+from django.db import transaction
+from rest_framework.serializers import ValidationError
+
+from .constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE
+from .index import status_index
+from .models import Brick, BrickHistory, Status
+from .rollups import record_history
+from .snapshots import maybe_snapshot
+
+BrickStatus = Brick.statuses.through
+
+def parse_status_operations(data) -> list[tuple[int, int, str]]:
+    """Converts a list of {brick_id, status_id, action_type} operations from a
+    request to (brick id, status id, action type) tuples. Raises a
+    ValidationError if any are malformed."""
+    if not isinstance(data, list): raise ValidationError({'operations': "A list of operations is required."})
+    operations = []
+    for operation in data:
+        try:
+            brick_id, status_id = int(operation['brick_id']), int(operation['status_id'])
+            action_type = operation['action_type']
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError({'operations': f"Invalid operation {operation!r}, expected brick_id, status_id and action_type."})
+        if action_type not in (ACTION_TYPE_ADD, ACTION_TYPE_REMOVE):
+            raise ValidationError({'action_type': f"Invalid action_type \"{action_type}\". Please use {ACTION_TYPE_ADD} or {ACTION_TYPE_REMOVE}."})
+        operations.append((brick_id, status_id, action_type))
+    return operations
+
+def apply_status_operations(operations: list[tuple[int, int, str]]) -> list[BrickHistory]:
+    """Applies (brick id, status id, action type) `operations` in order, as
+    one. Only operations that end up changing a brick take effect: adding a
+    status a brick already has, or adding then removing one, changes nothing.
+    Logs a history item per change, and adds it to the reliability rollups.
+    Raises a ValidationError, changing
+    nothing, if any brick or status doesn't exist. Returns the history items
+    logged."""
+    if not operations: return []
+    brick_ids = {brick_id for brick_id, _, _ in operations}
+    status_ids = {status_id for _, status_id, _ in operations}
+
+    missing = brick_ids - set(Brick.objects.filter(id__in=brick_ids).values_list('id', flat=True))
+    if missing: raise ValidationError({'brick_id': f"Bricks do not exist: {', '.join(map(str, sorted(missing)))}."})
+    statuses = Status.objects.in_bulk(status_ids)
+    missing = status_ids - set(statuses)
+    if missing: raise ValidationError({'status_id': f"Statuses do not exist: {', '.join(map(str, sorted(missing)))}."})
+
+    with transaction.atomic():
+        rows = {(brick_id, status_id): row_id for row_id, brick_id, status_id in
+                BrickStatus.objects.select_for_update()
+                .filter(brick_id__in=brick_ids, status_id__in=status_ids).values_list('id', 'brick_id', 'status_id')}
+        before = set(rows)
+        after = set(before)
+        for brick_id, status_id, action_type in operations:
+            if action_type == ACTION_TYPE_ADD: after.add((brick_id, status_id))
+            else: after.discard((brick_id, status_id))
+        added, removed = sorted(after - before), sorted(before - after)
+
+        if removed: BrickStatus.objects.filter(id__in=[rows[pair] for pair in removed]).delete()
+        if added: BrickStatus.objects.bulk_create([BrickStatus(brick_id=b, status_id=s) for b, s in added])
+        history = [BrickHistory(brick_id=brick_id, status=statuses[status_id], action_type=action_type)
+                   for pairs, action_type in ((added, ACTION_TYPE_ADD), (removed, ACTION_TYPE_REMOVE))
+                   for brick_id, status_id in pairs]
+        history = BrickHistory.objects.bulk_create(history)
+        record_history(history)
+
+    # Bulk changes don't send m2m_changed, so the index is told directly
+    status_index().update(added=added, removed=removed)
+    if history: maybe_snapshot(latest_id=max((item.id for item in history if item.id), default=None))
+    return history
@@ -0,0 +1,148 @@
+# bricks/rollups.py
+# Reliability metrics of each brick (time spent in each status, faults and mean
+#   time between failures), kept as daily BrickRollup totals per (brick,
+#   status) that are updated as history is logged, rather than computed by
+#   scanning BrickHistory. A status a brick still has is kept as an open
+#   BrickStatusSpan, whose time is added to the rollups of the days it covers
+#   when it ends. Rollups with no status track a brick having any status,
+#   i.e. being faulty.
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+
+from .constants import ACTION_TYPE_ADD, ROLLUP_REBUILD_BATCH
+from .models import Brick, BrickHistory, BrickRollup, BrickStatusSpan
+
+def day_start(day: date) -> datetime:
+    """Returns the time `day` starts at, in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def split_by_day(start: datetime, end: datetime):
+    """Yields (day, seconds) for each day the span from `start` to `end`
+    covers, with the seconds of the span in that day."""
+    while start < end:
+        day = timezone.localdate(start)
+        boundary = min(end, day_start(day + timedelta(days=1)))
+        yield day, (boundary - start).total_seconds()
+        start = boundary
+
+def record_history(items) -> None:
+    """Adds history `items` (in any order, but all logged after any already
+    recorded) to the rollups of their bricks: an added status opens a span
+    and counts a fault on its day, a removed one closes its span, adding its
+    time to each day it covers. Must be called in a transaction. Takes a
+    constant number of queries however many items there are."""
+    items = sorted(items, key=lambda item: (item.timestamp, item.id or 0))
+    if not items: return
+    brick_ids = {item.brick_id for item in items}
+    existing = {(span.brick_id, span.status_id): span for span in
+                BrickStatusSpan.objects.select_for_update().filter(brick_id__in=brick_ids)}
+    spans = {key: span.started_at for key, span in existing.items()}
+    num_open = Counter(brick_id for brick_id, status_id in spans if status_id is not None)
+    totals = defaultdict(lambda: [0.0, 0])   # (brick id, status id, day): [seconds, faults]
+
+    def start_span(key, at):
+        spans[key] = at
+        totals[(*key, timezone.localdate(at))][1] += 1
+
+    def end_span(key, at):
+        for day, seconds in split_by_day(spans.pop(key), at): totals[(*key, day)][0] += seconds
+
+    for item in items:
+        key, faulty = (item.brick_id, item.status_id), (item.brick_id, None)
+        if item.action_type == ACTION_TYPE_ADD:
+            if key in spans: continue
+            start_span(key, item.timestamp)
+            num_open[item.brick_id] += 1
+            if faulty not in spans: start_span(faulty, item.timestamp)
+        elif key in spans:
+            end_span(key, item.timestamp)
+            num_open[item.brick_id] -= 1
+            if not num_open[item.brick_id] and faulty in spans: end_span(faulty, item.timestamp)
+
+    days = {day for _, _, day in totals}
+    rollups = {(rollup.brick_id, rollup.status_id, rollup.day): rollup for rollup in
+               BrickRollup.objects.select_for_update().filter(brick_id__in=brick_ids, day__in=days)}
+    changed, created = [], []
+    for key, (seconds, faults) in totals.items():
+        rollup = rollups.get(key)
+        if rollup is None:
+            created.append(BrickRollup(brick_id=key[0], status_id=key[1], day=key[2], seconds=seconds, faults=faults))
+            continue
+        rollup.seconds += seconds
+        rollup.faults += faults
+        changed.append(rollup)
+    if changed: BrickRollup.objects.bulk_update(changed, ['seconds', 'faults'])
+    if created: BrickRollup.objects.bulk_create(created)
+
+    ended = [span.id for key, span in existing.items() if spans.get(key) != span.started_at]
+    if ended: BrickStatusSpan.objects.filter(id__in=ended).delete()
+    started = [BrickStatusSpan(brick_id=brick_id, status_id=status_id, started_at=at)
+               for (brick_id, status_id), at in spans.items()
+               if (brick_id, status_id) not in existing or existing[(brick_id, status_id)].started_at != at]
+    if started: BrickStatusSpan.objects.bulk_create(started)
+
+def rebuild_rollups(batch_size: int=ROLLUP_REBUILD_BATCH) -> int:
+    """Drops all rollups and open spans and records the whole of BrickHistory
+    again, `batch_size` items at a time, in one transaction. Returns the
+    number of history items recorded."""
+    with transaction.atomic():
+        BrickRollup.objects.all().delete()
+        BrickStatusSpan.objects.all().delete()
+        count, batch = 0, []
+        for item in BrickHistory.objects.order_by('timestamp', 'id').iterator(chunk_size=batch_size):
+            batch.append(item)
+            if len(batch) < batch_size: continue
+            record_history(batch)
+            count, batch = count + len(batch), []
+        record_history(batch)
+    return count + len(batch)
+
+def reliability(first: date, last: date, now: datetime=None) -> dict:
+    """Returns the reliability of every brick from the start of day `first` to
+    the end of day `last` (or `now`, if sooner), from the rollups of those
+    days and the spans still open: the seconds it spent with each status id
+    and with any status (`faulty_seconds`), the times it became faulty
+    (`faults`) and its mean time between failures (`mtbf`, the seconds it
+    wasn't faulty per fault, or None without faults), and the same totals for
+    the whole wall. Takes at most three queries."""
+    now = now or timezone.now()
+    start, end = day_start(first), min(now, day_start(last + timedelta(days=1)))
+    period = max(0.0, (end - start).total_seconds())
+    bricks = {brick_id: {'brick': brick_id, 'time_in_status': {}, 'faulty_seconds': 0.0, 'faults': 0}
+              for brick_id in Brick.objects.order_by('id').values_list('id', flat=True)}
+
+    def add(brick_id, status_id, seconds, faults):
+        metrics = bricks.get(brick_id)
+        if metrics is None: return
+        if status_id is None:
+            metrics['faulty_seconds'] += seconds
+            metrics['faults'] += faults
+        else:
+            metrics['time_in_status'][status_id] = metrics['time_in_status'].get(status_id, 0.0) + seconds
+
+    totals = BrickRollup.objects.filter(day__range=(first, last)).values('brick', 'status') \
+        .annotate(total_seconds=Sum('seconds'), total_faults=Sum('faults')) \
+        .values_list('brick', 'status', 'total_seconds', 'total_faults')
+    for brick_id, status_id, seconds, faults in totals: add(brick_id, status_id, seconds, faults)
+    if period:
+        for brick_id, status_id, started_at in BrickStatusSpan.objects.filter(started_at__lt=end) \
+                .values_list('brick_id', 'status_id', 'started_at'):
+            add(brick_id, status_id, (end - max(started_at, start)).total_seconds(), 0)
+
+    def mtbf(uptime, faults):
+        return uptime / faults if faults else None
+
+    for metrics in bricks.values(): metrics['mtbf'] = mtbf(period - metrics['faulty_seconds'], metrics['faults'])
+    faulty_seconds = sum(metrics['faulty_seconds'] for metrics in bricks.values())
+    faults = sum(metrics['faults'] for metrics in bricks.values())
+    return {
+        'from': first, 'to': last, 'period_seconds': period,
+        'wall': {'faulty_seconds': faulty_seconds, 'faults': faults,
+                 'mtbf': mtbf(period * len(bricks) - faulty_seconds, faults)},
+        'bricks': list(bricks.values()),
+    }
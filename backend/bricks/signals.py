@@ -0,0 +1,28 @@
+# bricks/signals.py
+# Keeps the status index (see `bricks.index`) current as brick statuses change
+#   through the ORM.
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .index import status_index
+from .models import Brick, Status
+
+@receiver(m2m_changed, sender=Brick.statuses.through)
+def update_status_index(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        # Changed from the brick (brick.statuses) or the status (status.bricks)
+        pairs = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        if action == 'post_add': status_index().update(added=pairs)
+        else: status_index().update(removed=pairs)
+    elif action == 'post_clear':
+        status_index().invalidate()
+
+@receiver(post_delete, sender=Brick)
+@receiver(post_delete, sender=Status)
+def drop_status_index(sender, **kwargs):
+    status_index().invalidate()
+
+@receiver(post_save, sender=Status)
+def add_status_to_index(sender, created, **kwargs):
+    if created: status_index().invalidate()
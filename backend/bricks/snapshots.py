@@ -0,0 +1,69 @@
+# bricks/snapshots.py
+# Rebuilding the statuses of the whole wall at a past time from BrickHistory.
+#   Every SNAPSHOT_INTERVAL history items, the state of the wall is stored as a
+#   BrickSnapshot (a bitset per status), so a past state is rebuilt from the
+#   nearest snapshot before it plus only the history items logged since.
+
+from django.db import IntegrityError, transaction
+
+from datetime import datetime
+
+from .constants import ACTION_TYPE_ADD, SNAPSHOT_INTERVAL
+from .index import brick_bit
+from .models import BrickHistory, BrickSnapshot
+
+def replay(state: dict[int, int], events) -> dict[int, int]:
+    """Applies history `events` ((brick id, status id, action type), in order)
+    to `state`, the bitset of each status id. Returns the new state."""
+    state = dict(state)
+    for brick_id, status_id, action_type in events:
+        bits = state.get(status_id, 0)
+        state[status_id] = bits | brick_bit(brick_id) if action_type == ACTION_TYPE_ADD else bits & ~brick_bit(brick_id)
+    return state
+
+def load_state(snapshot: BrickSnapshot | None) -> dict[int, int]:
+    """Returns the state stored in `snapshot` (no statuses if None)."""
+    if snapshot is None: return {}
+    return {int(status_id): int(bits, 16) for status_id, bits in snapshot.state.items()}
+
+def state_at(at: datetime) -> tuple[dict[int, int], BrickSnapshot | None, int]:
+    """Rebuilds the bitset of each status id as it was at time `at`, from the
+    latest snapshot at or before it. Returns the state, the snapshot used (or
+    None, replaying from the start of history) and how many history items
+    were replayed on top of it."""
+    snapshot = BrickSnapshot.objects.filter(timestamp__lte=at).order_by('-timestamp', '-last_history_id').first()
+    events = BrickHistory.objects.filter(timestamp__lte=at)
+    if snapshot: events = events.filter(id__gt=snapshot.last_history_id)
+    events = list(events.order_by('timestamp', 'id').values_list('brick_id', 'status_id', 'action_type'))
+    return replay(load_state(snapshot), events), snapshot, len(events)
+
+def take_snapshot() -> BrickSnapshot | None:
+    """Stores the state of the wall as of the latest history item, built from
+    the previous snapshot. Returns the snapshot, or None if there's no history
+    since the last one (or another process took the same snapshot first, as
+    snapshots are unique per history item)."""
+    try:
+        with transaction.atomic():
+            previous = BrickSnapshot.objects.order_by('-last_history_id').first()
+            events = BrickHistory.objects.order_by('id')
+            if previous: events = events.filter(id__gt=previous.last_history_id)
+            events = list(events.values_list('id', 'timestamp', 'brick_id', 'status_id', 'action_type'))
+            if not events: return None
+
+            state = replay(load_state(previous), (event[2:] for event in events))
+            last_id, last_timestamp = events[-1][:2]
+            return BrickSnapshot.objects.create(
+                timestamp=last_timestamp, last_history_id=last_id,
+                state={str(status_id): format(bits, 'x') for status_id, bits in state.items()},
+            )
+    except IntegrityError:
+        return None
+
+def maybe_snapshot(interval: int=SNAPSHOT_INTERVAL, latest_id: int=None) -> BrickSnapshot | None:
+    """Takes a snapshot if at least `interval` history items have been logged
+    since the last one, going by the gap in history ids (rather than counting
+    them) up to `latest_id`, the latest history item's id if known. Returns 
+    the snapshot taken, if any."""
+    last_id = BrickSnapshot.objects.order_by('-last_history_id').values_list('last_history_id', flat=True).first()
+    if latest_id is None: latest_id = BrickHistory.objects.order_by('-id').values_list('id', flat=True).first()
+    return take_snapshot() if (latest_id or 0) - (last_id or 0) >= interval else None
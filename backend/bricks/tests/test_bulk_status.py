@@ -0,0 +1,61 @@
+from rest_framework.test import APIClient, APITestCase
+from django.urls import reverse
+
+from ..constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE
+from ..models import Brick, Status, BrickHistory
+
+
+class BulkStatusTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Brick.objects.bulk_create([Brick(id=i) for i in range(1, 51)])
+        self.faulty = Status.objects.create(name="Test Faulty")
+        self.offline = Status.objects.create(name="Test Offline")
+        self.url = reverse('brick-bulk-status')
+
+    def operation(self, brick_id, status, action_type=ACTION_TYPE_ADD) -> dict:
+        return {'brick_id': brick_id, 'status_id': status.id, 'action_type': action_type}
+
+    def test_sweep_in_constant_queries(self):
+        """
+        Test that marking many bricks takes as many queries as marking one,
+        with a history item per brick changed.
+        """
+        with self.assertNumQueries(12):
+            self.client.post(self.url, {'operations': [self.operation(1, self.faulty)]}, format='json')
+        operations = [self.operation(i, self.faulty) for i in range(1, 41)]
+        with self.assertNumQueries(12):
+            response = self.client.post(self.url, {'operations': operations}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['changes']), 39)
+        self.assertEqual(self.faulty.bricks.count(), 40)
+        self.assertEqual(BrickHistory.objects.filter(status=self.faulty, action_type=ACTION_TYPE_ADD).count(), 40)
+
+    def test_only_effective_changes(self):
+        """
+        Test that operations cancelling out, or adding statuses already held,
+        change nothing and aren't logged.
+        """
+        Brick.objects.get(id=2).statuses.add(self.offline)
+        response = self.client.post(self.url, {'operations': [
+            self.operation(1, self.faulty), self.operation(1, self.faulty, ACTION_TYPE_REMOVE),
+            self.operation(2, self.offline), self.operation(3, self.offline),
+            self.operation(2, self.offline, ACTION_TYPE_REMOVE),
+        ]}, format='json')
+
+        changes = [(c['brick'], c['status']['id'], c['action_type']) for c in response.data['changes']]
+        self.assertEqual(changes, [(3, self.offline.id, ACTION_TYPE_ADD), (2, self.offline.id, ACTION_TYPE_REMOVE)])
+        self.assertEqual(list(self.offline.bricks.values_list('id', flat=True)), [3])
+        self.assertFalse(BrickHistory.objects.filter(brick_id=1).exists())
+
+    def test_invalid_operations_change_nothing(self):
+        """
+        Test that unknown bricks, statuses or actions reject the whole batch.
+        """
+        for bad in (self.operation(999, self.faulty), {'brick_id': 2, 'status_id': 999, 'action_type': ACTION_TYPE_ADD},
+                    self.operation(2, self.faulty, 'toggle'), {'brick_id': 2}):
+            response = self.client.post(self.url, {'operations': [self.operation(1, self.faulty), bad]}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.faulty.bricks.exists())
+        self.assertFalse(BrickHistory.objects.exists())
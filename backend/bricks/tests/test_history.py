@@ -1,7 +1,13 @@
 from rest_framework.test import APIClient, APITestCase
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from ..constants import ACTION_TYPE_ADD
+import csv
+import json
+from datetime import timedelta
+
+from ..constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE
 from ..models import Brick, Status, BrickHistory
 
 
@@ -27,7 +33,74 @@ class BrickHistoryTests(APITestCase):
         self.assertEqual(response.status_code, 200)
         
         # Check the response content
-        history_data = response.json()
+        history_data = response.json()['results']
         self.assertEqual(len(history_data), 1)
         self.assertEqual(history_data[0]['status']['name'], 'Test Status')
         self.assertEqual(history_data[0]['action_type'], ACTION_TYPE_ADD)
+
+
+class HistoryPageTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Brick.objects.bulk_create([Brick(id=i) for i in range(1, 4)])
+        self.faulty = Status.objects.create(name="Test Faulty")
+        self.offline = Status.objects.create(name="Test Offline")
+        self.start = timezone.now() - timedelta(days=10)
+        for day in range(10):
+            item = BrickHistory.objects.create(brick_id=day % 3 + 1, status=self.faulty if day % 2 else self.offline,
+                                               action_type=ACTION_TYPE_REMOVE if day >= 5 else ACTION_TYPE_ADD)
+            BrickHistory.objects.filter(pk=item.pk).update(timestamp=self.start + timedelta(days=day))
+
+    def follow(self, url: str, params: dict) -> list[dict]:
+        """Returns the items of every page, following the `next` cursors."""
+        response = self.client.get(url, params)
+        items = response.data['results']
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            items += response.data['results']
+        return items
+
+    def test_pages_through_wall_history(self):
+        """
+        Test that following the cursors returns all of the history, in order,
+        and that filters apply throughout.
+        """
+        url = reverse('brick-wall-history')
+        response = self.client.get(url, {'limit': 4})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNone(response.data['previous'])
+
+        items = self.follow(url, {'limit': 3})
+        self.assertEqual(len(items), 10)
+        self.assertEqual([item['timestamp'] for item in items], sorted(item['timestamp'] for item in items))
+
+        since = (self.start + timedelta(days=3)).isoformat()
+        items = self.follow(url, {'limit': 2, 'status': self.faulty.id, 'action': ACTION_TYPE_ADD, 'since': since})
+        self.assertEqual([(item['brick'], item['status']['id']) for item in items], [(1, self.faulty.id)])
+
+        brick_items = self.follow(reverse('brick-history', kwargs={'pk': 1}), {'limit': 1})
+        self.assertEqual(len(brick_items), 4)
+        self.assertTrue(all(item['brick'] == 1 for item in brick_items))
+
+        self.assertEqual(self.client.get(url, {'action': 'toggle'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'until': 'tomorrow'}).status_code, 400)
+
+    def test_export_streams(self):
+        """
+        Test that exports are streamed, as NDJSON or CSV, with filters.
+        """
+        url = reverse('brick-export-history')
+        response = self.client.get(url, {'action': ACTION_TYPE_REMOVE})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0]['status'], self.faulty.name)
+        self.assertEqual(parse_datetime(lines[0]['timestamp']), self.start + timedelta(days=5))
+
+        response = self.client.get(url, {'as': 'csv', 'brick': 2})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ['id', 'brick', 'status_id', 'status', 'action_type', 'timestamp'])
+        self.assertEqual([row[1] for row in rows[1:]], ['2'] * 3)
+
+        self.assertEqual(self.client.get(url, {'as': 'xml'}).status_code, 400)
@@ -0,0 +1,90 @@
+from rest_framework.test import APIClient, APITestCase
+from django.urls import reverse
+
+from unittest import mock
+
+from ..constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE, NUM_BRICKS
+from ..index import StatusIndex, bits_to_hex, bits_to_ids, status_index
+from ..models import Brick, Status
+
+
+class StatusIndexTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        status_index().invalidate()
+        Brick.objects.bulk_create([Brick(id=i) for i in range(1, 11)] + [Brick(id=NUM_BRICKS)])
+        self.faulty = Status.objects.create(name="Test Faulty")
+        self.offline = Status.objects.create(name="Test Offline")
+        for brick_id in (1, 2, 3): Brick.objects.get(id=brick_id).statuses.add(self.faulty)
+        self.offline.bricks.add(3, 4, NUM_BRICKS)
+        self.url = reverse('brick-by-status')
+
+    def tearDown(self):
+        status_index().invalidate()
+
+    def by_status(self, **params):
+        return self.client.get(self.url, params).data
+
+    def test_index_built_in_one_query(self):
+        """
+        Test that the index is built with one query, then answered from memory.
+        """
+        with self.assertNumQueries(1):
+            statuses = status_index().statuses()
+        self.assertEqual(bits_to_ids(statuses[self.faulty.id]), [1, 2, 3])
+        self.assertEqual(bits_to_ids(statuses[self.offline.id]), [3, 4, NUM_BRICKS])
+        with self.assertNumQueries(0):
+            self.by_status(all=self.faulty.id)
+
+    def test_index_follows_changes(self):
+        """
+        Test that the index follows statuses changed from either side of the
+        relation, in bulk, and new statuses.
+        """
+        status_index().statuses()
+        Brick.objects.get(id=1).statuses.remove(self.faulty)
+        self.faulty.bricks.add(5)
+        self.client.post(reverse('brick-bulk-status'), {'operations': [
+            {'brick_id': 6, 'status_id': self.faulty.id, 'action_type': ACTION_TYPE_ADD},
+            {'brick_id': 2, 'status_id': self.faulty.id, 'action_type': ACTION_TYPE_REMOVE},
+        ]}, format='json')
+        glue = Status.objects.create(name="Test Glue")
+
+        statuses = self.by_status()['statuses']
+        self.assertEqual(statuses[self.faulty.id], [3, 5, 6])
+        self.assertEqual(statuses[glue.id], [])
+
+    def test_build_racing_a_change_not_kept(self):
+        """
+        Test that a build the index changed during isn't kept (it may have
+        missed the change), and that reads are copies of the index.
+        """
+        index = StatusIndex()
+        values_list = Status.objects.values_list
+        def racing_read(*args, **kwargs):
+            rows = list(values_list(*args, **kwargs))
+            index.update(added=[(7, self.faulty.id)])
+            return rows
+        with mock.patch.object(Status.objects, 'values_list', racing_read):
+            statuses = index.statuses()
+        self.assertEqual(bits_to_ids(statuses[self.faulty.id]), [1, 2, 3])
+        self.assertIsNone(index.bits)
+
+        statuses = index.statuses()
+        self.assertIsNotNone(index.bits)
+        statuses[self.faulty.id] = 0
+        self.assertEqual(bits_to_ids(index.statuses()[self.faulty.id]), [1, 2, 3])
+
+    def test_set_queries(self):
+        """
+        Test bricks with all, any and none of some statuses, as ids and bits.
+        """
+        self.assertEqual(self.by_status(all=f'{self.faulty.id},{self.offline.id}')['bricks'], [3])
+        self.assertEqual(self.by_status(any=f'{self.faulty.id},{self.offline.id}')['bricks'], [1, 2, 3, 4, NUM_BRICKS])
+        self.assertEqual(self.by_status(all=self.faulty.id, none=self.offline.id)['bricks'], [1, 2])
+        self.assertEqual(self.by_status(all=self.faulty.id, none=self.offline.id, **{'as': 'bits'})['bricks'],
+                         bits_to_hex(0b11))
+        self.assertEqual(len(self.by_status(**{'as': 'bits'})['statuses'][self.offline.id]), (NUM_BRICKS + 3) // 4)
+
+        self.assertEqual(self.client.get(self.url, {'all': 999}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'as': 'csv'}).status_code, 400)
@@ -0,0 +1,120 @@
+from rest_framework.test import APIClient, APITestCase
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import date, timedelta
+from io import StringIO
+
+from ..constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE
+from ..models import Brick, Status, BrickHistory, BrickRollup, BrickStatusSpan
+from ..rollups import day_start, record_history, reliability
+
+DAY = date(2026, 1, 1)
+START = day_start(DAY)
+
+
+class RollupTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Brick.objects.bulk_create([Brick(id=i) for i in range(1, 4)])
+        self.faulty = Status.objects.create(name="Test Faulty")
+        self.offline = Status.objects.create(name="Test Offline")
+
+    def log(self, hours: float, brick_id: int, status: Status, action_type: str=ACTION_TYPE_ADD) -> BrickHistory:
+        """Logs a history item `hours` hours after START."""
+        item = BrickHistory.objects.create(brick_id=brick_id, status=status, action_type=action_type)
+        BrickHistory.objects.filter(pk=item.pk).update(timestamp=START + timedelta(hours=hours))
+        item.refresh_from_db()
+        return item
+
+    def add_history(self) -> list[BrickHistory]:
+        return [
+            self.log(6, 1, self.faulty),
+            self.log(12, 1, self.offline),
+            self.log(18, 1, self.faulty, ACTION_TYPE_REMOVE),
+            self.log(30, 1, self.offline, ACTION_TYPE_REMOVE),
+            self.log(36, 1, self.faulty),
+            self.log(40, 2, self.offline),
+        ]
+
+    def rollups(self) -> dict:
+        return {(r.brick_id, r.status_id, r.day): (r.seconds, r.faults) for r in BrickRollup.objects.all()}
+
+    def test_spans_split_into_daily_buckets(self):
+        """
+        Test that the time a brick has a status is split between the days it
+        covers, with overlapping statuses counted once as faulty time.
+        """
+        history = self.add_history()
+        record_history(history[:3])
+        record_history(history[3:])
+        hour, next_day = 3600, DAY + timedelta(days=1)
+
+        rollups = self.rollups()
+        self.assertEqual(rollups[(1, self.faulty.id, DAY)], (12 * hour, 1))
+        self.assertEqual(rollups[(1, self.offline.id, DAY)], (12 * hour, 1))
+        self.assertEqual(rollups[(1, self.offline.id, next_day)], (6 * hour, 0))
+        self.assertEqual(rollups[(1, None, DAY)], (18 * hour, 1))
+        self.assertEqual(rollups[(1, None, next_day)], (6 * hour, 1))
+        self.assertEqual(set(BrickStatusSpan.objects.values_list('brick_id', 'status_id')),
+                         {(1, self.faulty.id), (1, None), (2, self.offline.id), (2, None)})
+
+    def test_reliability(self):
+        """
+        Test reliability over a period, counting spans still open up to its end.
+        """
+        record_history(self.add_history())
+        result = reliability(DAY, DAY + timedelta(days=1))
+        hour, period = 3600, 48 * 3600
+
+        brick = result['bricks'][0]
+        self.assertEqual(result['period_seconds'], period)
+        self.assertEqual(brick['time_in_status'], {self.faulty.id: 24 * hour, self.offline.id: 18 * hour})
+        self.assertEqual((brick['faulty_seconds'], brick['faults']), (36 * hour, 2))
+        self.assertEqual(brick['mtbf'], 6 * hour)
+        self.assertIsNone(result['bricks'][2]['mtbf'])
+        self.assertEqual(result['wall']['faults'], 3)
+        self.assertEqual(result['wall']['mtbf'], (3 * period - 44 * hour) / 3)
+
+        # Only the first day, then a period still in progress
+        self.assertEqual(reliability(DAY, DAY)['bricks'][0]['faulty_seconds'], 18 * hour)
+        partial = reliability(DAY, DAY + timedelta(days=1), now=START + timedelta(hours=30))
+        self.assertEqual(partial['period_seconds'], 30 * hour)
+        self.assertEqual(partial['bricks'][0]['faulty_seconds'], 24 * hour)
+
+    def test_rebuild_matches_incremental(self):
+        """
+        Test that rebuilding the rollups from scratch, in small batches, gives
+        the same rollups as recording history as it's logged.
+        """
+        history = self.add_history()
+        for item in history: record_history([item])
+        incremental = self.rollups()
+        BrickRollup.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_rollups', batch_size=4, stdout=out)
+        self.assertIn("6 history items", out.getvalue())
+        self.assertEqual(self.rollups(), incremental)
+        self.assertEqual(BrickStatusSpan.objects.count(), 4)
+
+    def test_status_changes_update_rollups(self):
+        """
+        Test that status changes through the API update the rollups, and are
+        reported by the reliability endpoint.
+        """
+        url = reverse('brick-modify-status', kwargs={'pk': 3})
+        self.client.patch(url, {'status_id': self.faulty.id, 'action_type': ACTION_TYPE_ADD}, format='json')
+        self.client.patch(url, {'status_id': self.faulty.id, 'action_type': ACTION_TYPE_REMOVE}, format='json')
+        self.assertEqual(BrickRollup.objects.get(brick_id=3, status=None).faults, 1)
+        self.assertFalse(BrickStatusSpan.objects.exists())
+
+        today = timezone.localdate()
+        response = self.client.get(reverse('brick-reliability'), {'from': today, 'to': today})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['wall']['faults'], 1)
+        self.assertEqual(response.data['bricks'][2]['faults'], 1)
+
+        response = self.client.get(reverse('brick-reliability'), {'from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,112 @@
+from rest_framework.test import APIClient, APITestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import timedelta
+from unittest import mock
+
+from ..constants import ACTION_TYPE_ADD, ACTION_TYPE_REMOVE
+from ..index import bits_to_ids
+from ..models import Brick, Status, BrickHistory, BrickSnapshot
+from ..snapshots import maybe_snapshot, replay, state_at, take_snapshot
+
+START = timezone.now() - timedelta(days=30)
+
+
+class SnapshotTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Brick.objects.bulk_create([Brick(id=i) for i in range(1, 6)])
+        self.faulty = Status.objects.create(name="Test Faulty")
+        self.offline = Status.objects.create(name="Test Offline")
+
+    def log(self, day: int, brick_id: int, status: Status, action_type: str=ACTION_TYPE_ADD) -> None:
+        """Logs a history item `day` days after START."""
+        item = BrickHistory.objects.create(brick_id=brick_id, status=status, action_type=action_type)
+        BrickHistory.objects.filter(pk=item.pk).update(timestamp=START + timedelta(days=day))
+
+    def add_history(self):
+        self.log(1, 1, self.faulty)
+        self.log(2, 2, self.faulty)
+        self.log(3, 2, self.offline)
+        self.log(4, 1, self.faulty, ACTION_TYPE_REMOVE)
+        self.log(5, 3, self.faulty)
+
+    def full_replay(self, at) -> dict[int, int]:
+        events = BrickHistory.objects.filter(timestamp__lte=at).order_by('timestamp', 'id')
+        return replay({}, events.values_list('brick_id', 'status_id', 'action_type'))
+
+    def test_state_from_nearest_snapshot(self):
+        """
+        Test that past states rebuilt from a snapshot match replaying all of
+        history, replaying only what came after the snapshot.
+        """
+        self.add_history()
+        snapshot = take_snapshot()
+        self.assertEqual(snapshot.timestamp, START + timedelta(days=5))
+        self.log(6, 4, self.offline)
+        self.log(7, 2, self.offline, ACTION_TYPE_REMOVE)
+
+        for day in range(0, 9):
+            at = START + timedelta(days=day, hours=1)
+            state, used, replayed = state_at(at)
+            self.assertEqual({k: v for k, v in state.items() if v}, {k: v for k, v in self.full_replay(at).items() if v})
+            if day >= 5: self.assertEqual((used, replayed), (snapshot, min(2, day - 5)))
+            else: self.assertIsNone(used)
+
+        state, _, _ = state_at(START + timedelta(days=8))
+        self.assertEqual(bits_to_ids(state[self.faulty.id]), [2, 3])
+        self.assertEqual(bits_to_ids(state[self.offline.id]), [4])
+
+    def test_snapshots_taken_periodically(self):
+        """
+        Test that a snapshot is taken once enough history has built up, and
+        that status changes take them.
+        """
+        self.log(1, 1, self.faulty)
+        self.assertIsNone(maybe_snapshot(interval=2))
+        self.log(2, 2, self.faulty)
+        self.assertIsNotNone(maybe_snapshot(interval=2))
+        self.assertIsNone(take_snapshot())
+
+        for brick_id in (3, 4, 5):
+            self.client.patch(reverse('brick-modify-status', kwargs={'pk': brick_id}),
+                              {'status_id': self.offline.id, 'action_type': ACTION_TYPE_ADD}, format='json')
+        self.assertEqual(BrickSnapshot.objects.count(), 1)
+        self.assertIsNotNone(maybe_snapshot(interval=3))
+
+    def test_snapshot_once_per_history_item(self):
+        """
+        Test that a snapshot racing another for the same history item isn't
+        stored twice, and that the interval goes by history ids.
+        """
+        self.add_history()
+        latest = BrickHistory.objects.latest('id')
+        BrickSnapshot.objects.create(timestamp=latest.timestamp, last_history_id=latest.id - 1)
+        with mock.patch('bricks.snapshots.BrickSnapshot.objects.order_by', return_value=BrickSnapshot.objects.none()):
+            self.assertIsNotNone(take_snapshot())
+            self.assertIsNone(take_snapshot())
+        self.assertEqual(BrickSnapshot.objects.filter(last_history_id=latest.id).count(), 1)
+
+        self.log(6, 4, self.offline)
+        self.log(7, 4, self.offline, ACTION_TYPE_REMOVE)
+        BrickHistory.objects.filter(timestamp=START + timedelta(days=6)).delete()
+        self.assertIsNotNone(maybe_snapshot(interval=2))
+
+    def test_state_endpoint(self):
+        """
+        Test the wall's state at a time, and that bad times are rejected.
+        """
+        self.add_history()
+        take_snapshot()
+        url = reverse('brick-state')
+        data = self.client.get(url, {'at': (START + timedelta(days=3, hours=1)).isoformat()}).data
+        self.assertEqual(data['statuses'][self.faulty.id], [1, 2])
+        self.assertEqual(data['statuses'][self.offline.id], [2])
+        self.assertIsNone(data['checkpoint'])
+        self.assertEqual(data['replayed'], 3)
+
+        data = self.client.get(url, {'at': timezone.now().isoformat()}).data
+        self.assertEqual(data['statuses'][self.faulty.id], [2, 3])
+        self.assertEqual(data['replayed'], 0)
+        self.assertEqual(self.client.get(url, {'at': 'yesterday'}).status_code, 400)
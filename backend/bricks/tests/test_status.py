@@ -36,6 +36,7 @@ class BrickStatusTests(APITestCase):
 
         # Verify the status has been added to the brick
         self.assertIn(self.status1, self.brick.statuses.all())
+        self.assertEqual([status['id'] for status in response.data['statuses']], [self.status1.id])
 
         # Verify that a BrickHistory entry has been created
         history_item = BrickHistory.objects.filter(brick=self.brick, status=self.status1, action_type=ACTION_TYPE_ADD).first()
@@ -90,6 +91,7 @@ class BrickStatusTests(APITestCase):
 
         # Verify the status has been removed from the brick
         self.assertNotIn(self.status2, self.brick.statuses.all())
+        self.assertEqual(response.data['statuses'], [])
 
         # Verify original history is still present after the removal
         original_item = BrickHistory.objects.filter(brick=self.brick, status=self.status2, action_type=ACTION_TYPE_ADD).first()
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.forms import ModelForm
-from .models import Show, Video, Location
+from .models import Show, Video, Location, Job
 
 # Register your models here.
 admin.site.register([Show])
@@ -40,4 +40,11 @@ class LocationAdmin(admin.ModelAdmin):
     form = LocationAdminForm
     list_display = ('location_number', 'show', 'video')
 
-admin.site.register(Location, LocationAdmin)
\ No newline at end of file
+admin.site.register(Location, LocationAdmin)
+
+# Register jobs
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'show', 'video', 'created_at')
+    list_filter = ('kind', 'status')
+
+admin.site.register(Job, JobAdmin)
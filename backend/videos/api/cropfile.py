@@ -1,16 +1,19 @@
 # cropfile.py
-#   Contains the function `crop_file_duration` used to validate and crop frame
-#   rate of video and gif files.
+#   Contains the ffmpeg helpers used to inspect, validate and run encodes of 
+#   video and gif files. See `ingest.py` for the upload pipeline built on them.
 
 from rest_framework.serializers import ValidationError
-from moviepy.editor import VideoFileClip
 
 import ffmpeg
 
 import os
+import subprocess
+import tempfile
 import uuid
+from typing import Callable
 
-from ..constants import FRAME_RATE, FRAME_MARGIN, RESOLUTION, VID_EXTENSION, TMP_PATH
+from ..constants import FRAME_MARGIN, RESOLUTION, VID_EXTENSION, TMP_PATH
+from ..media import MediaInfo, probe_media
 
 def tmp_move(file_path: str, file_type: str=VID_EXTENSION) -> str:
     """Takes a path `file_path` and moves a file at this given location to 
@@ -32,177 +35,49 @@ def tmp_clean(file_path: str) -> None | Exception:
     except Exception as e:
         raise e
 
-# Crop video resolution
-def crop_file_resolution(file_path: str, crop_x: int, crop_y: int, show_frames: int,
-                         resolution: tuple[int,int]=RESOLUTION):
-    """Takes a video at `file_path`, and saves a file cropped from coords 
-    (`crop_x`,`crop_y`) of dimensions `resolution` over the top of it. Raises an
-    exception if cropping fails."""
-    tmp_path = None
-    try:
-        # If resolution already matching, no need to crop
-        video_clip = VideoFileClip(file_path)
-        resolution = video_clip.size
-        video_clip.close()
-        if valid_resolution(resolution, strict=True): return
-
-        # Move the original video to a temporary location (to avoid overwriting 
-        # it during the resolution cropping process)
-        tmp_path = tmp_move(file_path)
-
-        # Then crop resolution of video using the provided coords
-        crop_clip_resolution(tmp_path, file_path, crop_x, crop_y, show_frames)
-
-    except Exception as e:
-        raise e
-    finally:
-        if tmp_path: tmp_clean(tmp_path)
-
-def crop_clip_resolution(input_path: str, out_path: str, crop_x: int, crop_y: int, 
-                         show_frames: int, resolution: tuple[int, int]=RESOLUTION):
-    """
-    Crops a video using `ffmpeg-python` and saves it to `out_path`.
-    Args:
-        input_path (str): Path to the input video file.
-        out_path (str): Path to save the cropped output video file.
-        crop_x (int): X-coordinate of the top-left corner to start cropping.
-        crop_y (int): Y-coordinate of the top-left corner to start cropping.
-        resolution (tuple): A tuple (width, height) indicating the crop size.
-    """
-    try:
-        # Define the cropping filter
-        width, height = resolution
-        ffmpeg.input(input_path) \
-            .crop(x=crop_x, y=crop_y, width=width, height=height) \
-            .output(out_path, codec='libx264') \
-            .run(overwrite_output=True)
-    
-        # Get the duration of the input video
-        probe = ffmpeg.probe(out_path)
-        cropped_frames = int(probe['streams'][0]['nb_frames'])
-        if cropped_frames > show_frames:
-            cropped_output_path = tmp_move(out_path)  # Temporary path for cropped video
-
-            input_file = ffmpeg.input(cropped_output_path)
-            output_file = ffmpeg.output(input_file.trim(start_frame=0, end_frame=show_frames), out_path)
-            ffmpeg.run(output_file)
-
-            tmp_clean(cropped_output_path)
-        elif (cropped_frames < show_frames):
-            raise ValidationError(f"Video could not successfully crop to {width}x{height}.")                            
-    except Exception as e:
-        raise e
-
-# Validate and crop video frames
-def crop_file_duration(file_path: str, crop_frames: int, gif: bool,
-                       fps: int=FRAME_RATE):
-    """Takes a video or gif file at `file_path`, and saves a file of frame_count 
-    `crop_frames` over the top of it if necessary. If frame count already equals
-    crop_frames, does nothing. Raises a ValidationError if duration is outside 
-    cropping margin FRAME_MARGIN or if cropping action fails frame accuracy."""
-    # Find media type for error raising
-    if gif: media_type = "GIF"
-    else: media_type = "Video"
-
-    try: 
-        # If frame count already matching, no need to crop
-        if validate_length(file_path, crop_frames): return
-
-        # Move the original file to a temporary location (to avoid 
-        # overwriting it during the duration cropping process)
-        tmp_path = tmp_move(file_path)
-
-        input_file = ffmpeg.input(tmp_path)
-        output_file = ffmpeg.output(input_file.trim(start_frame=0, end_frame=crop_frames), file_path)
-        ffmpeg.run(output_file)
-
-        # Reopen VideoFileClip after cropping and check successful
-        probe = ffmpeg.probe(file_path)
-        frames = int(probe['streams'][0]['nb_frames'])
-        if frames != crop_frames:
-            raise ValidationError(f"{media_type} could not successfully crop to {crop_frames} frames, got {frames} frames instead.")                
-        tmp_clean(tmp_path)
-    except Exception as e:
-        tmp_clean(tmp_path)
-        raise e
-
-def crop_image_resolution(image_path: str, crop_x: int, crop_y: int, 
-                            resolution: tuple[int, int]=RESOLUTION):
-    """
-    Crop an image's resolution, so that it can be converted to a video later
-
-    Args:
-        image_path (str): Path to the input image file.
-        crop_x (int): X-coordinate of the top-left corner to start cropping.
-        crop_y (int): Y-coordinate of the top-left corner to start cropping.
-        resolution (tuple): A tuple (width, height) indicating the crop size.
-    """
-    # Convert video to correct extension if necessary
-    extension = os.path.splitext(image_path)[-1].lower()
-    # Drop the '.'
-    extension = extension[1:]
-
-    try:
-        tmp_path = tmp_move(image_path, extension)
-        # Define the cropping filter
-        width, height = resolution
-        ffmpeg.input(tmp_path) \
-            .crop(x=crop_x, y=crop_y, width=width, height=height) \
-            .output(image_path, format='image2', pix_fmt='yuvj420p') \
-            .run(overwrite_output=True)
-    except Exception as e:
-        raise e
-    finally:
-        tmp_clean(tmp_path)
-
-def convert_video_from_image(image_path: str, output_path: str, duration: float, frame_rate: int, show_frames: int):
-    """
-    Creates a video from an image using `ffmpeg`.
-
-    Args:
-        image_path (str): Path to the input image file.
-        output_path (str): Path to save the output video file.
-        duration (float): Duration of the output video in seconds.
-        frame_rate (int): Frame rate of the output video.
-    """
-    # Using ffmpeg to create a video from the image
-    try:
-        ffmpeg.input(image_path, loop=1, t=duration) \
-              .output(output_path, vcodec='libx264', r=frame_rate, pix_fmt='yuv420p', shortest=None) \
-              .run(overwrite_output=True)
-        
-        # Get the duration of the input video
-        probe = ffmpeg.probe(output_path)
-        cropped_frames = int(probe['streams'][0]['nb_frames'])
-        if (cropped_frames < show_frames):
-            duration_to_add = (show_frames-cropped_frames) / frame_rate
-            tmp_path=tmp_move(output_path)
-            # Duplicating the frame at the end of the video
-            ffmpeg.input(tmp_path) \
-                    .filter('tpad', stop_mode='clone', stop_duration=duration_to_add) \
-                    .output(output_path, vcodec='libx264', acodec='aac') \
-                    .run(overwrite_output=True)
-            tmp_clean(tmp_path)
-            
-        if cropped_frames > show_frames:
-            cropped_output_path = tmp_move(output_path)  # Temporary path for cropped video
-
-            input_file = ffmpeg.input(cropped_output_path)
-            output_file = ffmpeg.output(input_file.trim(start_frame=0, end_frame=show_frames), output_path)
-            ffmpeg.run(output_file)
-            tmp_clean(cropped_output_path)
-        
-    except Exception as e:
-        raise e
-
-def validate_length(file_path: str, crop_frames: int):
-    """Takes a path to a video `file_path` and needed frame count `crop_frames`.
+def parse_progress(line: str, total_frames: int) -> float | None:
+    """Takes a single `line` of ffmpeg `-progress` output and returns the 
+    percentage of `total_frames` encoded so far, or None if the line doesn't 
+    report a frame number."""
+    key, _, value = line.strip().partition('=')
+    if key != 'frame' or not value.isdigit() or not total_frames: return None
+    return min(100.0, 100 * int(value) / total_frames)
+
+def run_ffmpeg(stream, total_frames: int=0, progress: Callable[[float], None]=None) -> None:
+    """Runs a compiled `ffmpeg-python` output `stream`, overwriting outputs. If
+    a `progress` callback is given, it is called with the percentage of 
+    `total_frames` encoded as ffmpeg reports it. Raises an `ffmpeg.Error` if
+    ffmpeg exits unsuccessfully."""
+    if not progress:
+        stream.run(overwrite_output=True, quiet=True)
+        return
+
+    args = stream.global_args('-progress', 'pipe:1', '-nostats').compile(overwrite_output=True)
+    # Send stderr to a file rather than a pipe, so a chatty ffmpeg can't block
+    #   while we're reading progress from stdout
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        for line in process.stdout:
+            percent = parse_progress(line, total_frames)
+            if percent is not None: progress(percent)
+        process.wait()
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise ffmpeg.Error('ffmpeg', None, stderr.read())
+
+def validate_frame_count(file_path: str, frames: int, media_type: str="Video") -> MediaInfo:
+    """Probes the video at `file_path`, raising a ValidationError unless it has
+    exactly `frames` frames. Returns the video's MediaInfo."""
+    info = probe_media(file_path)
+    if info.frames != frames:
+        raise ValidationError(f"{media_type} could not successfully crop to {frames} frames, got {info.frames} frames instead.")
+    return info
+
+def validate_length(frames: int, crop_frames: int):
+    """Takes a video's frame count `frames` and needed frame count `crop_frames`.
     Returns False if the video frame count doesn't match `crop_frames` but is
     longer than desired by less than a specified FRAME_MARGIN, and returns True
-    if frame counts match. Raises a ValidationError otherwise."""
-    probe = ffmpeg.probe(file_path)
-    frames = int(probe['streams'][0]['nb_frames'])
-    
+    if frame counts match. Raises a ValidationError otherwise."""    
     # Return True if frame counts match
     if frames == crop_frames: return True
 
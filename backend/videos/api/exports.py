@@ -0,0 +1,22 @@
+# exports.py
+#   Contains the background job handlers that build exports of a show ahead
+#   of them being downloaded: `export_show` for the full export (see 
+#   `videos.export`) and `export_atlas` for wall atlases (see `videos.atlas`).
+
+from ..atlas import cached_atlas, render_atlas
+from ..export import build_artifact, cached_artifact
+from ..models import Job
+
+def export_show(job: Job) -> None:
+    """Job handler for `Job.JobKind.EXPORT`. Builds the export of the current
+    wall of the job's show, unless it's already built."""
+    if cached_artifact(job.show): return
+    build_artifact(job.show, progress=job.set_progress)
+
+def export_atlas(job: Job) -> None:
+    """Job handler for `Job.JobKind.ATLAS`. Renders the atlas of the wall in the
+    job's params for the current wall of the job's show, unless it's already
+    rendered."""
+    wall = job.params['wall']
+    if cached_atlas(job.show, wall): return
+    render_atlas(job.show, wall, progress=job.set_progress)
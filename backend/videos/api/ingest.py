@@ -0,0 +1,293 @@
+# ingest.py
+#   Contains `ingest_upload`, the background job handler that turns an uploaded
+#   file into a show-ready video. The source is probed once, and `plan_ingest`
+#   decides every crop, trim and pad needed, so that `encode_ingest` can apply
+#   them in a single ffmpeg filter graph (a single decode and encode). Sources
+#   already in the wall's format skip encoding, and are kept as they are or
+#   trimmed / remuxed by stream copy with `copy_ingest`. With SEGMENT_ENCODE on,
+#   long encodes are split at keyframes and run in parallel (`encode_segmented`).
+#   Encodes also write the video's thumbnail sprite sheet from the same decode.
+
+from django.conf import settings
+from django.db import connection
+from rest_framework.serializers import ValidationError
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import ffmpeg
+
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from typing import Callable
+
+from .cropfile import run_ffmpeg, tmp_clean, validate_frame_count, valid_resolution
+from ..constants import FRAME_RATE, RESOLUTION, VID_EXTENSION, ENCODE_PROFILE, COPY_CODEC, COPY_PIX_FMT, \
+    INGEST_CORES, SEGMENT_ENCODE, SEGMENT_MIN_FRAMES, SPRITE_EXTENSION
+from ..helpers import clean_error_message, obj_exists
+from ..media import MediaInfo, probe_media, probe_keyframes
+from ..models import Job
+from ..sprites import sprite_output, install_sprites, render_sprites
+
+# Ways an IngestPlan turns a source into its output (see `IngestPlan.mode`)
+KEEP = 'keep'
+COPY = 'copy'
+ENCODE = 'encode'
+
+def is_still_image(mime_type: str, extension: str) -> bool:
+    """Returns whether an upload of `mime_type` with file `extension` is a
+    still image, to be looped for the show's length. GIFs are animated, so
+    are decoded as videos whatever type they were sent as."""
+    return mime_type.startswith('image/') and extension != 'gif'
+
+@dataclass
+class IngestPlan:
+    """Every change needed to turn a source file into a show-ready video."""
+    show_frames: int                    # Frame count the output must have (`show.frame_count`)
+    source_frames: int                  # Frame count of the source
+    crop: tuple[int, int] | None        # Top-left corner to crop RESOLUTION from, if cropping
+    image: bool = False                 # Source is a still image, looped for the show's length
+    conformant: bool = False            # Source already has the wall's codec, pixel format, resolution and frame rate
+    trim_safe: bool = False             # Source has no B-frames, so its tail can be cut without re-encoding
+    remux: bool = False                 # Source must be rewritten into a VID_EXTENSION container
+
+    @property
+    def trim_frames(self) -> int | None:
+        """Frame to end the source at, if it is too long."""
+        if not self.image and self.source_frames > self.show_frames: return self.show_frames
+        return None
+
+    @property
+    def pad_frames(self) -> int:
+        """Frames to hold the last source frame for, if it is too short."""
+        if self.image: return 0
+        return max(0, self.show_frames - self.source_frames)
+
+    @property
+    def mode(self) -> str:
+        """How the output is made: KEEP the source as is, COPY its stream into a
+        trimmed / remuxed file, or fully ENCODE it. Encoding is only chosen for
+        sources needing cropping, padding or conversion, so only conformant 
+        sources are kept or copied."""
+        if self.image or self.crop or self.pad_frames or not self.conformant: return ENCODE
+        if self.trim_frames: return COPY if self.trim_safe else ENCODE
+        if self.remux: return COPY
+        return KEEP
+
+def plan_ingest(info: MediaInfo, show_frames: int, crop_x: int, crop_y: int, image: bool=False,
+                remux: bool=False, resolution: tuple[int, int]=RESOLUTION, fps: int=FRAME_RATE) -> IngestPlan:
+    """Takes a source's MediaInfo `info` and returns the plan to make it exactly
+    `show_frames` long at `resolution`, cropping from (`crop_x`, `crop_y`) if
+    the source is larger. `remux` marks sources not yet in a VID_EXTENSION
+    container."""
+    if not valid_resolution(info.resolution, resolution):
+        raise ValidationError(f"Media resolution is too small. Must be at least {resolution[0]} x {resolution[1]}.")
+    crop = None if valid_resolution(info.resolution, resolution, strict=True) else (crop_x, crop_y)
+
+    # Only an exact frame rate match can be copied - near matches (e.g. 29.97)
+    #   are still accepted, but retimed by encoding
+    conformant = info.codec == COPY_CODEC and info.pix_fmt == COPY_PIX_FMT and \
+        crop is None and abs(info.fps - fps) < 0.001
+
+    source_frames = 1 if image else info.frames
+    return IngestPlan(show_frames=show_frames, source_frames=source_frames, crop=crop, image=image,
+                      conformant=conformant, trim_safe=(info.has_b_frames == 0), remux=remux)
+
+@dataclass
+class Segment:
+    """A run of output frames encoded independently of the rest of the video."""
+    start_frame: int                    # First output frame (a keyframe of the source)
+    start_time: float                   # Timestamp of that keyframe in the source, in seconds
+    frames: int                         # Output frames in the segment
+    last: bool = False                  # Final segment, which carries any trim end / padding
+
+def encode_ingest(input_path: str, out_path: str, plan: IngestPlan, progress: Callable[[float], None]=None,
+                  segment: Segment=None, threads: int=INGEST_CORES, sprite_path: str=None,
+                  resolution: tuple[int, int]=RESOLUTION, fps: int=FRAME_RATE) -> None:
+    """Encodes `input_path` to `out_path` following `plan`, as one ffmpeg run
+    with the filter graph: crop -> trim/tpad -> fps/pix_fmt normalisation.
+    Encodes just the given `segment` of the output if one is given, using up to
+    `threads` threads. If `sprite_path` is given, the output's thumbnail sprite
+    sheet is written there from the same decode. `progress` is passed on to 
+    `run_ffmpeg`."""
+    segment = segment or Segment(start_frame=0, start_time=0.0, frames=plan.show_frames, last=True)
+
+    if plan.image:
+        stream = ffmpeg.input(input_path, loop=1, framerate=fps).video
+    elif segment.start_time > 0:
+        # Seek to just before the segment's keyframe, so rounding can't land 
+        #   on the frame before it
+        stream = ffmpeg.input(input_path, ss=max(0.0, segment.start_time - 0.5 / fps)).video
+    else:
+        stream = ffmpeg.input(input_path).video
+
+    if plan.crop:
+        width, height = resolution
+        stream = stream.crop(x=plan.crop[0], y=plan.crop[1], width=width, height=height)
+    if not plan.image and (plan.trim_frames or not segment.last):
+        stream = stream.trim(start_frame=0, end_frame=segment.frames)
+    if segment.last and plan.pad_frames:
+        stream = stream.filter('tpad', stop_mode='clone', stop=plan.pad_frames)
+
+    # Retime frame-for-frame to the wall's rate (so a 29.97fps source neither
+    #   gains nor drops frames), then normalise the pixel format for playback
+    stream = stream.setpts(f'N/({fps}*TB)').filter('fps', fps).filter('format', 'yuv420p')
+
+    if sprite_path:
+        split = stream.split()
+        stream = split[0]
+        sprites = sprite_output(split[1], sprite_path, segment.frames, segment.start_frame)
+
+    output = stream.output(out_path, r=fps, threads=threads, **ENCODE_PROFILE, **{'frames:v': segment.frames})
+    if sprite_path: output = ffmpeg.merge_outputs(output, sprites)
+    run_ffmpeg(output, segment.frames, progress)
+
+def plan_segments(plan: IngestPlan, keyframes: list[tuple[int, float]], count: int,
+                  min_frames: int=SEGMENT_MIN_FRAMES) -> list[Segment]:
+    """Splits the output of `plan` into up to `count` segments of at least
+    `min_frames` frames each. Segments start at source keyframes (given as
+    (frame number, timestamp) pairs, see `probe_keyframes`) so they can be
+    decoded independently."""
+    count = max(1, min(count, plan.show_frames // min_frames))
+    # Split points must lie within the part of the source being used
+    usable = [kf for kf in keyframes if 0 < kf[0] < min(plan.show_frames, plan.source_frames)]
+
+    starts = [(0, 0.0)]
+    for i in range(1, count):
+        target = plan.show_frames * i // count
+        if not usable: break
+        nearest = min(usable, key=lambda kf: abs(kf[0] - target))
+        if nearest[0] - starts[-1][0] >= min_frames: starts.append(nearest)
+
+    ends = [frame for frame, _ in starts[1:]] + [plan.show_frames]
+    segments = [Segment(start_frame=frame, start_time=time, frames=end - frame)
+                for (frame, time), end in zip(starts, ends)]
+    segments[-1].last = True
+    return segments
+
+def encode_segmented(input_path: str, out_path: str, plan: IngestPlan, segments: list[Segment],
+                     progress: Callable[[float], None]=None, cores: int=INGEST_CORES, sprite_path: str=None) -> None:
+    """Encodes each of `segments` of `plan` in parallel, sharing `cores` between
+    them, then joins them into `out_path` by stream copy (no re-encode). 
+    Segments' sprite sheets are joined into `sprite_path`, if given. `progress`
+    is given the overall percent encoded."""
+    done = [0.0] * len(segments)
+    lock = threading.Lock()
+
+    def encode(index: int, segment: Segment, segment_path: str, segment_sprite_path: str) -> None:
+        def segment_progress(percent: float) -> None:
+            with lock:
+                done[index] = segment.frames * percent / 100
+                if progress: progress(100 * sum(done) / plan.show_frames)
+        try:
+            encode_ingest(input_path, segment_path, plan, segment_progress, segment=segment,
+                          threads=max(1, cores // len(segments)), sprite_path=segment_sprite_path)
+        finally:
+            # Each encoding thread has its own database connection (for progress)
+            connection.close()
+
+    # Each segment is its own ffmpeg process - threads just wait on them
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(out_path)) as segment_dir:
+        segment_paths = [os.path.join(segment_dir, f'{i}.{VID_EXTENSION}') for i in range(len(segments))]
+        sprite_paths = [os.path.join(segment_dir, f'{i}.{SPRITE_EXTENSION}') if sprite_path else None
+                        for i in range(len(segments))]
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            for future in [pool.submit(encode, i, *args) 
+                           for i, args in enumerate(zip(segments, segment_paths, sprite_paths))]:
+                future.result()
+
+        # Sprite sheets are plain sequences of JPEGs, so join end to end
+        if sprite_path:
+            with open(sprite_path, 'wb') as sprites:
+                for path in sprite_paths:
+                    with open(path, 'rb') as segment_sprites: shutil.copyfileobj(segment_sprites, sprites)
+
+        list_path = os.path.join(segment_dir, 'segments.txt')
+        with open(list_path, 'w') as segment_list:
+            segment_list.writelines(f"file '{path}'\n" for path in segment_paths)
+        output = ffmpeg.input(list_path, f='concat', safe=0).output(out_path, c='copy', movflags='+faststart')
+        run_ffmpeg(output)
+
+def copy_ingest(input_path: str, out_path: str, plan: IngestPlan) -> None:
+    """Writes the first `plan.show_frames` frames of `input_path`'s video stream
+    to `out_path` by stream copy, without decoding. Only valid for plans with
+    mode COPY."""
+    output = ffmpeg.input(input_path).video \
+        .output(out_path, c='copy', movflags='+faststart', **{'frames:v': plan.show_frames})
+    run_ffmpeg(output)
+
+def ingest_upload(job: Job) -> None:
+    """Job handler for `Job.JobKind.INGEST`. Crops the duration and resolution
+    of the video attached to `job`, converting it to VID_EXTENSION if needed.
+    Deletes the video and raises a ValidationError if processing fails."""
+    video = job.video
+    show = job.show
+    if not video: raise ValidationError("Uploaded video no longer exists.")
+
+    mime_type = job.params.get('mime_type', '')
+    crop_x = int(job.params.get('crop_x', 0))
+    crop_y = int(job.params.get('crop_y', 0))
+
+    source_path = video.file.path
+    extension = os.path.splitext(source_path)[-1].lower()
+    # Drop the '.'
+    extension = extension[1:]
+
+    # Output replaces the source if it is already the desired extension
+    if extension == VID_EXTENSION: out_path = source_path
+    else: out_path = os.path.splitext(source_path)[0] + '_' + str(uuid.uuid4()) + '.' + VID_EXTENSION
+    # Encode beside the output, so it can be renamed into place once checked
+    encode_path = os.path.join(os.path.dirname(out_path), f'.encoding_{uuid.uuid4()}.{VID_EXTENSION}')
+    sprite_path = os.path.join(video.thumbnail_path(), f'.encoding_{uuid.uuid4()}.{SPRITE_EXTENSION}')
+
+    try:
+        image = is_still_image(mime_type, extension)
+        if not (image or mime_type.startswith('video/') or extension == 'gif'):
+            # Cannot convert - should've already detected this via validation,
+            #   but consider this a failsafe
+            raise ValidationError("Unsupported file extension.")
+
+        # Reuse the metadata read while validating the upload, if given
+        if job.params.get('media_info'): source_info = MediaInfo.from_dict(job.params['media_info'])
+        else: source_info = probe_media(source_path)
+        plan = plan_ingest(source_info, show.frame_count, crop_x, crop_y, image=image,
+                           remux=(out_path != source_path))
+
+        if plan.mode == KEEP:
+            # Nothing is encoded, so decode just for the sprite sheet
+            render_sprites(source_path, video.sprite_path(), plan.show_frames)
+            video.set_media_info(source_info)
+            video.save()
+            return
+
+        os.makedirs(video.thumbnail_path(), exist_ok=True)
+        if plan.mode == COPY:
+            copy_ingest(source_path, encode_path, plan)
+        elif not image and SEGMENT_ENCODE and INGEST_CORES > 1 and plan.show_frames >= 2 * SEGMENT_MIN_FRAMES:
+            # Long encodes can be split between cores at the source's keyframes
+            #   (images have just the one frame, so are always encoded whole)
+            segments = plan_segments(plan, probe_keyframes(source_path), INGEST_CORES)
+            if len(segments) > 1: 
+                encode_segmented(source_path, encode_path, plan, segments, progress=job.set_progress, sprite_path=sprite_path)
+            else: encode_ingest(source_path, encode_path, plan, progress=job.set_progress, sprite_path=sprite_path)
+        else:
+            encode_ingest(source_path, encode_path, plan, progress=job.set_progress, sprite_path=sprite_path)
+        out_info = validate_frame_count(encode_path, show.frame_count, "Image" if image else "Video")
+        os.replace(encode_path, out_path)
+
+        if plan.mode == COPY: render_sprites(out_path, video.sprite_path(), show.frame_count)
+        else: install_sprites(sprite_path, video.sprite_path())
+
+        if out_path != source_path:
+            os.remove(source_path)
+            video.file.name = os.path.relpath(out_path, settings.MEDIA_ROOT)
+        video.set_media_info(out_info)
+        video.save()
+    except Exception as e:
+        tmp_clean(encode_path)
+        tmp_clean(sprite_path)
+        if os.path.exists(source_path): os.remove(source_path)
+        if obj_exists(video): video.delete()
+        raise ValidationError(f"Failed to process {extension} file: {clean_error_message(e)}")
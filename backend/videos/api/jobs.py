@@ -0,0 +1,111 @@
+# jobs.py
+#   A local worker pool for background media work, requiring no external
+#   broker. Jobs are stored as `Job` rows and handed to a process pool by id;
+#   workers report state back through the database, so any server process can
+#   answer `api/jobs/<id>/`.
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import logging
+
+from .exports import export_atlas, export_show
+from .ingest import ingest_upload
+from .previews import preview_show
+from ..constants import JOB_WORKERS
+from ..helpers import clean_error_message
+from ..models import Job, Show
+
+logger = logging.getLogger(__name__)
+
+# Handler function for each kind of job, each taking the `Job` instance
+JOB_HANDLERS = {
+    Job.JobKind.INGEST: ingest_upload,
+    Job.JobKind.EXPORT: export_show,
+    Job.JobKind.ATLAS: export_atlas,
+    Job.JobKind.PREVIEW: preview_show,
+}
+
+# Process pool for this server process, created on first use
+_executor = None
+
+def _init_worker() -> None:
+    """Sets up Django inside a freshly spawned worker process."""
+    import django
+    django.setup()
+
+def get_executor() -> ProcessPoolExecutor:
+    """Returns this process's job pool, creating it if needed. Workers are
+    spawned rather than forked so they don't inherit open database connections
+    or server state."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=get_context('spawn'),
+                                        initializer=_init_worker)
+    return _executor
+
+def run_job(job_id: int) -> None:
+    """Runs the handler for the job with id `job_id`, recording its status as it
+    goes. Failures are stored on the job rather than raised."""
+    close_old_connections()
+    job = Job.objects.select_related('show', 'video').get(pk=job_id)
+    # Clearing any error, in case the job was failed as stale while queued
+    Job.objects.filter(pk=job_id).update(status=Job.JobStatus.RUNNING, error='', updated_at=timezone.now())
+
+    try:
+        JOB_HANDLERS[job.kind](job)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        Job.objects.filter(pk=job_id).update(status=Job.JobStatus.FAILED, error=clean_error_message(e),
+                                                  updated_at=timezone.now())
+    else:
+        Job.objects.filter(pk=job_id).update(status=Job.JobStatus.DONE, progress=100, updated_at=timezone.now())
+    finally:
+        close_old_connections()
+
+def _check_finished(job_id: int, future) -> None:
+    """Marks a job failed if its worker died without recording an outcome (e.g.
+    it was killed), and drops the now-broken pool so a new one is created."""
+    global _executor
+    error = future.exception()
+    if error is None: return
+    logger.error("Worker for job %s crashed: %s", job_id, error)
+    _executor = None
+    Job.objects.filter(pk=job_id, status__in=[Job.JobStatus.QUEUED, Job.JobStatus.RUNNING]) \
+        .update(status=Job.JobStatus.FAILED, error=f"Worker crashed: {error}", updated_at=timezone.now())
+
+def fail_stale_jobs(**filters) -> int:
+    """Marks failed the queued or running jobs (matching `filters`) that haven't
+    been updated for JOB_STALE_AFTER, as their server or worker was restarted
+    or died without recording an outcome. Returns the number of jobs failed."""
+    stale = Job.objects.filter(status__in=[Job.JobStatus.QUEUED, Job.JobStatus.RUNNING],
+                               updated_at__lt=Job.stale_before(), **filters)
+    return stale.update(status=Job.JobStatus.FAILED, error="Job stopped responding.", updated_at=timezone.now())
+
+def submit_job(job: Job) -> Job:
+    """Queues `job` to run in the worker pool once the current transaction
+    commits. Runs it inline instead if JOB_WORKERS is 0. Returns the job."""
+    if JOB_WORKERS <= 0:
+        run_job(job.id)
+        job.refresh_from_db()
+        return job
+
+    def submit():
+        future = get_executor().submit(run_job, job.id)
+        future.add_done_callback(lambda f: _check_finished(job.id, f))
+    transaction.on_commit(submit)
+    return job
+
+def submit_unique_job(kind: str, show: Show, params: dict) -> Job:
+    """Queues a job of `kind` for `show` with `params` (see `submit_job`), 
+    unless an identical one is already queued or running. Identical jobs that
+    are stale (see `fail_stale_jobs`) are failed instead, so they don't block
+    new ones. Returns the job."""
+    pending = Job.objects.filter(kind=kind, show=show, params=params,
+                                 status__in=[Job.JobStatus.QUEUED, Job.JobStatus.RUNNING]) \
+        .order_by('-updated_at').first()
+    if pending and pending.updated_at >= Job.stale_before(): return pending
+    if pending: fail_stale_jobs(kind=kind, show=show, params=params)
+    return submit_job(Job.objects.create(kind=kind, show=show, params=params))
@@ -0,0 +1,17 @@
+# previews.py
+#   Contains `preview_show`, the background job handler that renders the wall
+#   preview of a show (see `videos.preview`).
+
+import os
+
+from ..models import Job
+from ..preview import preview_path, render_preview
+
+def preview_show(job: Job) -> None:
+    """Job handler for `Job.JobKind.PREVIEW`. Renders the preview of the wall
+    version in the job's params, unless the wall has changed since it was 
+    queued (a later job renders that) or it's already rendered."""
+    show = job.show
+    if show.wall_version != job.params['version']: return
+    if os.path.isfile(preview_path(show)): return
+    render_preview(show, progress=job.set_progress)
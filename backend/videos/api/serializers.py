@@ -1,16 +1,18 @@
 # videos/api/serializers.py
-from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField, SerializerMethodField, ValidationError
+from rest_framework.serializers import ListSerializer, ModelSerializer, PrimaryKeyRelatedField, SerializerMethodField, ValidationError
 
-from django.conf import settings
 from django.contrib.auth.models import User
-from moviepy.editor import VideoFileClip, ImageClip
+from django.db.models import QuerySet
 
 import os
+import uuid
 
 from .cropfile import validate_length, valid_resolution
 from ..constants import *
 from ..helpers import clean_error_message
-from ..models import Video, Show, Location
+from ..media import probe_media
+from ..uploadhandlers import StagedUploadedFile, container_matches, staging_path
+from ..models import Video, Show, Location, Job
 
 class LocationSerializer(ModelSerializer):
     video = PrimaryKeyRelatedField(queryset=Video.objects.all(), allow_null=True)
@@ -21,25 +23,99 @@ class LocationSerializer(ModelSerializer):
         read_only_fields = ['id', 'location_number', 'show']
 
 
+def query_list(value: str | None) -> set[str]:
+    """Splits a comma separated query parameter into a set of its items."""
+    return {item.strip() for item in (value or '').split(',') if item.strip()}
+
+def artist_usernames(shows) -> dict[str, str]:
+    """Returns the username of the artist of each of `shows`, keyed by their
+    `artist` (a user id), in one query."""
+    ids = {show.artist for show in shows if show.artist and str(show.artist).isdigit()}
+    if not ids: return {}
+    return {str(user_id): username for user_id, username in User.objects.filter(id__in=ids).values_list('id', 'username')}
+
+
+class ShowListSerializer(ListSerializer):
+    """Serializes many shows, looking up all their artists' usernames at once."""
+    def to_representation(self, data):
+        shows = list(data.all() if hasattr(data, 'all') else data)
+        if 'artist_username' in self.child.fields: self.child.artist_usernames = artist_usernames(shows)
+        try:
+            return super().to_representation(shows)
+        finally:
+            self.child.artist_usernames = None
+
+
 class ShowSerializer(ModelSerializer):
+    # Fields left out unless asked for, with `?fields=` or `?expand=`
+    OPTIONAL_FIELDS = {'wall'}
+    # Fields that can be asked for with `?expand=`, including `videos` in full
+    #   rather than as ids
+    EXPANDABLE_FIELDS = {'wall', 'videos'}
+
     # Include all locations for this show
     locations = LocationSerializer(many=True, read_only=False, required=False)
     artist_username = SerializerMethodField()
+    # The video id (or null) at each location, from location 1
+    wall = SerializerMethodField()
+
+    # Usernames of artists looked up ahead, when serializing many shows
+    artist_usernames = None
 
     class Meta:
         model = Show
-        fields = ['id', 'title', 'description', 'start_date', 'end_date', 'cover_image',
-                  'artist', 'videos', 'frame_count', 'status', 'locations', 'artist_username']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'title', 'description', 'start_date', 'end_date', 'cover_image', 'artist', 'videos',
+                  'frame_count', 'status', 'locations', 'artist_username', 'wall_version', 'wall']
+        read_only_fields = ['id', 'created_at', 'wall_version']
+        list_serializer_class = ShowListSerializer
+
+    @classmethod
+    def requested_fields(cls, request) -> set[str]:
+        """Returns the names of the fields to send for `request`, from its
+        `fields` and `expand` query parameters on GET requests (sparse
+        fieldsets): `fields` lists the fields to send, and `expand` adds 
+        optional fields or sends videos in full. Raises a ValidationError if 
+        any are unknown."""
+        available = set(cls.Meta.fields)
+        if request is None or request.method != 'GET': return available
+        fields = query_list(request.query_params.get('fields'))
+        expand = query_list(request.query_params.get('expand'))
+
+        unknown = fields - available
+        if unknown: raise ValidationError({'detail': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        unknown = expand - cls.EXPANDABLE_FIELDS
+        if unknown: raise ValidationError({'detail': f"Fields that can't be expanded: {', '.join(sorted(unknown))}."})
+        return (fields or available - cls.OPTIONAL_FIELDS) | expand
+
+    @classmethod
+    def prefetch(cls, queryset: QuerySet, request) -> QuerySet:
+        """Returns `queryset` of shows, prefetching the relations the fields
+        sent for `request` need, so that serializing any number of shows takes
+        a constant number of queries."""
+        fields = cls.requested_fields(request)
+        if fields & {'locations', 'wall'}: queryset = queryset.prefetch_related('locations')
+        if 'videos' in fields: queryset = queryset.prefetch_related('videos')
+        return queryset
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET': return
+        keep = self.requested_fields(request)
+        for name in set(self.fields) - keep: self.fields.pop(name)
+        if 'videos' in query_list(request.query_params.get('expand')):
+            self.fields['videos'] = VideoSerializer(many=True, read_only=True)
 
     def get_artist_username(self, obj):
-        if obj.artist:
-            try:
-                artist = User.objects.get(id=obj.artist)
-                return artist.username
-            except User.DoesNotExist:
-                return None
-        return None
+        if not obj.artist: return None
+        usernames = artist_usernames([obj]) if self.artist_usernames is None else self.artist_usernames
+        return usernames.get(str(obj.artist))
+
+    def get_wall(self, obj):
+        wall = [None] * NUM_BRICKS
+        for location in obj.locations.all():
+            if 1 <= location.location_number <= NUM_BRICKS: wall[location.location_number - 1] = location.video_id
+        return wall
 
 
 class VideoSerializer(ModelSerializer):
@@ -47,8 +123,8 @@ class VideoSerializer(ModelSerializer):
 
     class Meta:
         model = Video
-        fields = ['id', 'title', 'file', 'show']
-        read_only_fields = ['id', 'show', 'uploaded_at']
+        fields = ['id', 'title', 'file', 'show', 'width', 'height', 'fps', 'frame_count', 'file_size', 'content_hash']
+        read_only_fields = ['id', 'show', 'uploaded_at', 'width', 'height', 'fps', 'frame_count', 'file_size', 'content_hash']
 
     def get_file_url(self, obj):
         request = self.context.get('request')
@@ -75,12 +151,25 @@ class VideoSerializer(ModelSerializer):
         # Check file extensions
         file_type = file.content_type
         extension = file.name.split('.')[-1].lower()
+        # Uploads staged by StagingUploadHandler are inspected where they are
+        staged = isinstance(file, StagedUploadedFile)
+        file_path = None
         try:
-            # Store the file locally temporarily, in order to inspect it
-            file_path = os.path.join(settings.MEDIA_ROOT[:-1], file.name)
-            with open(file_path, 'wb+') as destination:
-                for chunk in file.chunks():
-                    destination.write(chunk)
+            if staged:
+                file_path = file.temporary_file_path()
+            else:
+                # Store the file locally temporarily, in order to inspect it
+                os.makedirs(staging_path(), exist_ok=True)
+                file_path = os.path.join(staging_path(), f"{uuid.uuid4()}.{extension}")
+                with open(file_path, 'wb+') as destination:
+                    for chunk in file.chunks():
+                        destination.write(chunk)
+            content_hash = file.content_hash if staged else None
+
+            # Reject files whose contents contradict their declared type
+            if staged and file.container:
+                if not container_matches(file.container, file_type):
+                    raise ValidationError(f"File contents ({file.container}) don't match its type ({file_type}).")
 
             if file_type.startswith('video/') or extension == 'gif':
                 # Keep track of if the extension is a video or gif
@@ -92,47 +181,38 @@ class VideoSerializer(ModelSerializer):
 
                 # Check video / gif file attributes
                 try:
-                    video_clip = VideoFileClip(file_path)
-                    duration = video_clip.duration
-                    resolution = video_clip.size
-                    fps = video_clip.fps
+                    info = probe_media(file_path, content_hash)
                     show_frames = show.frame_count
 
                     # Validation conditions
-                    if duration > TIME_LIMIT:
+                    if info.duration > TIME_LIMIT:
                         raise ValidationError(
                             f"{media_type} is too long. Maximum allowed duration is {TIME_LIMIT // 60} minutes.")
-                    if not valid_resolution(resolution):
+                    if not valid_resolution(info.resolution):
                         raise ValidationError(
                             f"{media_type} resolution is too small. Must be at least {RESOLUTION[0]} x {RESOLUTION[1]}.")
                     # todo - check this rounding doesn't allow inconsistent uploads...
-                    if round(fps, FRAME_DECIMAL_TOLERANCE) != FRAME_RATE:
+                    if round(info.fps, FRAME_DECIMAL_TOLERANCE) != FRAME_RATE:
                         raise ValidationError(f"{media_type} framerate must be {FRAME_RATE}fps.")
 
                     # Validate frame count separately (strict set to False; remember to crop later!)
-                    video_clip.close()
-                    validate_length(file_path, show_frames)
+                    validate_length(info.frames, show_frames)
 
                 except Exception as e:
                     raise ValidationError(f"Failed to process {media_type.lower()} file: {clean_error_message(e)}")
-                finally:
-                    video_clip.close()
 
             elif file_type.startswith('image/'):
                 # Validate image file (store source image somewhere perhaps?) - todo
                 try:
-                    image_clip = ImageClip(file_path)
-                    resolution = image_clip.size
+                    info = probe_media(file_path, content_hash)
 
                     # Validation conditions
-                    if not valid_resolution(resolution):
+                    if not valid_resolution(info.resolution):
                         raise ValidationError(
                             f"Image resolution is too small. Must be at least {RESOLUTION[0]} x {RESOLUTION[1]}.")
 
                 except Exception as e:
                     raise ValidationError(f"Failed to process image file: {clean_error_message(e)}")
-                finally:
-                    image_clip.close()
 
             # If non-valid file extension, raise an error and do not save
             else:
@@ -141,7 +221,24 @@ class VideoSerializer(ModelSerializer):
         except Exception as e:
             raise ValidationError(f"Failed to handle file: {clean_error_message(e)}")
         finally:
-            # Clean up temporary file if it exists
-            if file_path and os.path.isfile(file_path): os.remove(file_path)
+            # Clean up temporary copy if one was made
+            if not staged and file_path and os.path.isfile(file_path): os.remove(file_path)
 
-        return file
\ No newline at end of file
+        # Keep the metadata read, so the file needn't be probed again
+        self.media_info = info
+        return file
+
+
+class JobSerializer(ModelSerializer):
+    # Include the resulting video in full once the job is done
+    video = SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'error', 'show', 'video', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_video(self, obj):
+        if obj.status == Job.JobStatus.DONE and obj.video:
+            return VideoSerializer(obj.video, context=self.context).data
+        return obj.video_id
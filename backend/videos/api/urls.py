@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VideoViewSet, ShowViewSet, LocationViewSet
+from .views import VideoViewSet, ShowViewSet, LocationViewSet, JobViewSet
 from . import views
 
 
@@ -10,6 +10,9 @@ video_router.register(r'videos', VideoViewSet, basename='video')
 show_router = DefaultRouter()
 show_router.register(r'shows', ShowViewSet, basename='show')
 
+job_router = DefaultRouter()
+job_router.register(r'jobs', JobViewSet, basename='job')
+
 
 urlpatterns = [
     path('shows/<int:show_id>/assign-artist/', views.assign_artist, name='assign_artist'),
@@ -5,27 +5,62 @@ from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework import status
 from rest_framework.test import APIRequestFactory
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from moviepy.editor import VideoFileClip
 
 from PIL import Image
 from io import BytesIO
 import os
-import uuid
-import zipfile
 import shutil
 from django.views.decorators.csrf import csrf_exempt
 
-from .cropfile import crop_file_duration, crop_file_resolution, crop_clip_resolution, convert_video_from_image, crop_image_resolution, tmp_clean
-from .serializers import VideoSerializer, ShowSerializer, LocationSerializer
+from .cropfile import tmp_clean
+from .jobs import submit_job, submit_unique_job
+from .serializers import VideoSerializer, ShowSerializer, LocationSerializer, JobSerializer
 from ..constants import *
-from ..helpers import clean_error_message, obj_exists
-from ..models import Video, Show, Location
+from ..assignments import VersionConflict, apply_distribution, apply_operations, clear_unknown_videos, \
+    parse_distribution, parse_operations
+from ..atlas import atlas_layout, cached_atlas, sidecar_path
+from ..decoders import decoder_pool
+from ..export import ZipStream, build_manifest, cached_artifact, export_entries, manifest_changes
+from ..helpers import clean_error_message, ranged_file_response
+from ..layout import WALL_COLUMNS, select_locations
+from ..models import Video, Show, Location, Job, ExportManifest
+from ..mosaic import get_mosaic
+from ..preview import latest_preview
+from ..sprites import video_sprites
+from ..uploadhandlers import StagingUploadHandler
+
+def queue_export(show: Show) -> Job:
+    """Queues a background build of the export of `show`'s current wall."""
+    return submit_unique_job(Job.JobKind.EXPORT, show, {'version': show.wall_version})
+
+def queue_preview(show: Show) -> Job:
+    """Queues a background render of the preview of `show`'s current wall."""
+    return submit_unique_job(Job.JobKind.PREVIEW, show, {'version': show.wall_version})
+
+def media_url(request, path: str) -> str:
+    """Returns the absolute URL of the file at `path` inside MEDIA_ROOT."""
+    relative_path = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+    return request.build_absolute_uri(settings.MEDIA_URL + relative_path)
+
+def serialize_manifest(request, manifest: dict) -> dict:
+    """Converts an export manifest (see `build_manifest`) to response data, 
+    with URLs in place of file paths and locations as a list."""
+    data = {
+        'version': manifest['version'],
+        'blank': {'hash': manifest['blank']['hash'], 'size': manifest['blank']['size'],
+                  'url': media_url(request, manifest['blank']['path'])},
+        'locations': [{'location_number': number, 'hash': entry['hash'], 'size': entry['size'],
+                       'blank': entry['blank'], 'url': media_url(request, entry['path'])}
+                      for number, entry in manifest['locations'].items()],
+    }
+    if 'since' in manifest: data['since'] = manifest['since']
+    return data
 
 def artist_list(request):
     print("artist_list view was called")
@@ -58,6 +93,18 @@ class ShowViewSet(ModelViewSet):
     serializer_class = ShowSerializer
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
+    def get_queryset(self):
+        # Shows being sent are fetched with what they're serialized with
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'): queryset = ShowSerializer.prefetch(queryset, self.request)
+        return queryset
+
+    def perform_update(self, serializer):
+        # Build the export of shows as soon as they're approved
+        was_approved = serializer.instance.status == Show.ShowStatus.APPROVED
+        show = serializer.save()
+        if show.status == Show.ShowStatus.APPROVED and not was_approved: queue_export(show)
+
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
         old_frame_count = int(instance.frame_count)
@@ -150,19 +197,8 @@ class ShowViewSet(ModelViewSet):
     
     @action(detail=False, methods=['get', 'patch'], url_path='artist/(?P<artist>[^/.]+)')
     def artist(self, request, artist=None):
-        try:
-            shows = Show.objects.filter(artist=artist)  # Retrieve the Show instance
-
-            show_data = []
-            for show in shows:
-                data = ShowSerializer(show).data
-                data['cover_image'] = request.build_absolute_uri(show.cover_image.url) if show.cover_image else None
-                show_data.append(data)
-
-            return Response(show_data)
-
-        except Exception as e:
-            raise ValidationError({'detail': f"Show retrieval failed: {str(e)}"})
+        shows = ShowSerializer.prefetch(Show.objects.filter(artist=artist), request)
+        return Response(ShowSerializer(shows, many=True, context=self.get_serializer_context()).data)
         
     @action(detail=True, methods=['get'])
     def locations(self, request, pk=None):
@@ -196,6 +232,8 @@ class ShowViewSet(ModelViewSet):
                 serializer = LocationSerializer(show_locations, data=request.data, partial=True)
                 if serializer.is_valid():
                     serializer.save()
+                    show.refresh_from_db()
+                    queue_preview(show)
                     return Response(serializer.data)
                 else:
                     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -211,6 +249,9 @@ class ShowViewSet(ModelViewSet):
         # Set video field to None for all locations associated with the show
         show_locations = Location.objects.filter(show=show, video__isnull=False)
         updated_count = show_locations.update(video=None)
+        Show.bump_wall_version(show.id)
+        show.refresh_from_db()
+        queue_preview(show)
 
         # Serialize the updated locations
         serialized_locations = LocationSerializer(show_locations, many=True)
@@ -219,67 +260,217 @@ class ShowViewSet(ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def save_wall_distribution(self, request, pk=None):
-        print("Received wall distribution data.")
-        # Extract brickDistribution from QueryDict and transform it
+        """Sets the video of many locations at once from `brickDistribution[n]`
+        form fields (see `wall_distribution`, which takes JSON). Locations
+        given a video that doesn't exist are cleared."""
         brick_distribution = {}
         for key, value in request.data.items():
             if key.startswith('brickDistribution[') and key.endswith(']'):
-                location_number = key[len('brickDistribution['):-1]
-                video_id = value  # Since value is a list with a single element
-                brick_distribution[location_number] = video_id
-                
+                brick_distribution[key[len('brickDistribution['):-1]] = value
+
         show = self.get_object()
+        try:
+            apply_distribution(show, clear_unknown_videos(parse_distribution(brick_distribution)))
+        except ValidationError as ve:
+            raise ValidationError({'detail': clean_error_message(ve)})
 
-        for brick_loc, video_id in brick_distribution.items():
-            location_number = int(brick_loc)
+        show.refresh_from_db()
+        queue_preview(show)
+        return Response({"message": "Wall distribution saved successfully!"}, status=status.HTTP_201_CREATED)
 
-            try:
-                video = Video.objects.get(id=int(video_id))
-            except Video.DoesNotExist:
-                video = None
+    @action(detail=True, methods=['post'])
+    def wall_distribution(self, request, pk=None):
+        """Sets the video of many locations at once, from a JSON `distribution`
+        of location numbers to video ids (or null to clear them), all or 
+        nothing. Every video must belong to the show. Returns the new wall
+        `version` and the `changes` made: the location number, `previous` and
+        new `video` of each location that changed."""
+        show = self.get_object()
+        try:
+            changes = apply_distribution(show, parse_distribution(request.data.get('distribution')))
+        except ValidationError as ve:
+            raise ValidationError({'detail': clean_error_message(ve)})
+
+        show.refresh_from_db()
+        if changes: queue_preview(show)
+        return Response({'version': show.wall_version, 'changes': changes})
+
+    @action(detail=True, methods=['post'], url_path='locations/batch')
+    def batch_locations(self, request, pk=None):
+        """Applies lists of location operations as one, for editing the wall by
+        drag and drop: `assign` ({location, video} items), `clear` (location
+        numbers), `swap` and `move` ([from, to] pairs), in that order. The
+        wall `version` they were made against is required, and if the wall
+        has changed since nothing is applied and it responds 409 with the
+        current version. Returns the new `version` and only the changed
+        `locations`."""
+        show = self.get_object()
+        try:
+            version = int(request.data['version'])
+            operations = parse_operations(request.data)
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError({'detail': "The wall version the operations were made against is required."})
+        except ValidationError as ve:
+            raise ValidationError({'detail': clean_error_message(ve)})
 
-            location, created = Location.objects.update_or_create(
-                show=show,
-                location_number=location_number,
-                defaults={'video': video}
-            )
+        try:
+            changed = apply_operations(show, operations, version)
+        except VersionConflict as conflict:
+            return Response({'detail': str(conflict), 'version': conflict.version}, status=status.HTTP_409_CONFLICT)
+        except ValidationError as ve:
+            raise ValidationError({'detail': clean_error_message(ve)})
 
-        return Response({"message": "Wall distribution saved successfully!"}, status=status.HTTP_201_CREATED)
+        show.refresh_from_db()
+        if changed: queue_preview(show)
+        return Response({'version': show.wall_version, 'locations': LocationSerializer(changed, many=True).data})
+
+    @action(detail=True, methods=['get'])
+    def mosaic(self, request, pk=None):
+        """Returns one wall of the show at a frame as a single JPEG, laid out as
+        the bricks are on the wall. Takes `frame` (default 0), `wall` (west or
+        east, default west) and `scale` (size of each brick relative to 
+        RESOLUTION, up to that of a thumbnail) query parameters."""
+        show = self.get_object()
+        wall = request.query_params.get('wall', 'west')
+        try:
+            frame = int(request.query_params.get('frame', 0))
+            scale = round(float(request.query_params.get('scale', MOSAIC_SCALE)), 3)
+        except ValueError:
+            raise ValidationError({'detail': "Frame must be an integer and scale a number."})
+
+        if wall not in WALL_COLUMNS:
+            raise ValidationError({'detail': f"Wall must be one of: {', '.join(WALL_COLUMNS)}."})
+        if not 0 <= frame < show.frame_count:
+            raise ValidationError({'detail': f"Frame {frame} is outside the show's {show.frame_count} frames."})
+        if not 0 < scale <= 1 / SPRITE_SCALE:
+            raise ValidationError({'detail': f"Scale must be greater than 0 and at most {1 / SPRITE_SCALE:g}."})
+
+        return HttpResponse(get_mosaic(show, wall, frame, scale), content_type='image/jpeg')
+
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """Returns a low resolution video of both walls of the show side by side
+        in their real layout, with support for range requests. If the current
+        wall hasn't been rendered yet, queues that and sends the latest older
+        preview meanwhile (its wall version is in the X-Wall-Version header),
+        or responds 202 with the job if there is none."""
+        show = self.get_object()
+        latest = latest_preview(show)
+        if latest is None or latest[1] != show.wall_version:
+            job = queue_preview(show)
+            if latest is None: return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        path, version = latest
+        try:
+            response = ranged_file_response(request, path, content_type=f'video/{VID_EXTENSION}')
+        except FileNotFoundError:
+            # Replaced by a newer preview since
+            return Response(JobSerializer(queue_preview(show)).data, status=status.HTTP_202_ACCEPTED)
+        response['X-Wall-Version'] = version
+        return response
+
+    @action(detail=True, methods=['get'])
+    def manifest(self, request, pk=None):
+        """Returns the export manifest of the show's current wall: per location
+        number, the content hash, size and URL of its video. Empty locations 
+        are marked blank and point to the one shared blank video."""
+        show = self.get_object()
+        return Response(serialize_manifest(request, build_manifest(show)))
+
+    @action(detail=True, methods=['get'], url_path='manifest/changes')
+    def manifest_changes(self, request, pk=None):
+        """Returns the export manifest of the show's current wall, with only the
+        locations that have changed since the manifest version `since`. 
+        Responds 410 if that version was never handed out or is too old (see
+        MANIFEST_HISTORY), in which case the full manifest should be fetched
+        instead."""
+        show = self.get_object()
+        try:
+            since = int(request.query_params['since'])
+        except (KeyError, ValueError):
+            raise ValidationError({'detail': "A manifest version to get changes since is required."})
+
+        previous = ExportManifest.objects.filter(show=show, version=since).first()
+        if previous is None:
+            return Response({'detail': f"Manifest version {since} is unknown, fetch the full manifest."},
+                            status=status.HTTP_410_GONE)
+
+        return Response(serialize_manifest(request, manifest_changes(build_manifest(show), previous)))
+
+    @action(detail=True, methods=['get'])
+    def atlas(self, request, pk=None):
+        """Returns one `wall` (west or east, default west) of the show as a single
+        atlas video, every brick tiled in at full resolution. If it hasn't been
+        rendered for the current wall yet, queues that and responds 202 with
+        the job. See `atlas_layout` for where each brick is."""
+        show = self.get_object()
+        wall = request.query_params.get('wall', 'west')
+        if wall not in WALL_COLUMNS:
+            raise ValidationError({'detail': f"Wall must be one of: {', '.join(WALL_COLUMNS)}."})
+
+        path = cached_atlas(show, wall)
+        if path:
+            try:
+                return FileResponse(open(path, 'rb'), filename=f'{show.title}_{wall}_atlas.{VID_EXTENSION}')
+            except FileNotFoundError:
+                pass    # Replaced since
+        job = submit_unique_job(Job.JobKind.ATLAS, show, {'version': show.wall_version, 'wall': wall})
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], url_path='atlas/layout')
+    def atlas_sidecar(self, request, pk=None):
+        """Returns the atlas sidecar of one `wall` (west or east, default west):
+        the atlas size and, per brick, its location number, row and column on
+        the wall and pixel rectangle (x, y, width, height) in the atlas."""
+        show = self.get_object()
+        wall = request.query_params.get('wall', 'west')
+        if wall not in WALL_COLUMNS:
+            raise ValidationError({'detail': f"Wall must be one of: {', '.join(WALL_COLUMNS)}."})
+
+        path = cached_atlas(show, wall)
+        if path:
+            try:
+                return FileResponse(open(sidecar_path(path), 'rb'), content_type='application/json')
+            except FileNotFoundError:
+                pass
+        return Response(atlas_layout(wall))
 
-    # need about 1 min and you can see the download
     @action(detail=True, methods=['get'])
     def download_all_videos(self, request, pk=None):
+        """Downloads a zip of the video for every location of the show, named by
+        location number. Can be limited to one `wall` (west or east) and/or a
+        list of `locations` (e.g. 1,5,10-20) with query parameters."""
         # Get show instance
         show = get_object_or_404(Show, pk=pk)
-        locations = Location.objects.filter(show_id=show.id)
-
-        # Generate blank video if not existent
-        blank_video_path = show.blank_vid_path()
-        if not os.path.exists(blank_video_path):
-            show.generate_blank_video()
+        wall = request.query_params.get('wall')
+        try:
+            numbers = select_locations(wall, request.query_params.get('locations'))
+        except ValidationError as ve:
+            raise ValidationError({'detail': clean_error_message(ve)})
 
-        # Create zip file buffer and then create the zip file
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+        if numbers is None:
+            filename = f'{show.title}_all_videos.zip'
 
-            # Loop through all locations
-            for i in range(1, 227):
+            # Send the export already built for this version of the wall, if any
+            artifact = cached_artifact(show)
+            if artifact:
                 try:
-                    location = locations.get(location_number=i)
-                    video_path = location.video.file.path if location.video else blank_video_path
-                    # Catch the case of missing video files from backend
-                    if not os.path.exists(video_path): video_path = blank_video_path
-                # Catch the case where a Location instance is missing for a Show
-                except Location.DoesNotExist:
-                    video_path = blank_video_path
-
-                video_name = f'{i}.{VID_EXTENSION}'
-                zip_file.write(video_path, arcname=video_name)
-
-        zip_buffer.seek(0)
-        # Stream response back (instead of standard HttpResponse) to manage large file sizes
-        response = StreamingHttpResponse(zip_buffer, content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename={show.title}_all_videos.zip'
+                    return FileResponse(open(artifact, 'rb'), as_attachment=True, filename=filename,
+                                        content_type='application/zip')
+                except FileNotFoundError:
+                    pass    # Evicted since
+            # Approved shows get theirs built for next time
+            if show.status == Show.ShowStatus.APPROVED: queue_export(show)
+        else:
+            # Partial exports are always zipped as they're sent
+            filename = f'{show.title}_{wall or "selected"}_videos.zip'
+
+        # Stream the zip as it's written, so memory use doesn't grow with the 
+        #   show and the download starts straight away (with a known size)
+        zip_stream = ZipStream(export_entries(show, numbers))
+        response = StreamingHttpResponse(zip_stream, content_type='application/zip')
+        response['Content-Length'] = len(zip_stream)
+        response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
     
     @action(detail=False, methods=['get'], url_path='statuses')
@@ -302,6 +493,12 @@ class VideoViewSet(ModelViewSet):
     serializer_class = VideoSerializer
     parser_classes = (MultiPartParser, FormParser)
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream uploads once into a staging file, which is validated in place
+        #   and then renamed into storage (see StagingUploadHandler)
+        request.upload_handlers = [StagingUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def perform_destroy(self, instance: Video):
         # Delete Videos from backend when deleted online
         # Prestore important info for path deletion
@@ -325,67 +522,44 @@ class VideoViewSet(ModelViewSet):
         context['show'] = self.request.data.get('show')  # Pass the show context
         return context
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = self.perform_create(serializer)
+
+        # Respond straight away - processing continues in the background job
+        data = dict(serializer.data)
+        data['job'] = JobSerializer(job, context=self.get_serializer_context()).data
+        headers = self.get_success_headers(serializer.data)
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers=headers)
+
+    def perform_create(self, serializer) -> Job:
+        """Saves the uploaded video, and queues a job to crop and convert it.
+        Returns the queued job."""
         try:
             show_id = self.request.data.get('show')
             show = Show.objects.get(id=show_id)
-            video = serializer.save(show=show)
 
             # Get the uploaded file object from the request
             uploaded_file = self.request.FILES.get('file')
             if not uploaded_file:
-                raise ValidationError("No file uploaded.")    
-            # Get the MIME type from the uploaded file
-            mime_type = uploaded_file.content_type
-
-            # Convert video to correct extension if necessary
-            original_file_path = video.file.path
-            extension = os.path.splitext(original_file_path)[-1].lower()
-            # Drop the '.'
-            extension = extension[1:]
-
-            crop_x = int(self.request.data.get('crop_x', 0))
-            crop_y = int(self.request.data.get('crop_y', 0))
+                raise ValidationError("No file uploaded.")
+            video = serializer.save(show=show)
 
-            if extension == VID_EXTENSION:
-                try:
-                    # Crop duration and resolution if necessary
-                    crop_file_duration(original_file_path, show.frame_count, gif=False)
-                    crop_file_resolution(original_file_path, crop_x, crop_y, show.frame_count)
-                except Exception as e:
-                    # If exception occurs mid move, can crash here if missing the below check
-                    if os.path.exists(original_file_path): os.remove(original_file_path)
-                    if obj_exists(video): video.delete()
-                    raise ValidationError(f"Error cropping either duration or resolution of file type {VID_EXTENSION}: {str(e) if (len(str(e)) < 100) else 'Error message too long to display.'}")
-            # Only convert if not already the desired extension
-            elif extension != VID_EXTENSION:
-                unique_id = uuid.uuid4()
-                converted_file_path = os.path.splitext(original_file_path)[0] + '_' + str(unique_id) + '.' + VID_EXTENSION
-
-                # Attempt to save the video_clip made
-                try:
-                    # Create video clip
-                    if mime_type.startswith('video/') or extension == 'gif': 
-                        # Crop duration first if necessary
-                        crop_file_duration(original_file_path, show.frame_count, gif=(extension=='gif'))
-                        # Crop the video resolution using the provided coordinates
-                        crop_clip_resolution(original_file_path, converted_file_path, crop_x, crop_y, show.frame_count)
-                    elif mime_type.startswith('image/'):
-                        duration = show.frame_count / FRAME_RATE
-                        crop_image_resolution(original_file_path, crop_x, crop_y)
-                        convert_video_from_image(original_file_path, converted_file_path, duration, FRAME_RATE, show.frame_count)
-                    else:
-                        # Cannot convert - should've already detected this via 
-                        #   validation, but consider this a failsafe
-                        raise ValidationError("Unsupported file extension.")
-
-                    os.remove(original_file_path)
-                    video.file.name = os.path.relpath(converted_file_path, settings.MEDIA_ROOT)
-                    video.save()
-                except Exception as e:
-                    if os.path.exists(original_file_path): os.remove(original_file_path)
-                    if obj_exists(video): video.delete()
-                    raise ValidationError(f"Failed to convert {extension} to {VID_EXTENSION}: {clean_error_message(e)}")
+            job = Job.objects.create(
+                kind=Job.JobKind.INGEST,
+                show=show,
+                video=video,
+                params={
+                    # Get the MIME type from the uploaded file
+                    'mime_type': uploaded_file.content_type,
+                    'crop_x': int(self.request.data.get('crop_x', 0)),
+                    'crop_y': int(self.request.data.get('crop_y', 0)),
+                    # Metadata read during validation, reused by the job
+                    'media_info': serializer.media_info.to_dict(),
+                },
+            )
+            return submit_job(job)
 
         except ValidationError as ve:
             # Clean error message before raising it
@@ -396,51 +570,47 @@ class VideoViewSet(ModelViewSet):
     @action(detail=True, methods=['get'])
     def frame(self, request, pk=None):
         video = self.get_object()
-        # Retrieve frame number
-        frame_num = request.query_params.get('frame', 0)
-        if frame_num == None:
-            raise ValidationError({'file': f"No frame number provided."})
+        # Frames of videos still being processed would come from the raw
+        #   upload (and be cached in its sprite sheet), so aren't served yet
+        if Job.live_jobs().filter(video=video, kind=Job.JobKind.INGEST).exists():
+            return Response({'detail': "The video is still being processed."}, status=status.HTTP_409_CONFLICT)
 
         try: 
-            # Retrieve the video file path
-            video_file_path = video.file.path
-
-            # Generate thumbnail directory if it doesn't exist 
-            thumbnail_dir = video.thumbnail_path()
-            if not os.path.exists(thumbnail_dir): os.makedirs(thumbnail_dir)
-
-            thumbnail_file_path = os.path.join(thumbnail_dir, f"{frame_num}.{IMG_EXTENSION}")
-
-            # Check for and return thumbnail if it already exists
-            if os.path.exists(thumbnail_file_path):
-                with open(thumbnail_file_path, 'rb') as thumbnail:
-                    return HttpResponse(thumbnail.read(), content_type='image/jpeg')
-
-            # Load video and find timestamp
-            video_clip = VideoFileClip(video_file_path)
-            fps = video_clip.fps
-            timestamp = int(frame_num)/fps
-
-            frame = video_clip.get_frame(float(timestamp))
-
-            # Convert frame to image
-            original_image = Image.fromarray(frame)
-            image = original_image.resize((RESOLUTION[0] // 2, RESOLUTION[1] // 2))
+            # Retrieve frame number, rejecting frames outside the video if its
+            #   frame count is known
+            try:
+                frame_num = int(request.query_params.get('frame', 0))
+            except ValueError:
+                raise ValidationError({'file': "Frame number must be an integer."})
+            if video.frame_count and not 0 <= frame_num < video.frame_count:
+                raise ValidationError({'file': f"Frame {frame_num} is outside the video's {video.frame_count} frames."})
+
+            # Serve the nearest thumbnail straight from the video's sprite sheet,
+            #   unless the exact frame is asked for and it isn't on the sheet
+            sprites = video_sprites(video)
+            exact = request.query_params.get('exact', 'false').lower() in ('true', '1')
+            if not exact or sprites.tile_index(frame_num) * sprites.stride == frame_num:
+                return HttpResponse(sprites.tile(frame_num), content_type="image/jpeg")
+
+            # Decode exact frames with the pool of open decoders, so scrubbing
+            #   through a video reads on rather than seeking for every frame
+            frame = decoder_pool().read(video.file.path, frame_num, video.fps or FRAME_RATE, sprites.size)
             buffer = BytesIO()
-            image.save(buffer, format=IMG_EXTENSION.upper(), quality=1)
-
-            # Save thumbnail for future use
-            with open(thumbnail_file_path, 'wb') as thumbnail:
-                thumbnail.write(buffer.getvalue())
-
-            video_clip.close()
-
-            # Return thumbnail generated
+            Image.fromarray(frame).save(buffer, format=IMG_EXTENSION.upper(), quality=DECODED_FRAME_QUALITY)
             return HttpResponse(buffer.getvalue(), content_type="image/jpeg")
         
+        except ValidationError:
+            raise
         except Exception as e:
             raise ValidationError({'file': f"Frame retrieval failed: {str(e)}"}) 
         
+    @action(detail=False, methods=['get'])
+    def decoders(self, request):
+        """
+        Return this worker's frame decoder pool counters (for sizing the pool)
+        """
+        return Response(decoder_pool().stats())
+
     @action(detail=False, methods=['get'])
     def upload_constraints(self, request):
         """
@@ -456,6 +626,12 @@ class VideoViewSet(ModelViewSet):
         return Response(constraints)
 
 
+# View set for Job model - read only, jobs are created by the views queuing them
+class JobViewSet(ReadOnlyModelViewSet):
+    queryset = Job.objects.select_related('video')
+    serializer_class = JobSerializer
+
+
 # View set for Location model
 class LocationViewSet(ModelViewSet):
     queryset = Location.objects.all()
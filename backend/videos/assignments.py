@@ -0,0 +1,140 @@
+# videos/assignments.py
+# Changing which video plays at which location of a show, many locations at a
+#   time. Changes are validated as a whole and applied in one transaction,
+#   with a constant number of queries however many locations they touch.
+
+from django.db import transaction
+from rest_framework.serializers import ValidationError
+
+from .constants import NUM_BRICKS
+from .models import Show, Video, Location
+
+def parse_distribution(data: dict) -> dict[int, int | None]:
+    """Converts a mapping of location numbers to video ids (or null, to clear
+    the location) from a request to ints. Raises a ValidationError if any
+    location number or video id is malformed or out of range."""
+    if not isinstance(data, dict): raise ValidationError("Distribution must map location numbers to video ids.")
+    distribution = {}
+    for number, video_id in data.items():
+        try:
+            number = int(number)
+            video_id = None if video_id in (None, '', 'null') else int(video_id)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Invalid location {number!r} or video id {video_id!r}.")
+        if not 1 <= number <= NUM_BRICKS:
+            raise ValidationError(f"Location {number} is outside 1-{NUM_BRICKS}.")
+        distribution[number] = video_id
+    return distribution
+
+def check_videos(show: Show, video_ids) -> None:
+    """Raises a ValidationError unless every id in `video_ids` is a video of
+    `show`. Takes one query."""
+    video_ids = set(video_ids) - {None}
+    if not video_ids: return
+    shows = dict(Video.objects.filter(id__in=video_ids).values_list('id', 'show_id'))
+    missing = sorted(video_ids - set(shows))
+    if missing: raise ValidationError(f"Videos not found: {', '.join(map(str, missing))}.")
+    foreign = sorted(video_id for video_id, show_id in shows.items() if show_id != show.id)
+    if foreign: raise ValidationError(f"Videos not in this show: {', '.join(map(str, foreign))}.")
+
+class VersionConflict(Exception):
+    """Raised when changes are made against a wall version that is no longer
+    current, i.e. someone else has changed the wall since."""
+    def __init__(self, version: int):
+        super().__init__(f"The wall has changed since, it is now at version {version}.")
+        self.version = version
+
+def clear_unknown_videos(distribution: dict[int, int | None]) -> dict[int, int | None]:
+    """Returns `distribution` with the ids of videos that don't exist replaced
+    by None, to clear their locations. Takes one query."""
+    video_ids = set(distribution.values()) - {None}
+    known = set(Video.objects.filter(id__in=video_ids).values_list('id', flat=True)) if video_ids else set()
+    return {number: video_id if video_id in known else None for number, video_id in distribution.items()}
+
+def update_locations(show: Show, distribution: dict[int, int | None]) -> list[tuple[Location, int | None]]:
+    """Sets the video of each location number in `distribution` for `show`,
+    creating any locations the show is missing, and bumping the wall version
+    once if anything changed. Must be called in a transaction. Returns each
+    changed location with its previous video id."""
+    check_videos(show, distribution.values())
+    locations = Location.objects.select_for_update() \
+        .filter(show=show, location_number__in=distribution).order_by('location_number')
+    changed, missing = [], set(distribution)
+    for location in locations:
+        missing.discard(location.location_number)
+        video_id = distribution[location.location_number]
+        if location.video_id == video_id: continue
+        changed.append((location, location.video_id))
+        location.video_id = video_id
+
+    if changed: Location.objects.bulk_update([location for location, _ in changed], ['video'])
+    if missing:
+        created = Location.objects.bulk_create([Location(show=show, location_number=number, video_id=distribution[number])
+                                                for number in sorted(missing)])
+        changed += [(location, None) for location in created if location.video_id is not None]
+    if changed or missing: Show.bump_wall_version(show.id)
+    return sorted(changed, key=lambda change: change[0].location_number)
+
+def apply_distribution(show: Show, distribution: dict[int, int | None]) -> list[dict]:
+    """Sets the video of each location number in `distribution` (see
+    `parse_distribution`) for `show`, in one transaction. Returns the changes
+    made, as the location number, `previous` and new `video` of each changed
+    location."""
+    with transaction.atomic():
+        changed = update_locations(show, distribution)
+    return [{'location_number': location.location_number, 'previous': previous, 'video': location.video_id}
+            for location, previous in changed]
+
+def parse_operations(data: dict) -> dict[str, list]:
+    """Converts the location operations of a request to ints: `assign`, a list
+    of {location, video} (video null to clear), `clear`, a list of location
+    numbers, and `swap` and `move`, lists of [location, location] pairs. 
+    Raises a ValidationError if any are malformed."""
+    def number(value) -> int:
+        if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit() \
+                or not 1 <= int(value) <= NUM_BRICKS:
+            raise ValidationError(f"Invalid location {value!r}, locations are 1-{NUM_BRICKS}.")
+        return int(value)
+
+    def pair(value) -> tuple[int, int]:
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise ValidationError(f"Invalid location pair {value!r}, expected [location, location].")
+        return (number(value[0]), number(value[1]))
+
+    operations = {}
+    for name in ('assign', 'clear', 'swap', 'move'):
+        values = data.get(name) or []
+        if not isinstance(values, list): raise ValidationError(f"{name.capitalize()} must be a list.")
+        operations[name] = values
+    try:
+        assigned = parse_distribution({number(item['location']): item.get('video') for item in operations['assign']})
+    except (TypeError, KeyError):
+        raise ValidationError("Each assignment must have a location and a video.")
+    return {
+        'assign': list(assigned.items()),
+        'clear': [number(value) for value in operations['clear']],
+        'swap': [pair(value) for value in operations['swap']],
+        'move': [pair(value) for value in operations['move']],
+    }
+
+def apply_operations(show: Show, operations: dict[str, list], version: int) -> list[Location]:
+    """Applies location `operations` (see `parse_operations`) to `show` as 
+    one, in order: assignments, clears, swaps, then moves (a move leaves its
+    first location empty). Raises a VersionConflict, changing nothing, unless
+    the show's wall is still at `version`. Returns the changed locations."""
+    numbers = {n for n, _ in operations['assign']} | set(operations['clear'])
+    for pairs in (operations['swap'], operations['move']): numbers.update(n for pair in pairs for n in pair)
+
+    with transaction.atomic():
+        current = Show.objects.select_for_update().values_list('wall_version', flat=True).get(pk=show.pk)
+        if current != version: raise VersionConflict(current)
+
+        state = dict(Location.objects.filter(show=show, location_number__in=numbers)
+                     .values_list('location_number', 'video_id'))
+        for number, video_id in operations['assign']: state[number] = video_id
+        for number in operations['clear']: state[number] = None
+        for first, second in operations['swap']: state[first], state[second] = state[second], state[first]
+        for source, destination in operations['move']:
+            if source != destination: state[destination], state[source] = state[source], None
+        changed = update_locations(show, state)
+    return [location for location, _ in changed]
@@ -0,0 +1,96 @@
+# videos/atlas.py
+# Atlas videos: every location of a wall tiled into one large video at full
+#   RESOLUTION per brick, for players that decode one big stream better than
+#   many small ones. Bricks are packed row by row in wall order (a full size 
+#   grid with the wall's gaps would be too wide to encode), and a sidecar JSON
+#   gives the rectangle of each brick. Atlases are kept per wall version.
+
+import ffmpeg
+
+import json
+import math
+import os
+import shutil
+import tempfile
+from typing import Callable
+
+from .api.cropfile import run_ffmpeg
+from .constants import RESOLUTION, FRAME_RATE, VID_EXTENSION, ENCODE_PROFILE, ATLAS_MAX_WIDTH
+from .export import location_paths
+from .layout import wall_locations
+from .models import Show
+
+def atlas_layout(wall: str, resolution: tuple[int, int]=RESOLUTION) -> dict:
+    """Returns where each brick of `wall` sits in its atlas: the atlas size, and
+    for each location its position on the wall (row and column) and pixel
+    rectangle in the atlas. The atlas is kept close to square, within 
+    ATLAS_MAX_WIDTH."""
+    width, height = resolution
+    positions = sorted(wall_locations(wall).items(), key=lambda item: (item[1].row, item[1].column))
+    columns = max(1, min(ATLAS_MAX_WIDTH // width, math.ceil(math.sqrt(len(positions) * height / width))))
+    rows = math.ceil(len(positions) / columns)
+    bricks = [{'location_number': number, 'row': position.row, 'column': position.column,
+               'x': (i % columns) * width, 'y': (i // columns) * height, 'width': width, 'height': height}
+              for i, (number, position) in enumerate(positions)]
+    return {'wall': wall, 'width': columns * width, 'height': rows * height, 'bricks': bricks}
+
+def atlas_path(show: Show, wall: str, version: int=None) -> str:
+    """Returns the path of the atlas of `wall` of `show` at wall `version`
+    (defaulting to its current version). Its sidecar has the same name, as
+    JSON."""
+    version = show.wall_version if version is None else version
+    return os.path.join(show.atlases_path(), str(version), f'{wall}.{VID_EXTENSION}')
+
+def sidecar_path(atlas_path: str) -> str:
+    return os.path.splitext(atlas_path)[0] + '.json'
+
+def cached_atlas(show: Show, wall: str) -> str | None:
+    """Returns the path of the atlas of `wall` of `show`'s current wall if it
+    has been rendered, or None."""
+    path = atlas_path(show, wall)
+    return path if os.path.isfile(path) else None
+
+def render_atlas(show: Show, wall: str, progress: Callable[[float], None]=None) -> str | None:
+    """Renders the atlas of `wall` of `show` with ffmpeg's xstack filter (and its
+    sidecar), then removes atlases of older wall versions. Empty locations are
+    tiled with the show's blank video. `progress` is passed on to `run_ffmpeg`.
+    Returns the atlas path, or None if the wall changed while rendering (so the
+    atlas is discarded)."""
+    version = show.wall_version
+    path = atlas_path(show, wall, version)
+    layout = atlas_layout(wall)
+    paths = location_paths(show, {brick['location_number'] for brick in layout['bricks']})
+
+    # Each file is decoded once, and split between the locations playing it
+    uses = {}
+    for brick in layout['bricks']: uses.setdefault(paths[brick['location_number']], []).append(brick)
+    streams, positions = [], []
+    for file_path, bricks in uses.items():
+        stream = ffmpeg.input(file_path).video
+        split = stream.split() if len(bricks) > 1 else None
+        for i, brick in enumerate(bricks):
+            streams.append(split.stream(i) if split else stream)
+            positions.append(f"{brick['x']}_{brick['y']}")
+
+    stacked = ffmpeg.filter(streams, 'xstack', inputs=len(streams), layout='|'.join(positions), fill='black') \
+        .filter('pad', layout['width'], layout['height'], 0, 0, color='black')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(path))
+    try:
+        tmp_path = os.path.join(tmp_dir, os.path.basename(path))
+        output = stacked.output(tmp_path, r=FRAME_RATE, **ENCODE_PROFILE, **{'frames:v': show.frame_count})
+        run_ffmpeg(output, show.frame_count, progress)
+        with open(sidecar_path(tmp_path), 'w') as sidecar:
+            json.dump(layout, sidecar)
+
+        if not Show.objects.filter(pk=show.pk, wall_version=version).exists(): return None
+        os.replace(sidecar_path(tmp_path), sidecar_path(path))
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for entry in os.scandir(show.atlases_path()):
+        if entry.is_dir() and entry.name.isdigit() and int(entry.name) < version:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return path
@@ -0,0 +1,63 @@
+# videos/blank.py
+# Blank (black) videos filling empty locations on the wall. Each distinct blank
+#   is rendered once by ffmpeg into a shared cache and linked into every show
+#   that needs it.
+
+from django.conf import settings
+
+import ffmpeg
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from .constants import RESOLUTION, FRAME_RATE, ENCODE_PROFILE, VID_EXTENSION, BLANK_CACHE_PATH
+
+def blank_key(frame_count: int, resolution: tuple[int, int]=RESOLUTION, fps: int=FRAME_RATE,
+              profile: dict=ENCODE_PROFILE) -> str:
+    """Returns the cache key of a blank video: a hash of everything that
+    determines its contents, so a change of wall format never reuses a stale
+    blank."""
+    spec = json.dumps([frame_count, list(resolution), fps, profile], sort_keys=True)
+    return hashlib.sha256(spec.encode()).hexdigest()[:32]
+
+def cached_blank_path(frame_count: int) -> str:
+    """Returns the path of the shared blank video `frame_count` frames long."""
+    return os.path.join(settings.MEDIA_ROOT, BLANK_CACHE_PATH, f"{blank_key(frame_count)}.{VID_EXTENSION}")
+
+def render_blank(frame_count: int) -> str:
+    """Returns the path of the shared blank video `frame_count` frames long,
+    rendering it with ffmpeg's `color` source first if it isn't cached yet."""
+    blank_path = cached_blank_path(frame_count)
+    if os.path.isfile(blank_path): return blank_path
+
+    # Render beside the cache entry, then rename it into place, so concurrent
+    #   renders never expose (or link) a half written file
+    directory = os.path.dirname(blank_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=f".{VID_EXTENSION}", dir=directory)
+    os.close(fd)
+    try:
+        width, height = RESOLUTION
+        source = ffmpeg.input(f'color=c=black:s={width}x{height}:r={FRAME_RATE}', f='lavfi')
+        source.output(tmp_path, r=FRAME_RATE, **ENCODE_PROFILE, **{'frames:v': frame_count}) \
+            .run(overwrite_output=True, quiet=True)
+        os.replace(tmp_path, blank_path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+    return blank_path
+
+def link_blank(frame_count: int, dest_path: str) -> str:
+    """Places the shared blank video `frame_count` frames long at `dest_path`,
+    as a hardlink where possible (or a copy across filesystems). Returns
+    `dest_path`."""
+    blank_path = render_blank(frame_count)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    if os.path.lexists(dest_path): os.remove(dest_path)
+    try:
+        os.link(blank_path, dest_path)
+    except OSError:
+        shutil.copyfile(blank_path, dest_path)
+    return dest_path
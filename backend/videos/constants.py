@@ -12,9 +12,67 @@ TIME_LIMIT = 5*60               # Seconds:  5 minute cap
 VID_EXTENSION = 'mp4'           # Preferred video file extension
 IMG_EXTENSION = 'jpeg'          # Preferred video thumbnail image file extension
 
+# ENCODING
+GOP_SIZE = FRAME_RATE           # Frames:   Fixed keyframe interval of encoded videos (1 second)
+# ffmpeg output options every processed video is encoded with. The short, fixed
+#   GOP and lack of B-frames mean encoded videos can later be trimmed (or split)
+#   by stream copy rather than re-encoded
+ENCODE_PROFILE = {
+    'vcodec': 'libx264',
+    'pix_fmt': 'yuv420p',
+    'preset': 'medium',
+    'g': GOP_SIZE,
+    'keyint_min': GOP_SIZE,
+    'sc_threshold': 0,
+    'bf': 0,
+    'movflags': '+faststart',
+}
+# Codec and pixel format a source must already have to be stream copied
+COPY_CODEC = 'h264'
+COPY_PIX_FMT = 'yuv420p'
+INGEST_CORES = int(getenv('INGEST_CORES', '2'))  # CPU cores one ingest job may encode with (leave some for web workers)
+SEGMENT_ENCODE = getenv('SEGMENT_ENCODE', 'False') == 'True'   # Split long uploads into segments encoded in parallel
+SEGMENT_MIN_FRAMES = 10 * FRAME_RATE    # Frames:   Shortest segment a split upload may have
+
+# THUMBNAILS
+SPRITE_STRIDE = int(getenv('SPRITE_STRIDE', '5'))   # Frames:   Videos keep a thumbnail every this many frames
+SPRITE_SCALE = 2                # Thumbnails are RESOLUTION scaled down by this factor
+SPRITE_QUALITY = 8              # ffmpeg JPEG quality of thumbnails (2 best - 31 worst)
+SPRITE_EXTENSION = 'mjpeg'      # Sprite sheet file extension (a filmstrip of concatenated JPEGs)
+
+# FRAME DECODERS (serving exact frames of videos, per worker process)
+DECODER_POOL_SIZE = int(getenv('DECODER_POOL_SIZE', '8'))  # Most decoders kept open at once
+DECODER_POOL_MEMORY = 256 * 1024 * 1024     # Bytes:    Memory open decoders may take up (estimated)
+DECODER_MEMORY_ESTIMATE = 24 * 1024 * 1024  # Bytes:    Memory an open decoder is estimated to take up
+DECODER_IDLE_TIMEOUT = 60       # Seconds:  Decoders unused for this long are closed
+DECODER_MAX_SKIP = 2 * GOP_SIZE # Frames:   Furthest ahead a decoder reads on to, rather than seeking
+DECODED_FRAME_QUALITY = 80      # JPEG quality of decoded frames served (1 worst - 95 best)
+
+# WALL MOSAICS
+MOSAIC_SCALE = 1/8              # Default size of each brick in a wall mosaic, relative to RESOLUTION
+MOSAIC_QUALITY = 80             # JPEG quality of wall mosaics (1 worst - 95 best)
+MOSAIC_BACKGROUND = (255, 255, 255)     # RGB colour of gaps between bricks in wall mosaics
+
+# WALL PREVIEWS
+PREVIEW_SCALE = 1/16            # Size of each brick in wall preview videos, relative to RESOLUTION
+PREVIEW_WALL_GAP = 1            # Bricks:   Space left between the west and east walls in previews
+PREVIEW_CRF = 28                # x264 quality of wall previews (0 best - 51 worst)
+
+# EXPORTS
+EXPORT_CHUNK_SIZE = 1024 * 1024 # Bytes:    Size of reads (and response chunks) when streaming exports
+EXPORT_CACHE_BUDGET = int(getenv('EXPORT_CACHE_BUDGET', str(20 * 1024**3)))   # Bytes: Disk space kept exports may take up
+MANIFEST_HISTORY = 50           # Past export manifests kept per show, that changes can be asked for since
+ATLAS_MAX_WIDTH = 16384         # Pixels:   Widest atlas video (the most libx264 will encode)
+
 # OUTPUT DIRECTORIES
 SHOW_PATH = 'shows'             # Path inside settings.MEDIA_ROOT in which shows will be stored
 TMP_PATH = 'tmp'                # Path for temporarily moved files to be stored
+UPLOAD_STAGING_PATH = 'staging' # Path inside settings.MEDIA_ROOT that uploads are streamed to while being validated
+BLANK_CACHE_PATH = 'blanks'     # Path inside settings.MEDIA_ROOT where blank videos shared between shows are cached
+
+# BACKGROUND JOBS
+JOB_WORKERS = int(getenv('JOB_WORKERS', '2'))   # Worker processes (per server process) running media jobs. 0 runs jobs inline
+JOB_STALE_AFTER = int(getenv('JOB_STALE_AFTER', str(15 * 60)))  # Seconds: Queued/running jobs not updated for this long are taken to have died
 
 
 # -------------------- === !!! Advised NOT to touch !!! === --------------------
@@ -0,0 +1,153 @@
+# videos/decoders.py
+# A pool of open video decoders, so that frames requested in sequence (e.g. 
+#   while scrubbing a video) are decoded by reading on from the previous one,
+#   rather than starting ffmpeg and seeking from a keyframe every time. Each
+#   worker process has its own pool (see `decoder_pool`).
+
+from collections import OrderedDict
+import numpy as np
+import os
+import subprocess
+import threading
+import time
+
+from .constants import DECODER_POOL_SIZE, DECODER_POOL_MEMORY, DECODER_MEMORY_ESTIMATE, \
+    DECODER_IDLE_TIMEOUT, DECODER_MAX_SKIP
+
+
+class FrameReader:
+    """An ffmpeg process decoding the video at `path` from frame `start`, 
+    scaled to `size`, as raw RGB frames read from its stdout."""
+    def __init__(self, path: str, fps: float, size: tuple[int, int], start: int=0):
+        self.path, self.fps, self.size = path, fps, size
+        self.frame_bytes = size[0] * size[1] * 3
+        self.last_used = time.monotonic()
+        # Held while reading, as a reader can only serve one request at a time
+        self.lock = threading.Lock()
+        self.process = None
+        self.seek(start)
+
+    def seek(self, frame: int) -> None:
+        """Restarts decoding from frame `frame`."""
+        self.close()
+        # Seek to just before the frame, so rounding can't land on the next one
+        start = max(0.0, (frame - 0.5) / self.fps)
+        args = ['ffmpeg', '-v', 'error', '-ss', f'{start:.6f}', '-i', self.path, '-an',
+                '-vf', f'scale={self.size[0]}:{self.size[1]}', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+        self.process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.position = frame
+
+    def can_read(self, frame: int) -> bool:
+        """Returns whether `frame` can be reached by reading on (not seeking)."""
+        return self.position <= frame <= self.position + DECODER_MAX_SKIP
+
+    def read(self, frame: int) -> np.ndarray:
+        """Returns frame `frame` as a (height, width, 3) RGB array, reading on to
+        it if it's close ahead, otherwise seeking to it. Raises a ValueError if
+        the video ends before it."""
+        self.last_used = time.monotonic()
+        if not self.can_read(frame): self.seek(frame)
+        while self.position <= frame:
+            data = self.process.stdout.read(self.frame_bytes)
+            if len(data) < self.frame_bytes:
+                self.close()
+                raise ValueError(f"Frame {frame} is past the end of the video.")
+            self.position += 1
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.size[1], self.size[0], 3)
+
+    def close(self) -> None:
+        if self.process is None: return
+        self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+        # Nothing more can be read without seeking
+        self.position = float('inf')
+
+
+class DecoderPool:
+    """A least recently used pool of FrameReaders, keyed by video file (and its
+    modification time, so replaced files aren't read stale) and frame size.
+    Holds at most `max_size` readers, and only as many as fit `max_memory` by
+    estimate. Readers idle for `idle_timeout` seconds are closed as the pool is
+    next used. Counts hits (frames read on from an open reader) and misses
+    (frames needing a new reader or a seek) for sizing the pool."""
+    def __init__(self, max_size: int=DECODER_POOL_SIZE, max_memory: int=DECODER_POOL_MEMORY,
+                 idle_timeout: float=DECODER_IDLE_TIMEOUT):
+        self.max_size = max(1, min(max_size, max_memory // DECODER_MEMORY_ESTIMATE))
+        self.idle_timeout = idle_timeout
+        self.readers = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def read(self, path: str, frame: int, fps: float, size: tuple[int, int]) -> np.ndarray:
+        """Returns frame `frame` of the video at `path` (at `fps`) scaled to
+        `size`, as a (height, width, 3) RGB array."""
+        key = (path, os.stat(path).st_mtime_ns, size)
+        with self.lock:
+            self.evict_idle()
+            reader = self.readers.pop(key, None)
+            if reader and reader.can_read(frame): 
+                self.hits += 1
+            else:
+                self.misses += 1
+                if reader is None: reader = FrameReader(path, fps, size, start=frame)
+            # Most recently used readers are kept at the end
+            reader.last_used = time.monotonic()
+            self.readers[key] = reader
+            while len(self.readers) > self.max_size:
+                self.evict(next(iter(self.readers)))
+
+        with reader.lock:
+            image = reader.read(frame).copy()
+        # Close the reader if it was evicted while being read from
+        with self.lock:
+            evicted = self.readers.get(key) is not reader
+        if evicted: self.close_reader(reader)
+        return image
+
+    @staticmethod
+    def close_reader(reader: FrameReader) -> None:
+        with reader.lock:
+            reader.close()
+
+    def evict(self, key) -> None:
+        """Removes and closes the reader at `key` (with the pool locked)."""
+        self.close_reader(self.readers.pop(key))
+        self.evictions += 1
+
+    def evict_idle(self) -> None:
+        """Closes readers unused for longer than the idle timeout."""
+        now = time.monotonic()
+        for key in [key for key, reader in self.readers.items() if now - reader.last_used > self.idle_timeout]:
+            self.evict(key)
+
+    def close(self, path: str=None) -> None:
+        """Closes readers of the video at `path`, or every reader if not given."""
+        with self.lock:
+            for key in [key for key in self.readers if path is None or key[0] == path]:
+                self.close_reader(self.readers.pop(key))
+
+    def stats(self) -> dict:
+        """Returns the pool's counters and occupancy."""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'open': len(self.readers),
+                'max_size': self.max_size,
+                'memory_estimate': len(self.readers) * DECODER_MEMORY_ESTIMATE,
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def decoder_pool() -> DecoderPool:
+    """Returns this process's DecoderPool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None: _pool = DecoderPool()
+        return _pool
@@ -0,0 +1,297 @@
+# videos/export.py
+# Exports of a show's wall: one video per location number, zipped. ZIPs are
+#   written by `ZipStream` as they're sent, reading each file in chunks, so
+#   memory use stays constant however large the show is. Entries are stored
+#   (mp4 doesn't compress), so the exact size of a ZIP is known up front.
+#   Finished ZIPs ("artifacts") are kept per show and wall version, within a
+#   disk budget, so unchanged shows are only zipped once.
+
+from django.conf import settings
+
+from dataclasses import dataclass
+from functools import lru_cache
+import glob
+import logging
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Callable, Iterator
+
+from .blank import render_blank
+from .constants import VID_EXTENSION, NUM_BRICKS, EXPORT_CHUNK_SIZE, EXPORT_CACHE_BUDGET, SHOW_PATH, MANIFEST_HISTORY
+from .media import hash_file
+from .models import Show, Video, Location, ExportManifest
+
+@dataclass(frozen=True)
+class ExportEntry:
+    """A file to be exported, stored as `name`."""
+    name: str
+    path: str
+    size: int
+    mtime: float
+
+    @classmethod
+    def from_path(cls, name: str, path: str) -> 'ExportEntry':
+        stat = os.stat(path)
+        return cls(name=name, path=path, size=stat.st_size, mtime=stat.st_mtime)
+
+def location_paths(show: Show, numbers: set[int]=None) -> dict[int, str]:
+    """Returns the path of the video played at each location number of 
+    `show` (or just those in `numbers`), with the show's blank video for empty
+    locations (or missing files)."""
+    blank_video_path = show.blank_vid_path()
+    # Generate blank video if not existent
+    if not os.path.exists(blank_video_path): show.generate_blank_video()
+
+    locations = Location.objects.filter(show=show, video__isnull=False).select_related('video')
+    if numbers is not None: locations = locations.filter(location_number__in=numbers)
+    paths = {}
+    for location in locations:
+        video_path = location.video.file.path
+        # Catch the case of missing video files from backend
+        if os.path.exists(video_path): paths[location.location_number] = video_path
+    numbers = range(1, NUM_BRICKS + 1) if numbers is None else sorted(numbers)
+    return {number: paths.get(number, blank_video_path) for number in numbers}
+
+def export_entries(show: Show, numbers: set[int]=None) -> list[ExportEntry]:
+    """Returns the entries of an export of `show`, named by location number. 
+    Exports every location, or just those in `numbers` if given."""
+    return [ExportEntry.from_path(f'{number}.{VID_EXTENSION}', path) 
+            for number, path in location_paths(show, numbers).items()]
+
+def dos_datetime(timestamp: float) -> tuple[int, int]:
+    """Converts `timestamp` to the (time, date) fields of a ZIP header."""
+    t = time.localtime(max(timestamp, 315532800))   # ZIP dates start at 1980
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+class ZipStream:
+    """A stored (uncompressed) ZIP of `entries`, produced by iterating over it 
+    in chunks of at most about `chunk_size` bytes. Each entry's CRC is taken
+    as it's read and written after it (in a data descriptor), so every file is
+    only read once. Uses ZIP64 records where sizes, offsets or the number of 
+    entries need them. `len()` gives its size in bytes before anything is read."""
+    ZIP64_LIMIT = 0xFFFFFFFF        # Sizes and offsets from which ZIP64 fields are used
+    ZIP64_COUNT_LIMIT = 0xFFFF      # Entry count from which ZIP64 end records are used
+    MAX_32, MAX_16 = 0xFFFFFFFF, 0xFFFF     # Values marking a field as given in ZIP64 records
+    FLAGS = 0x0808          # Data descriptor follows each entry, names are UTF-8
+
+    def __init__(self, entries: list[ExportEntry], chunk_size: int=EXPORT_CHUNK_SIZE):
+        self.entries = entries
+        self.chunk_size = chunk_size
+
+    def zip64_entry(self, entry: ExportEntry) -> bool:
+        return entry.size >= self.ZIP64_LIMIT
+
+    def local_header(self, entry: ExportEntry) -> bytes:
+        name = entry.name.encode()
+        zip64 = self.zip64_entry(entry)
+        # Sizes follow in the data descriptor, ZIP64 ones flagged by the extra field
+        extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0) if zip64 else b''
+        time_, date = dos_datetime(entry.mtime)
+        return struct.pack('<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, self.FLAGS, 0, time_, date, 0,
+                           self.MAX_32 if zip64 else 0, self.MAX_32 if zip64 else 0,
+                           len(name), len(extra)) + name + extra
+
+    def data_descriptor(self, entry: ExportEntry, crc: int) -> bytes:
+        if self.zip64_entry(entry): return struct.pack('<IIQQ', 0x08074b50, crc, entry.size, entry.size)
+        return struct.pack('<IIII', 0x08074b50, crc, entry.size, entry.size)
+
+    def central_header(self, entry: ExportEntry, crc: int, offset: int) -> bytes:
+        name = entry.name.encode()
+        zip64_size, zip64_offset = self.zip64_entry(entry), offset >= self.ZIP64_LIMIT
+        extra_values = ([entry.size, entry.size] if zip64_size else []) + ([offset] if zip64_offset else [])
+        extra = struct.pack(f'<HH{len(extra_values)}Q', 0x0001, 8 * len(extra_values), *extra_values) \
+            if extra_values else b''
+        size = self.MAX_32 if zip64_size else entry.size
+        time_, date = dos_datetime(entry.mtime)
+        return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 45, 45 if extra else 20, self.FLAGS, 0,
+                           time_, date, crc, size, size, len(name), len(extra), 0, 0, 0, 0o100644 << 16,
+                           self.MAX_32 if zip64_offset else offset) + name + extra
+
+    def end_records(self, directory_offset: int, directory_size: int) -> bytes:
+        count = len(self.entries)
+        if not (count >= self.ZIP64_COUNT_LIMIT or directory_offset >= self.ZIP64_LIMIT
+                or directory_size >= self.ZIP64_LIMIT):
+            return struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count, count, directory_size, directory_offset, 0)
+
+        # ZIP64 end of central directory record and its locator, then the usual
+        #   end record pointing to them
+        zip64_offset = directory_offset + directory_size
+        return struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, (3 << 8) | 45, 45, 0, 0, count, count,
+                           directory_size, directory_offset) \
+            + struct.pack('<IIQI', 0x07064b50, 0, zip64_offset, 1) \
+            + struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, self.MAX_16, self.MAX_16, self.MAX_32, self.MAX_32, 0)
+
+    def __len__(self) -> int:
+        # Headers' lengths don't depend on CRCs, so use placeholders
+        offset = directory_size = 0
+        for entry in self.entries:
+            directory_size += len(self.central_header(entry, 0, offset))
+            offset += len(self.local_header(entry)) + entry.size + len(self.data_descriptor(entry, 0))
+        return offset + directory_size + len(self.end_records(offset, directory_size))
+
+    def __iter__(self) -> Iterator[bytes]:
+        offset = 0
+        directory = []
+        for entry in self.entries:
+            header = self.local_header(entry)
+            yield header
+
+            crc = 0
+            remaining = entry.size
+            with open(entry.path, 'rb') as file:
+                while remaining:
+                    chunk = file.read(min(self.chunk_size, remaining))
+                    if not chunk: raise IOError(f"{entry.path} changed size while being exported.")
+                    crc = zlib.crc32(chunk, crc)
+                    remaining -= len(chunk)
+                    yield chunk
+
+            descriptor = self.data_descriptor(entry, crc)
+            yield descriptor
+            directory.append(self.central_header(entry, crc, offset))
+            offset += len(header) + entry.size + len(descriptor)
+
+        directory = b''.join(directory)
+        yield directory
+        yield self.end_records(offset, len(directory))
+
+
+logger = logging.getLogger(__name__)
+
+def artifact_path(show: Show, version: int=None) -> str:
+    """Returns the path of the full export of `show` at wall `version` 
+    (defaulting to its current version)."""
+    version = show.wall_version if version is None else version
+    return os.path.join(show.exports_path(), f'{version}.zip')
+
+def cached_artifact(show: Show) -> str | None:
+    """Returns the path of the export of `show`'s current wall if it has been
+    built, marking it as recently used, or None."""
+    path = artifact_path(show)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+def build_artifact(show: Show, progress: Callable[[float], None]=None) -> str | None:
+    """Writes the full export of `show`'s current wall to its artifact path,
+    replacing older versions' exports and recording its manifest, then evicts
+    others past the disk budget.
+    `progress` is given the percent written. Returns the path, or None if the
+    wall changed while exporting (so the export is discarded)."""
+    version = show.wall_version
+    path = artifact_path(show, version)
+    zip_stream = ZipStream(export_entries(show))
+    total, written = len(zip_stream), 0
+
+    os.makedirs(show.exports_path(), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=show.exports_path(), suffix='.tmp', delete=False) as file:
+        try:
+            for chunk in zip_stream:
+                file.write(chunk)
+                written += len(chunk)
+                if progress: progress(100 * written / total)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+
+    if Show.objects.filter(pk=show.pk, wall_version=version).exists():
+        os.replace(file.name, path)
+        # Changes since this version can now be asked for (see `manifest_changes`)
+        build_manifest(show)
+    else:
+        logger.info("Discarding export of show %s, its wall changed while exporting", show.pk)
+        os.remove(file.name)
+        return None
+
+    for stale_path in glob.glob(os.path.join(show.exports_path(), '*.zip')):
+        if stale_path != path: os.remove(stale_path)
+    evict_artifacts(keep=path)
+    return path
+
+def evict_artifacts(budget: int=EXPORT_CACHE_BUDGET, keep: str=None) -> None:
+    """Removes the least recently used exports of all shows until they fit
+    within `budget` bytes, other than the export at `keep`."""
+    artifacts = []
+    for path in glob.glob(os.path.join(settings.MEDIA_ROOT, SHOW_PATH, '*', 'exports', '*.zip')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        artifacts.append((stat.st_mtime, stat.st_size, path))
+
+    used = sum(size for _, size, _ in artifacts)
+    keep = os.path.abspath(keep) if keep else None
+    for _, size, path in sorted(artifacts):
+        if used <= budget: break
+        if os.path.abspath(path) == keep: continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        used -= size
+
+@lru_cache(maxsize=64)
+def _cached_hash(path: str, mtime_ns: int) -> str:
+    return hash_file(path)
+
+def file_hash(path: str) -> str:
+    """Returns the content hash of the file at `path`, cached until it changes."""
+    return _cached_hash(path, os.stat(path).st_mtime_ns)
+
+def build_manifest(show: Show) -> dict:
+    """Returns the export manifest of `show`'s current wall: its version, the
+    shared blank video, and for each location number the content hash, size
+    and path of the file it plays. Empty locations are marked `blank` and
+    refer to the shared blank rather than a file of their own. The manifest is
+    recorded (see `record_manifest`) so any version it hands out can later be
+    asked for changes since."""
+    blank_path = render_blank(show.frame_count)
+    blank = {'hash': file_hash(blank_path), 'size': os.path.getsize(blank_path), 'path': blank_path}
+
+    locations = {}
+    for location in Location.objects.filter(show=show, video__isnull=False).select_related('video'):
+        video = location.video
+        if not os.path.exists(video.file.path): continue
+        # Videos stored before hashes were recorded are hashed once now 
+        #   (without marking the wall changed, as it hasn't)
+        if not video.content_hash or video.file_size is None:
+            video.content_hash, video.file_size = hash_file(video.file.path), os.path.getsize(video.file.path)
+            Video.objects.filter(pk=video.pk).update(content_hash=video.content_hash, file_size=video.file_size)
+        locations[location.location_number] = \
+            {'hash': video.content_hash, 'size': video.file_size, 'path': video.file.path, 'blank': False}
+
+    blank_entry = {'hash': blank['hash'], 'size': blank['size'], 'path': blank_path, 'blank': True}
+    manifest = {
+        'version': show.wall_version,
+        'blank': blank,
+        'locations': {number: locations.get(number, blank_entry) for number in range(1, NUM_BRICKS + 1)},
+    }
+    record_manifest(show, manifest)
+    return manifest
+
+def record_manifest(show: Show, manifest: dict) -> None:
+    """Stores the hashes of `manifest` of `show` so changes can later be asked
+    for since its version, dropping the oldest past MANIFEST_HISTORY. Versions
+    already recorded cost just one query."""
+    if ExportManifest.objects.filter(show=show, version=manifest['version']).exists(): return
+    hashes = {str(number): entry['hash'] for number, entry in manifest['locations'].items()}
+    # Ignoring conflicts, as another request may record the same version first
+    ExportManifest.objects.bulk_create([ExportManifest(show=show, version=manifest['version'], hashes=hashes)],
+                                       ignore_conflicts=True)
+    stale = ExportManifest.objects.filter(show=show).order_by('-version').values_list('id', flat=True)[MANIFEST_HISTORY:]
+    ExportManifest.objects.filter(id__in=list(stale)).delete()
+
+def manifest_changes(manifest: dict, since: ExportManifest) -> dict:
+    """Returns `manifest` with only the locations whose hashes differ from
+    those of the recorded manifest `since`."""
+    changed = {number: entry for number, entry in manifest['locations'].items()
+               if since.hashes.get(str(number)) != entry['hash']}
+    return {**manifest, 'since': since.version, 'locations': changed}
@@ -2,8 +2,17 @@
 # Helper functions for code in this videos app
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from rest_framework.serializers import ValidationError
 
+import os
+import re
+
+from .constants import EXPORT_CHUNK_SIZE
+
+# A single byte range, e.g. 'bytes=0-499', 'bytes=500-' or 'bytes=-500'
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
 def obj_exists(obj):
     """Helper function. Returns true if an object exists in a database, returns
     false if otherwise."""
@@ -28,4 +37,63 @@ def clean_error_message(error):
         return error_message
 
     # Otherwise, return it as is
-    return str(error)
\ No newline at end of file
+    return str(error)
+
+def parse_byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parses the Range `header` of a request for a file of `size` bytes into 
+    an inclusive (start, end) byte range. Returns None if the header should be
+    ignored (it's malformed, or asks for several ranges), and raises a 
+    ValueError if the range can't be satisfied."""
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '': return None
+    start, end = match.groups()
+    if start == '':
+        # Suffix range: the last `end` bytes
+        if int(end) == 0: raise ValueError("Empty suffix range.")
+        return (max(0, size - int(end)), size - 1)
+    start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end: raise ValueError("Range starts past the end of the file.")
+    return (start, end)
+
+def read_range(file, start: int, length: int, chunk_size: int=EXPORT_CHUNK_SIZE):
+    """Yields `length` bytes of `file` from `start` in chunks, then closes it."""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk: break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+def ranged_file_response(request, path: str, content_type: str):
+    """Returns a response sending the file at `path`, honouring a single byte 
+    range in the request's Range header (206, or 416 if it can't be 
+    satisfied) so that media can be streamed and seeked. The ETag changes with
+    the file, so a range is only served against the same file (If-Range)."""
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    byte_range = None
+    if header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_byte_range(header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(file, start, end - start + 1), status=206,
+                                         content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,127 @@
+# videos/layout.py
+# The physical layout of bricks on the Melbourne Connect walls, mirroring the
+#   frontend's `Constants.js`. Each wall is a grid of columns 1-47 and rows A-L,
+#   sparsely filled with bricks, named by their location number (left-to-right,
+#   then top-to-bottom). Used to render the wall server side.
+
+from rest_framework.serializers import ValidationError
+
+from dataclasses import dataclass
+
+WALL_ROWS = 'ABCDEFGHIJKL'
+# Grid columns of each wall (inclusive)
+WALL_COLUMNS = {
+    'west': (1, 26),
+    'east': (27, 47),
+}
+
+# Grid coordinate of each location number
+BRICK_COORDINATES = {
+    # -- West wall --
+    # Row A
+    'A5': 11, 'A11': 27, 'A15': 44, 'A16': 52, 'A18': 65, 'A22': 90, 'A25': 109,
+    # Row B
+    'B7': 16, 'B11': 28, 'B13': 36, 'B15': 45, 'B17': 59, 'B18': 66, 'B20': 79, 'B21': 83, 'B22': 91, 'B24': 103, 'B26': 117,
+    # Row C
+    'C4': 7, 'C5': 12, 'C10': 23, 'C12': 30, 'C13': 37, 'C16': 53, 'C21': 84, 'C23': 97, 'C24': 104, 'C25': 110,
+    # Row D
+    'D7': 17, 'D10': 24, 'D13': 38, 'D17': 60, 'D18': 67, 'D19': 73, 'D23': 98, 'D26': 118,
+    # Row E
+    'E2': 2, 'E3': 5, 'E8': 19, 'E15': 46, 'E17': 61, 'E19': 74, 'E20': 80, 'E21': 85, 'E22': 92, 'E24': 105, 'E25': 111, 'E26': 119,
+    # Row F
+    'F6': 14, 'F9': 21, 'F12': 31, 'F14': 40, 'F15': 47, 'F16': 54, 'F18': 68, 'F19': 75, 'F21': 86, 'F23': 99, 'F24': 106, 'F25': 112, 'F26': 120,
+    # Row G
+    'G1': 1, 'G3': 6, 'G4': 8, 'G7': 18, 'G11': 29, 'G14': 41, 'G16': 55, 'G17': 62, 'G18': 69, 'G20': 81, 'G22': 93, 'G25': 113,
+    # Row H
+    'H2': 3, 'H4': 9, 'H8': 20, 'H12': 32, 'H15': 48, 'H17': 63, 'H21': 87, 'H22': 94, 'H23': 100, 'H26': 121,
+    # Row I (033 sits in column 12 by the numbering, the frontend lists it as I2)
+    'I10': 25, 'I12': 33, 'I13': 39, 'I15': 49, 'I16': 56, 'I18': 70, 'I19': 76, 'I22': 95, 'I23': 101, 'I25': 114, 'I26': 122,
+    # Row J
+    'J6': 15, 'J12': 34, 'J14': 42, 'J17': 64, 'J18': 71, 'J20': 82, 'J24': 107, 'J25': 115,
+    # Row K
+    'K2': 4, 'K4': 10, 'K10': 26, 'K15': 50, 'K16': 57, 'K18': 72, 'K19': 77, 'K21': 88, 'K23': 102, 'K26': 123,
+    # Row L
+    'L5': 13, 'L9': 22, 'L12': 35, 'L14': 43, 'L15': 51, 'L16': 58, 'L19': 78, 'L21': 89, 'L22': 96, 'L24': 108, 'L25': 116,
+
+    # -- East wall --
+    # Row A
+    'A28': 126, 'A30': 137, 'A31': 144, 'A33': 159, 'A35': 172, 'A38': 190, 'A42': 210,
+    # Row B
+    'B27': 124, 'B29': 130, 'B31': 145, 'B33': 160, 'B36': 178, 'B39': 195, 'B45': 221,
+    # Row C
+    'C28': 127, 'C29': 131, 'C31': 146, 'C32': 152, 'C34': 165, 'C37': 185, 'C40': 201, 'C43': 215,
+    # Row D
+    'D28': 128, 'D30': 138, 'D32': 153, 'D34': 166, 'D35': 173, 'D37': 186, 'D39': 196, 'D41': 206, 'D44': 216,
+    # Row E
+    'E29': 132, 'E30': 139, 'E31': 147, 'E33': 161, 'E36': 179, 'E40': 202, 'E45': 222,
+    # Row F
+    'F27': 125, 'F30': 140, 'F31': 148, 'F33': 162, 'F34': 167, 'F35': 174, 'F36': 180, 'F38': 191, 'F39': 197, 'F42': 211,
+    # Row G
+    'G29': 133, 'G32': 154, 'G34': 168, 'G36': 181, 'G38': 192, 'G40': 203, 'G44': 217,
+    # Row H
+    'H28': 129, 'H30': 141, 'H32': 155, 'H34': 169, 'H35': 175, 'H37': 187, 'H40': 204, 'H42': 212, 'H46': 224,
+    # Row I
+    'I29': 134, 'I30': 142, 'I31': 149, 'I32': 156, 'I35': 176, 'I36': 182, 'I39': 198, 'I41': 207, 'I42': 213, 'I44': 218, 'I47': 225,
+    # Row J
+    'J29': 135, 'J31': 150, 'J33': 163, 'J34': 170, 'J36': 183, 'J37': 188, 'J39': 199, 'J41': 208, 'J44': 219, 'J45': 223,
+    # Row K
+    'K30': 143, 'K32': 157, 'K34': 171, 'K35': 177, 'K37': 189, 'K38': 193, 'K40': 205, 'K42': 214, 'K47': 226,
+    # Row L
+    'L29': 136, 'L31': 151, 'L32': 158, 'L33': 164, 'L36': 184, 'L38': 194, 'L39': 200, 'L41': 209, 'L44': 220,
+}
+
+@dataclass(frozen=True)
+class BrickPosition:
+    """Where a location sits: its wall, and its row and column in that wall's 
+    grid (from 0)."""
+    wall: str
+    row: int
+    column: int
+
+def parse_coordinate(coordinate: str) -> BrickPosition:
+    """Converts a grid coordinate such as 'C12' to a BrickPosition."""
+    row, column = WALL_ROWS.index(coordinate[0]), int(coordinate[1:])
+    wall = next(name for name, (first, last) in WALL_COLUMNS.items() if first <= column <= last)
+    return BrickPosition(wall=wall, row=row, column=column - WALL_COLUMNS[wall][0])
+
+# Position of each location number
+LAYOUT = {number: parse_coordinate(coordinate) for coordinate, number in BRICK_COORDINATES.items()}
+
+def wall_size(wall: str) -> tuple[int, int]:
+    """Returns the (rows, columns) of `wall`'s grid."""
+    first, last = WALL_COLUMNS[wall]
+    return (len(WALL_ROWS), last - first + 1)
+
+def wall_locations(wall: str) -> dict[int, BrickPosition]:
+    """Returns the position of each location number on `wall`."""
+    return {number: position for number, position in LAYOUT.items() if position.wall == wall}
+
+def parse_location_numbers(text: str, count: int=len(LAYOUT)) -> set[int]:
+    """Parses a comma separated list of location numbers and inclusive ranges
+    (e.g. '1,5,10-20') to a set of numbers. Raises a ValidationError if it's
+    malformed or any number is outside 1-`count`."""
+    numbers = set()
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        start, _, end = part.partition('-')
+        try:
+            start, end = int(start), int(end or start)
+        except ValueError:
+            raise ValidationError(f"'{part}' is not a location number or range.")
+        if not 1 <= start <= end <= count:
+            raise ValidationError(f"Location '{part}' is outside locations 1-{count}.")
+        numbers.update(range(start, end + 1))
+    return numbers
+
+def select_locations(wall: str=None, locations: str=None) -> set[int] | None:
+    """Returns the location numbers selected by a `wall` name and/or a
+    `locations` list (see parse_location_numbers), as those on both if both are
+    given. Returns None if neither is given (i.e. every location). Raises a
+    ValidationError for unknown walls."""
+    if wall is None and locations is None: return None
+    selected = set(LAYOUT)
+    if wall is not None:
+        if wall not in WALL_COLUMNS: raise ValidationError(f"Wall must be one of: {', '.join(WALL_COLUMNS)}.")
+        selected &= set(wall_locations(wall))
+    if locations is not None:
+        selected &= parse_location_numbers(locations)
+    return selected
@@ -0,0 +1,105 @@
+# videos/media.py
+# Media metadata for files in this videos app, read from a single ffprobe call.
+
+from rest_framework.serializers import ValidationError
+
+from dataclasses import dataclass, asdict, fields
+import ffmpeg
+
+import hashlib
+import os
+
+HASH_CHUNK_SIZE = 1024 * 1024   # Bytes read at a time when hashing files
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Everything needed to validate, plan and serve a media file, so that a
+    file only ever has to be probed once."""
+    width: int
+    height: int
+    fps: float
+    frames: int
+    codec: str
+    pix_fmt: str
+    bit_rate: int | None
+    size: int
+    content_hash: str
+    has_b_frames: int = 0       # Max B-frame reorder depth (0 means frames decode in display order)
+
+    @property
+    def resolution(self) -> tuple[int, int]:
+        return (self.width, self.height)
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds."""
+        return self.frames / self.fps if self.fps else 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MediaInfo':
+        return cls(**{field.name: data[field.name] for field in fields(cls) if field.name in data})
+
+def hash_file(file_path: str) -> str:
+    """Returns the hex sha256 digest of the file at `file_path`."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parse_rate(rate: str | None) -> float:
+    """Converts an ffprobe frame rate such as '30000/1001' to a float, returning
+    0 if it is missing or undefined."""
+    num, _, den = (rate or '0/0').partition('/')
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def probe_media(file_path: str, content_hash: str=None) -> MediaInfo:
+    """Probes the media file at `file_path` with ffprobe, returning the info of
+    its first video stream. The frame count is estimated from the duration if
+    the container doesn't record one. The file is hashed unless its
+    `content_hash` is already known. Raises a ValidationError if the file has
+    no video stream."""
+    probe = ffmpeg.probe(file_path)
+    stream = next((s for s in probe['streams'] if s.get('codec_type') == 'video'), None)
+    if stream is None: raise ValidationError("No video stream found in file.")
+    container = probe.get('format', {})
+
+    fps = parse_rate(stream.get('avg_frame_rate')) or parse_rate(stream.get('r_frame_rate'))
+    if str(stream.get('nb_frames', '')).isdigit():
+        frames = int(stream['nb_frames'])
+    else:
+        duration = float(stream.get('duration') or container.get('duration') or 0)
+        frames = round(duration * fps)
+
+    bit_rate = stream.get('bit_rate') or container.get('bit_rate')
+    return MediaInfo(
+        width=int(stream['width']),
+        height=int(stream['height']),
+        fps=fps,
+        frames=frames,
+        codec=stream.get('codec_name', ''),
+        pix_fmt=stream.get('pix_fmt', ''),
+        bit_rate=int(bit_rate) if str(bit_rate).isdigit() else None,
+        size=os.path.getsize(file_path),
+        content_hash=content_hash or hash_file(file_path),
+        has_b_frames=int(stream.get('has_b_frames') or 0),
+    )
+
+def probe_keyframes(file_path: str) -> list[tuple[int, float]]:
+    """Scans the packets of the first video stream of `file_path`, returning a
+    (frame number, timestamp in seconds) pair for each keyframe, in display
+    order. Used to split a file where it can be decoded independently."""
+    probe = ffmpeg.probe(file_path, select_streams='v:0', show_entries='packet=pts,pts_time,flags')
+    packets = [p for p in probe.get('packets', []) if str(p.get('pts', '')).lstrip('-').isdigit()]
+
+    # Packets are in decode order - rank them by timestamp to get frame numbers
+    display_order = sorted(int(p['pts']) for p in packets)
+    frame_numbers = {pts: number for number, pts in enumerate(display_order)}
+    keyframes = [(frame_numbers[int(p['pts'])], float(p['pts_time'])) for p in packets if 'K' in p.get('flags', '')]
+    return sorted(keyframes)
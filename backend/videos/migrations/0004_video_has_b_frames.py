@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_video_media_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='has_b_frames',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
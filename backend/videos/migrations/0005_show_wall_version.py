@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_video_has_b_frames'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='wall_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
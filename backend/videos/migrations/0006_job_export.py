@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_show_wall_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('ingest', 'Ingest'), ('export', 'Export')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-18 06:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_job_export'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('hashes', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('show', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifests', to='videos.show')),
+            ],
+            options={
+                'unique_together': {('show', 'version')},
+            },
+        ),
+    ]
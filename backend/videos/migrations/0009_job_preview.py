@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_job_atlas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('ingest', 'Ingest'), ('export', 'Export'), ('atlas', 'Atlas'), ('preview', 'Preview')], max_length=20),
+        ),
+    ]
@@ -1,15 +1,19 @@
 # videos/models.py
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from rest_framework.serializers import ValidationError
-from moviepy.editor import ColorClip
 
+from datetime import datetime, timedelta
 import os
 import shutil
 
-# For vid generation
-from .constants import RESOLUTION, FRAME_RATE, TIME_LIMIT, VID_EXTENSION, SHOW_PATH, NUM_BRICKS, MEDIA_PATH_MAX_LENGTH
+from .constants import FRAME_RATE, JOB_STALE_AFTER, TIME_LIMIT, VID_EXTENSION, SPRITE_EXTENSION, SHOW_PATH, NUM_BRICKS, MEDIA_PATH_MAX_LENGTH
+from .media import MediaInfo
+from .blank import link_blank
+from .decoders import decoder_pool
 
 class Show(models.Model):
     # Tagged state of a show
@@ -40,6 +44,9 @@ class Show(models.Model):
     frame_count = models.PositiveIntegerField(editable=True, validators=[MaxValueValidator(FRAME_RATE*TIME_LIMIT)])
     status = models.CharField(max_length=20, choices=ShowStatus.choices, default=ShowStatus.UNASSIGNED)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Incremented whenever what the wall plays changes (its locations, their
+    #   videos or the frame count), so renders of the wall can be cached by it
+    wall_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.title}, by {self.artist} | ({self.get_status_display()})"
@@ -50,9 +57,12 @@ class Show(models.Model):
 
         # If frame count changes, regenerate blank video...
         if self.pk:
-            old_frame_count = Show.objects.get(pk=self.pk).frame_count
-            if self.frame_count != old_frame_count:
+            old_show = Show.objects.get(pk=self.pk)
+            # Never write back a stale wall version (it's bumped by queries)
+            self.wall_version = old_show.wall_version
+            if self.frame_count != old_show.frame_count:
                 gen_blank_video_flag = True
+                self.wall_version += 1
         # ...or first time saving, generate blank video
         else: 
             gen_blank_video_flag = True
@@ -98,30 +108,18 @@ class Show(models.Model):
         # Call the parent delete method
         super().delete(*args, **kwargs)
 
+    @staticmethod
+    def bump_wall_version(show_id: int) -> None:
+        """Marks the wall of show `show_id` as changed (see `wall_version`)."""
+        Show.objects.filter(pk=show_id).update(wall_version=F('wall_version') + 1)
+
     def generate_blank_video(self, frame_count=None) -> str:
-        """Generates a blank video for a 'Show' instance using moviepy. Can take 
-        an overriding `frame_count` for blank video length if desired - leave 
-        blank to use show instances frame_count value.
+        """Places a blank video at this show's blank video path, linked from the
+        shared blank cache (see `videos.blank`) so that it's only rendered once
+        per length. Can take an overriding `frame_count` for blank video length
+        if desired - leave blank to use show instances frame_count value.
         """
-        # Output file path
-        blank_video_path = self.blank_vid_path()
-
-        # Create directory if it doesn't exist
-        directory = os.path.dirname(blank_video_path)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-
-        # Use supplied frame count if given, otherwise, self frame count
-        duration = (frame_count if frame_count else self.frame_count) / FRAME_RATE
-
-        # Generate and save video
-        black_clip = ColorClip(size=RESOLUTION, color=(0,0,0), duration=duration)
-        black_clip = black_clip.set_fps(FRAME_RATE)
-        black_clip.write_videofile(blank_video_path, codec="libx264", verbose=False)
-        black_clip.close()
-
-        # Return output file path
-        return blank_video_path
+        return link_blank(frame_count if frame_count else self.frame_count, self.blank_vid_path())
     
     def blank_vid_path(self) -> str:
         """Returns the designated path to a shows blank video"""
@@ -133,6 +131,18 @@ class Show(models.Model):
     def thumbnails_path(self) -> str:
         return os.path.join(self.show_path(), 'thumbnails')
 
+    def mosaics_path(self) -> str:
+        return os.path.join(self.show_path(), 'mosaics')
+
+    def exports_path(self) -> str:
+        return os.path.join(self.show_path(), 'exports')
+
+    def atlases_path(self) -> str:
+        return os.path.join(self.show_path(), 'atlases')
+
+    def previews_path(self) -> str:
+        return os.path.join(self.show_path(), 'previews')
+
 
 class Video(models.Model):
     def video_upload_path(instance, filename) -> str:
@@ -141,6 +151,10 @@ class Video(models.Model):
     
     def thumbnail_path(instance) -> str:
         return os.path.join(instance.show.thumbnails_path(), str(instance.id))
+
+    def sprite_path(instance) -> str:
+        """Returns the path of this video's thumbnail sprite sheet (see `videos.sprites`)"""
+        return os.path.join(instance.thumbnail_path(), f"sprite.{SPRITE_EXTENSION}")
     
     # Foreign key - show
     show = models.ForeignKey(Show, related_name='videos', on_delete=models.CASCADE)
@@ -148,21 +162,70 @@ class Video(models.Model):
     file = models.FileField(upload_to=video_upload_path, max_length=MEDIA_PATH_MAX_LENGTH)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Media metadata of `file`, stored once it has been processed (see MediaInfo)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    fps = models.FloatField(null=True, blank=True)
+    frame_count = models.PositiveIntegerField(null=True, blank=True)
+    codec = models.CharField(max_length=20, blank=True, default='')
+    pix_fmt = models.CharField(max_length=20, blank=True, default='')
+    bit_rate = models.PositiveBigIntegerField(null=True, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    has_b_frames = models.PositiveSmallIntegerField(default=0)
+
     class Meta:
         unique_together = ('show', 'file')
 
+    def set_media_info(self, info: MediaInfo) -> None:
+        """Stores MediaInfo `info` of this video's file on the instance (call 
+        save afterwards to persist it)."""
+        self.width, self.height = info.width, info.height
+        self.fps = info.fps
+        self.frame_count = info.frames
+        self.codec = info.codec
+        self.pix_fmt = info.pix_fmt
+        self.bit_rate = info.bit_rate
+        self.file_size = info.size
+        self.content_hash = info.content_hash
+        self.has_b_frames = info.has_b_frames
+
+    def media_info(self) -> MediaInfo | None:
+        """Returns the stored MediaInfo of this video's file, or None if it
+        hasn't been recorded yet."""
+        if not self.content_hash: return None
+        return MediaInfo(width=self.width, height=self.height, fps=self.fps, frames=self.frame_count,
+                         codec=self.codec, pix_fmt=self.pix_fmt, bit_rate=self.bit_rate,
+                         size=self.file_size, content_hash=self.content_hash, has_b_frames=self.has_b_frames)
+
+    # Override save method to mark the wall changed, only when what plays on
+    #   it changes (e.g. once processed) - not for new videos, other fields, or
+    #   videos that aren't at any location
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        previous = None
+        if self.pk and (update_fields is None or {'file', 'content_hash'} & set(update_fields)):
+            previous = Video.objects.filter(pk=self.pk).values_list('file', 'content_hash').first()
+        super().save(*args, **kwargs)
+        if previous is not None and previous != (self.file.name or '', self.content_hash) \
+                and self.locations.exists():
+            Show.bump_wall_version(self.show_id)
+
     # Override delete method to clear all lingering files
     def delete(self, *args, **kwargs):
-        # Delete video file
+        # Delete video file (closing any decoders still reading it)
         if self.file and os.path.isfile(self.file.path):
+            decoder_pool().close(self.file.path)
             os.remove(self.file.path)
 
         # Delete thumbnails
         thumbnail_dir = self.thumbnail_path()
         if os.path.exists(thumbnail_dir): shutil.rmtree(thumbnail_dir)
 
-        # Call the parent delete method
+        # Call the parent delete method (which also clears its locations)
+        show_id, on_wall = self.show_id, self.locations.exists()
         super().delete(*args, **kwargs)
+        if on_wall: Show.bump_wall_version(show_id)
 
     def clean(self):
         # Extra validation to ensure videos aren't set to different shows
@@ -182,6 +245,15 @@ class Location(models.Model):
     class Meta:
         unique_together = ('show', 'location_number')
 
+    # Override save and delete methods to mark the wall changed
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Show.bump_wall_version(self.show_id)
+
+    def delete(self, *args, **kwargs):
+        super().delete(*args, **kwargs)
+        Show.bump_wall_version(self.show_id)
+
     def clean(self):
         # Extra validation to ensure videos from different shows aren't set to a location
         if self.video and self.video.show != self.show:
@@ -191,3 +263,79 @@ class Location(models.Model):
         if self.pk: return f"{self.show.title}, L:{self.location_number}\
             {'' if self.video == None else f' - ({self.video.title})'}"
         else: return "Deleted Location"
+
+
+class Job(models.Model):
+    """A unit of background media work (e.g. transcoding an upload), run by the
+    local worker pool in `videos.api.jobs`. Polled via `api/jobs/<id>/`."""
+    # Type of work a job performs
+    class JobKind(models.TextChoices):
+        INGEST = 'ingest', 'Ingest'
+        EXPORT = 'export', 'Export'
+        ATLAS = 'atlas', 'Atlas'
+        PREVIEW = 'preview', 'Preview'
+
+    # Lifecycle state of a job
+    class JobStatus(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=20, choices=JobKind.choices)
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0, validators=[MaxValueValidator(100)])
+    error = models.TextField(blank=True, default='')
+    # Arguments for the job's handler (e.g. crop coordinates)
+    params = models.JSONField(default=dict, blank=True)
+
+    # Foreign keys - show, video (the resulting video once done, for ingest jobs)
+    show = models.ForeignKey(Show, related_name='jobs', on_delete=models.CASCADE)
+    video = models.ForeignKey(Video, related_name='jobs', on_delete=models.SET_NULL, null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def stale_before(cls) -> datetime:
+        """Returns the time before which a queued or running job that hasn't
+        been updated since is taken to have died with its server or worker."""
+        return timezone.now() - timedelta(seconds=JOB_STALE_AFTER)
+
+    @classmethod
+    def live_jobs(cls) -> models.QuerySet:
+        """Returns the jobs still queued or running, leaving out stale ones (see
+        `stale_before`)."""
+        return cls.objects.filter(status__in=[cls.JobStatus.QUEUED, cls.JobStatus.RUNNING],
+                                  updated_at__gte=cls.stale_before())
+
+    def set_progress(self, progress: float) -> None:
+        """Stores a new percent `progress` for the job, only touching the 
+        database if the whole percentage has changed."""
+        progress = max(0, min(100, int(progress)))
+        if progress == self.progress: return
+        self.progress = progress
+        self.updated_at = timezone.now()
+        # Updated directly (so not by auto_now), to leave other fields alone
+        Job.objects.filter(pk=self.pk).update(progress=progress, updated_at=self.updated_at)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.id} | ({self.get_status_display()})"
+
+
+class ExportManifest(models.Model):
+    """The content hash of each location's video at one wall version of a show,
+    recorded when its export manifest is first computed (see `build_manifest`),
+    so clients holding that version can later be sent just the locations that
+    have changed."""
+    show = models.ForeignKey(Show, related_name='manifests', on_delete=models.CASCADE)
+    version = models.PositiveIntegerField()
+    # Content hash per location number (JSON keys, so strings)
+    hashes = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('show', 'version')
+
+    def __str__(self):
+        return f"{self.show.title}, manifest v{self.version}"
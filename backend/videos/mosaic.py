@@ -0,0 +1,94 @@
+# videos/mosaic.py
+# Wall mosaics: a show's wall at a single frame, composited into one image in
+#   the real brick layout from each assigned video's thumbnail sprite sheet.
+#   Mosaics are cached on disk by the show's wall version, so a cached image is
+#   only reused while the wall it shows is unchanged.
+
+from PIL import Image
+
+from io import BytesIO
+import numpy as np
+import os
+import shutil
+import tempfile
+
+from .constants import RESOLUTION, IMG_EXTENSION, MOSAIC_QUALITY, MOSAIC_BACKGROUND
+from .layout import wall_size, wall_locations
+from .models import Show, Location, Job
+from .sprites import video_sprites
+
+def brick_size(scale: float) -> tuple[int, int]:
+    """Returns the (width, height) of each brick in a mosaic at `scale`."""
+    return (max(1, round(RESOLUTION[0] * scale)), max(1, round(RESOLUTION[1] * scale)))
+
+def thumbnail(video, frame: int, size: tuple[int, int]) -> np.ndarray:
+    """Returns the thumbnail of `video` nearest frame `frame` as an RGB array
+    of `size`."""
+    image = Image.open(BytesIO(video_sprites(video).tile(frame)))
+    # Let the JPEG decoder downscale as it goes where it can
+    image.draft('RGB', size)
+    return np.asarray(image.convert('RGB').resize(size))
+
+def render_mosaic(show: Show, wall: str, frame: int, scale: float) -> bytes:
+    """Renders `wall` of `show` at frame `frame` as a JPEG, with each brick
+    scaled to `scale` of RESOLUTION. Empty locations (and videos still being
+    processed) are left black."""
+    width, height = brick_size(scale)
+    rows, columns = wall_size(wall)
+    positions = wall_locations(wall)
+
+    locations = Location.objects.filter(show=show, location_number__in=positions, video__isnull=False) \
+        .select_related('video')
+    processing = set(Job.live_jobs().filter(show=show, kind=Job.JobKind.INGEST).values_list('video_id', flat=True))
+
+    # Tile 0 is the background between bricks, tile 1 a blank brick, then one
+    #   tile per distinct video on the wall
+    tiles = [np.full((height, width, 3), MOSAIC_BACKGROUND, dtype=np.uint8),
+             np.zeros((height, width, 3), dtype=np.uint8)]
+    video_tiles = {}
+    grid = np.zeros((rows, columns), dtype=np.intp)
+    for position in positions.values(): grid[position.row, position.column] = 1
+
+    for location in locations:
+        video = location.video
+        if video.id in processing: continue
+        if video.id not in video_tiles:
+            video_tiles[video.id] = len(tiles)
+            tiles.append(thumbnail(video, frame, (width, height)))
+        position = positions[location.location_number]
+        grid[position.row, position.column] = video_tiles[video.id]
+
+    # Gather every cell's tile at once, then interleave the tiles' rows so the
+    #   (rows, columns, height, width) grid becomes one image
+    cells = np.stack(tiles)[grid]
+    image = cells.transpose(0, 2, 1, 3, 4).reshape(rows * height, columns * width, 3)
+
+    buffer = BytesIO()
+    Image.fromarray(image).save(buffer, format=IMG_EXTENSION.upper(), quality=MOSAIC_QUALITY)
+    return buffer.getvalue()
+
+def mosaic_path(show: Show, wall: str, frame: int, scale: float) -> str:
+    """Returns the cache path of a mosaic of the current version of `show`."""
+    return os.path.join(show.mosaics_path(), str(show.wall_version), f"{wall}_{scale:g}_{frame}.{IMG_EXTENSION}")
+
+def get_mosaic(show: Show, wall: str, frame: int, scale: float) -> bytes:
+    """Returns the mosaic of `wall` of `show` at frame `frame` (see 
+    render_mosaic), from the cache if it has already been rendered."""
+    path = mosaic_path(show, wall, frame, scale)
+    if os.path.isfile(path):
+        with open(path, 'rb') as mosaic:
+            return mosaic.read()
+
+    mosaic = render_mosaic(show, wall, frame, scale)
+
+    # Drop mosaics of older versions of the wall, which can't be used again
+    version_dir = os.path.dirname(path)
+    os.makedirs(version_dir, exist_ok=True)
+    for entry in os.scandir(show.mosaics_path()):
+        if entry.is_dir() and entry.name.isdigit() and int(entry.name) < show.wall_version:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    with tempfile.NamedTemporaryFile(dir=version_dir, delete=False) as file:
+        file.write(mosaic)
+    os.replace(file.name, path)
+    return mosaic
@@ -0,0 +1,142 @@
+# videos/preview.py
+# Wall previews: one heavily downscaled video of both walls side by side in the
+#   real brick layout, so the composed wall can be played in a single <video>.
+#   Every video on the wall (and the blank video) is first downscaled into a
+#   small tile that is cached by its file, so after assignments change only
+#   the newly placed videos are downscaled before the tiles are restacked.
+#   Previews are kept per wall version.
+
+import ffmpeg
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable
+
+from .api.cropfile import run_ffmpeg
+from .constants import (RESOLUTION, FRAME_RATE, VID_EXTENSION, ENCODE_PROFILE, MOSAIC_BACKGROUND,
+                        PREVIEW_SCALE, PREVIEW_WALL_GAP, PREVIEW_CRF)
+from .export import location_paths
+from .layout import LAYOUT, WALL_COLUMNS
+from .models import Show
+
+def tile_size() -> tuple[int, int]:
+    """Returns the (width, height) of each brick in a preview, rounded to even
+    numbers as yuv420p needs."""
+    return tuple(max(2, 2 * round(length * PREVIEW_SCALE / 2)) for length in RESOLUTION)
+
+def preview_layout() -> dict:
+    """Returns the size of a preview and the pixel position (x, y) of each
+    location number in it. Walls keep their grid columns, left to right, with
+    PREVIEW_WALL_GAP bricks between them."""
+    width, height = tile_size()
+    offsets, column = {}, 0
+    for wall, (first, last) in WALL_COLUMNS.items():
+        offsets[wall] = column
+        column += last - first + 1 + PREVIEW_WALL_GAP
+    columns = column - PREVIEW_WALL_GAP
+    rows = max(position.row for position in LAYOUT.values()) + 1
+
+    bricks = {number: ((offsets[position.wall] + position.column) * width, position.row * height)
+              for number, position in sorted(LAYOUT.items())}
+    return {'width': columns * width, 'height': rows * height, 'bricks': bricks}
+
+def preview_path(show: Show, version: int=None) -> str:
+    """Returns the path of the preview of `show` at wall `version` (defaulting
+    to its current version)."""
+    version = show.wall_version if version is None else version
+    return os.path.join(show.previews_path(), f'{version}.{VID_EXTENSION}')
+
+def latest_preview(show: Show) -> tuple[str, int] | None:
+    """Returns the path and wall version of the newest preview of `show` that
+    has been rendered, or None."""
+    try:
+        versions = [int(name.split('.')[0]) for name in os.listdir(show.previews_path())
+                    if name.endswith(f'.{VID_EXTENSION}') and name.split('.')[0].isdigit()]
+    except FileNotFoundError:
+        return None
+    if not versions: return None
+    return preview_path(show, max(versions)), max(versions)
+
+def tile_path(show: Show, source_path: str) -> str:
+    """Returns the cache path of the preview tile of the video at
+    `source_path`, keyed by the file (and its modification) and the tile size,
+    so replaced files get new tiles."""
+    stat = os.stat(source_path)
+    key = f'{source_path}:{stat.st_mtime_ns}:{stat.st_size}:{tile_size()}:{show.frame_count}'
+    name = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return os.path.join(show.previews_path(), 'tiles', f'{name}.{VID_EXTENSION}')
+
+def render_tiles(show: Show, sources: dict[str, str], progress: Callable[[float], None]=None) -> None:
+    """Downscales each video in `sources` (path: tile path) to a preview tile,
+    in one ffmpeg run."""
+    if not sources: return
+    tiles_dir = os.path.join(show.previews_path(), 'tiles')
+    os.makedirs(tiles_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=tiles_dir)
+    try:
+        outputs = []
+        for i, (source_path, path) in enumerate(sources.items()):
+            outputs.append(ffmpeg.input(source_path).video.filter('scale', *tile_size())
+                           .output(os.path.join(tmp_dir, f'{i}.{VID_EXTENSION}'), r=FRAME_RATE, **ENCODE_PROFILE,
+                                   **{'frames:v': show.frame_count}))
+        run_ffmpeg(ffmpeg.merge_outputs(*outputs), show.frame_count, progress)
+        for i, path in enumerate(sources.values()):
+            os.replace(os.path.join(tmp_dir, f'{i}.{VID_EXTENSION}'), path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def render_preview(show: Show, progress: Callable[[float], None]=None) -> str | None:
+    """Renders the preview of `show`'s current wall: renders any missing tiles,
+    stacks them in the wall layout with ffmpeg's xstack filter, then removes
+    older previews and unused tiles. `progress` gets the percentage done.
+    Returns the preview path, or None if the wall changed while rendering (so
+    the preview is discarded)."""
+    version = show.wall_version
+    path = preview_path(show, version)
+    layout = preview_layout()
+    paths = location_paths(show, set(layout['bricks']))
+
+    tiles = {source_path: tile_path(show, source_path) for source_path in set(paths.values())}
+    missing = {source_path: tile for source_path, tile in tiles.items() if not os.path.isfile(tile)}
+    # Downscaling is most of the work, so gets most of the progress
+    share = 90 if missing else 0
+    render_tiles(show, missing, progress and (lambda percent: progress(percent * share / 100)))
+
+    # Each tile is decoded once, and split between the locations playing it
+    uses = {}
+    for number, source_path in paths.items(): uses.setdefault(tiles[source_path], []).append(number)
+    streams, positions = [], []
+    for tile, numbers in uses.items():
+        stream = ffmpeg.input(tile).video
+        split = stream.split() if len(numbers) > 1 else None
+        for i, number in enumerate(numbers):
+            streams.append(split.stream(i) if split else stream)
+            positions.append('{}_{}'.format(*layout['bricks'][number]))
+
+    background = '#{:02x}{:02x}{:02x}'.format(*MOSAIC_BACKGROUND)
+    stacked = ffmpeg.filter(streams, 'xstack', inputs=len(streams), layout='|'.join(positions), fill=background) \
+        .filter('pad', layout['width'], layout['height'], 0, 0, color=background)
+
+    os.makedirs(show.previews_path(), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=show.previews_path(), suffix=f'.{VID_EXTENSION}', delete=False) as file:
+        tmp_path = file.name
+    try:
+        output = stacked.output(tmp_path, r=FRAME_RATE, **{**ENCODE_PROFILE, 'crf': PREVIEW_CRF},
+                                **{'frames:v': show.frame_count})
+        run_ffmpeg(output, show.frame_count,
+                   progress and (lambda percent: progress(share + percent * (100 - share) / 100)))
+        if not Show.objects.filter(pk=show.pk, wall_version=version).exists(): return None
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+    # Drop older previews, and tiles of videos no longer on the wall
+    used = set(tiles.values())
+    for entry in os.scandir(show.previews_path()):
+        name = entry.name.split('.')[0]
+        if entry.is_file() and name.isdigit() and int(name) < version: os.remove(entry.path)
+    for entry in os.scandir(os.path.join(show.previews_path(), 'tiles')):
+        if entry.is_file() and entry.path not in used: os.remove(entry.path)
+    return path
@@ -0,0 +1,120 @@
+# videos/sprites.py
+# Thumbnail sprite sheets of videos. A video's sheet is a filmstrip of small
+#   JPEG frames, taken every SPRITE_STRIDE frames while the video is encoded,
+#   with a JSON index of where each tile starts. Thumbnails are then served by
+#   slicing them out of the memory-mapped sheet, without decoding the video.
+
+import ffmpeg
+
+from functools import lru_cache
+import json
+import math
+import mmap
+import os
+import tempfile
+
+from .api.cropfile import run_ffmpeg
+from .constants import RESOLUTION, SPRITE_STRIDE, SPRITE_SCALE, SPRITE_QUALITY
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+
+def tile_size(resolution: tuple[int, int]=RESOLUTION, scale: int=SPRITE_SCALE) -> tuple[int, int]:
+    """Returns the (width, height) of a thumbnail tile."""
+    return (resolution[0] // scale, resolution[1] // scale)
+
+def tile_count(frames: int, stride: int=SPRITE_STRIDE, start_frame: int=0) -> int:
+    """Returns how many of the `frames` frames from `start_frame` onwards land
+    on a multiple of `stride`, i.e. are kept as tiles."""
+    return math.ceil((start_frame + frames) / stride) - math.ceil(start_frame / stride)
+
+def index_path(sheet_path: str) -> str:
+    """Returns the path of the index of the sprite sheet at `sheet_path`."""
+    return os.path.splitext(sheet_path)[0] + '.json'
+
+def sprite_output(stream, sheet_path: str, frames: int=None, start_frame: int=0, stride: int=SPRITE_STRIDE):
+    """Returns an ffmpeg output writing every `stride`th frame of the filter 
+    `stream` to a sprite sheet at `sheet_path`. `start_frame` is the frame
+    number of the stream's first frame (for segments of a video), so tiles fall
+    on the same frames however the video is split."""
+    width, height = tile_size()
+    stream = stream.filter('select', f'not(mod(n+{start_frame},{stride}))').filter('scale', width, height)
+    options = {'q:v': SPRITE_QUALITY}
+    if frames is not None: options['frames:v'] = tile_count(frames, stride, start_frame)
+    return stream.output(sheet_path, f='mjpeg', vcodec='mjpeg', fps_mode='passthrough', **options)
+
+def install_sprites(tmp_path: str, sheet_path: str, stride: int=SPRITE_STRIDE) -> None:
+    """Indexes the sprite sheet written to `tmp_path`, then moves it (and its
+    index) into place at `sheet_path`."""
+    offsets = [0]
+    if os.path.getsize(tmp_path):
+        with open(tmp_path, 'rb') as sheet, mmap.mmap(sheet.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Entropy coded JPEG data never contains an end marker (0xFF bytes
+            #   in it are stuffed), so each one ends a tile
+            while (end := data.find(JPEG_END, offsets[-1])) != -1:
+                if data[offsets[-1]:offsets[-1] + 2] != JPEG_START: raise ValueError("Malformed sprite sheet.")
+                offsets.append(end + len(JPEG_END))
+
+    width, height = tile_size()
+    index = {'stride': stride, 'width': width, 'height': height, 'offsets': offsets}
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(sheet_path), suffix='.json', delete=False) as file:
+        json.dump(index, file)
+    os.replace(tmp_path, sheet_path)
+    os.replace(file.name, index_path(sheet_path))
+
+def render_sprites(video_path: str, sheet_path: str, frames: int=None) -> None:
+    """Writes the sprite sheet of the video at `video_path` to `sheet_path` by
+    decoding it. For videos that weren't encoded (so had no sheet made for 
+    them) on ingest."""
+    os.makedirs(os.path.dirname(sheet_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.sprite', dir=os.path.dirname(sheet_path))
+    os.close(fd)
+    try:
+        run_ffmpeg(sprite_output(ffmpeg.input(video_path).video, tmp_path, frames))
+        install_sprites(tmp_path, sheet_path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+@lru_cache(maxsize=256)
+def read_index(path: str, mtime_ns: int) -> dict:
+    """Reads a sprite sheet index, cached until the file at `path` changes."""
+    with open(path) as file:
+        return json.load(file)
+
+
+class SpriteSheet:
+    """A video's sprite sheet, read from `sheet_path`. Raises FileNotFoundError
+    if it hasn't been made."""
+    def __init__(self, sheet_path: str):
+        path = index_path(sheet_path)
+        index = read_index(path, os.stat(path).st_mtime_ns)
+        self.sheet_path = sheet_path
+        self.stride = index['stride']
+        self.size = (index['width'], index['height'])
+        self.offsets = index['offsets']
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def tile_index(self, frame: int) -> int:
+        """Returns the index of the tile nearest to frame `frame`."""
+        return max(0, min(len(self) - 1, round(frame / self.stride)))
+
+    def tile(self, frame: int) -> bytes:
+        """Returns the JPEG thumbnail nearest to frame `frame`."""
+        if not len(self): raise ValueError("Sprite sheet has no tiles.")
+        index = self.tile_index(frame)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        # Map the sheet rather than reading it, so only the tile's pages are
+        #   loaded. It isn't kept open, so the video's files can still be deleted
+        with open(self.sheet_path, 'rb') as sheet, mmap.mmap(sheet.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[start:end]
+
+def video_sprites(video) -> SpriteSheet:
+    """Returns the sprite sheet of Video `video`. Videos ingested before sprite
+    sheets existed have theirs made on first use."""
+    try:
+        return SpriteSheet(video.sprite_path())
+    except FileNotFoundError:
+        render_sprites(video.file.path, video.sprite_path(), video.frame_count)
+        return SpriteSheet(video.sprite_path())
@@ -0,0 +1,198 @@
+from rest_framework.test import APIClient, APITestCase
+from django.test import override_settings
+from django.urls import reverse
+
+import shutil
+import tempfile
+
+from ..models import Show, Video, Location
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class WallDistributionTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=5)
+        self.videos = [Video.objects.create(show=self.show, title=f"Clip {i}", file=f'clip{i}.mp4') for i in range(3)]
+        self.show.refresh_from_db()
+        self.url = reverse('show-wall-distribution', kwargs={'pk': self.show.id})
+
+    def tearDown(self):
+        self.show.delete()
+
+    def video_at(self, location_number: int) -> int | None:
+        return Location.objects.get(show=self.show, location_number=location_number).video_id
+
+    def test_full_wall_in_constant_queries(self):
+        """
+        Test that assigning every location takes as many queries as assigning
+        a few, and that the changes made are returned.
+        """
+        distribution = {n: self.videos[n % 3].id for n in range(1, 227)}
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, {'distribution': {1: self.videos[1].id}}, format='json')
+        with self.assertNumQueries(10):
+            response = self.client.post(self.url, {'distribution': distribution}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['changes']), 225)
+        self.assertNotIn(1, [change['location_number'] for change in response.data['changes']])
+        self.assertEqual(response.data['changes'][0], {'location_number': 2, 'previous': None,
+                                                       'video': self.videos[2].id})
+        self.assertEqual(self.video_at(100), self.videos[1].id)
+        self.assertEqual(response.data['version'], Show.objects.get(pk=self.show.id).wall_version)
+
+        response = self.client.post(self.url, {'distribution': {'100': None, '101': self.videos[2].id}}, format='json')
+        self.assertEqual(response.data['changes'], [{'location_number': 100, 'previous': self.videos[1].id, 'video': None}])
+
+    def test_invalid_distribution_changes_nothing(self):
+        """
+        Test that unknown videos, videos of other shows and locations off the 
+        wall are rejected without applying any of the distribution.
+        """
+        other = Show.objects.create(title="Other Show", frame_count=5)
+        try:
+            foreign = Video.objects.create(show=other, title="Elsewhere", file='elsewhere.mp4')
+            for distribution in ({1: self.videos[0].id, 2: foreign.id}, {1: self.videos[0].id, 2: 99999},
+                                 {1: self.videos[0].id, 500: None}, {'one': self.videos[0].id}):
+                response = self.client.post(self.url, {'distribution': distribution}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIsNone(self.video_at(1))
+        finally:
+            other.delete()
+
+    def test_form_distribution(self):
+        """
+        Test that the form based save_wall_distribution still applies a
+        distribution.
+        """
+        url = reverse('show-save-wall-distribution', kwargs={'pk': self.show.id})
+        response = self.client.post(url, {'brickDistribution[3]': self.videos[1].id, 'brickDistribution[4]': ''})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.video_at(3), self.videos[1].id)
+
+    def test_form_distribution_clears_unknown_videos(self):
+        """
+        Test that the form based save_wall_distribution clears locations given
+        videos that don't exist, as it always has, but still refuses videos of
+        other shows.
+        """
+        url = reverse('show-save-wall-distribution', kwargs={'pk': self.show.id})
+        Location.objects.filter(show=self.show, location_number=3).update(video=self.videos[0])
+        response = self.client.post(url, {'brickDistribution[3]': 99999, 'brickDistribution[4]': self.videos[1].id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((self.video_at(3), self.video_at(4)), (None, self.videos[1].id))
+
+        other = Show.objects.create(title="Other Show", frame_count=5)
+        try:
+            foreign = Video.objects.create(show=other, title="Elsewhere", file='elsewhere.mp4')
+            response = self.client.post(url, {'brickDistribution[5]': foreign.id})
+            self.assertEqual(response.status_code, 400)
+            self.assertIsNone(self.video_at(5))
+        finally:
+            other.delete()
+
+    def test_missing_locations_created(self):
+        """
+        Test that locations a show is missing are created when given a video.
+        """
+        Location.objects.filter(show=self.show, location_number__in=[7, 8]).delete()
+        version = Show.objects.get(pk=self.show.id).wall_version
+        response = self.client.post(self.url, {'distribution': {7: self.videos[2].id, 8: None}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((self.video_at(7), self.video_at(8)), (self.videos[2].id, None))
+        self.assertEqual(response.data['changes'], [{'location_number': 7, 'previous': None, 'video': self.videos[2].id}])
+        self.assertGreater(response.data['version'], version)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BatchLocationTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=5)
+        self.videos = [Video.objects.create(show=self.show, title=f"Clip {i}", file=f'clip{i}.mp4') for i in range(3)]
+        for number, video in ((1, self.videos[0]), (2, self.videos[1]), (3, self.videos[2])):
+            Location.objects.filter(show=self.show, location_number=number).update(video=video)
+        self.show.refresh_from_db()
+        self.url = reverse('show-batch-locations', kwargs={'pk': self.show.id})
+
+    def tearDown(self):
+        self.show.delete()
+
+    def wall(self, *numbers) -> list[int | None]:
+        videos = dict(Location.objects.filter(show=self.show).values_list('location_number', 'video_id'))
+        return [videos[number] for number in numbers]
+
+    def test_operations_applied_together(self):
+        """
+        Test that assignments, clears, swaps and moves are applied in order,
+        returning only the changed locations and the new version.
+        """
+        a, b, c = (video.id for video in self.videos)
+        response = self.client.post(self.url, {
+            'version': self.show.wall_version,
+            'assign': [{'location': 10, 'video': c}],
+            'clear': [3],
+            'swap': [[1, 2]],
+            'move': [[10, 11], [5, 6]],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.wall(1, 2, 3, 10, 11), [b, a, None, None, c])
+        self.assertEqual(sorted(location['location_number'] for location in response.data['locations']), [1, 2, 3, 11])
+        self.show.refresh_from_db()
+        self.assertEqual(response.data['version'], self.show.wall_version)
+
+    def test_stale_version_conflicts(self):
+        """
+        Test that operations made against an older wall version are refused
+        with the current version, changing nothing.
+        """
+        version = self.show.wall_version
+        self.client.post(self.url, {'version': version, 'clear': [1]}, format='json')
+        response = self.client.post(self.url, {'version': version, 'swap': [[2, 3]]}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.show.refresh_from_db()
+        self.assertEqual(response.data['version'], self.show.wall_version)
+        self.assertEqual(self.wall(2, 3), [self.videos[1].id, self.videos[2].id])
+
+    def test_invalid_operations_rejected(self):
+        """
+        Test that malformed operations, or a missing version, are rejected.
+        """
+        version = self.show.wall_version
+        for data in ({'clear': [1]}, {'version': version, 'swap': [[1]]}, {'version': version, 'clear': [0]},
+                     {'version': version, 'assign': [{'location': 1, 'video': 99999}]}):
+            self.assertEqual(self.client.post(self.url, data, format='json').status_code, 400)
+        self.assertEqual(self.wall(1), [self.videos[0].id])
+
+    def test_video_edits_off_the_wall_keep_version(self):
+        """
+        Test that editing videos in ways that don't change the wall (titles,
+        new or unplaced videos) doesn't conflict with batches, while changing
+        the file of a placed video does.
+        """
+        version = self.show.wall_version
+        self.videos[0].title = "Renamed"
+        self.videos[0].save()
+        unplaced = Video.objects.create(show=self.show, title="Unplaced", file='unplaced.mp4')
+        unplaced.file.name = 'unplaced_processed.mp4'
+        unplaced.save()
+        response = self.client.post(self.url, {'version': version, 'swap': [[1, 2]]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.wall(1, 2), [self.videos[1].id, self.videos[0].id])
+
+        version = response.data['version']
+        self.videos[2].file.name = 'clip2_processed.mp4'
+        self.videos[2].save()
+        self.show.refresh_from_db()
+        self.assertEqual(self.show.wall_version, version + 1)
+        response = self.client.post(self.url, {'version': version, 'clear': [1]}, format='json')
+        self.assertEqual(response.status_code, 409)
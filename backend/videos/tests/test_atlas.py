@@ -0,0 +1,91 @@
+from rest_framework.test import APIClient, APITestCase
+from django.http import FileResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+import ffmpeg
+
+import json
+import shutil
+import tempfile
+
+from ..atlas import atlas_layout, cached_atlas, render_atlas, sidecar_path
+from ..constants import RESOLUTION, ATLAS_MAX_WIDTH
+from ..layout import wall_locations
+from ..models import Show, Location, Job
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+
+
+class AtlasLayoutTests(SimpleTestCase):
+    def test_bricks_tile_atlas(self):
+        """
+        Test that every brick of a wall gets its own full size tile, in wall 
+        order, inside an atlas no wider than the encoder allows.
+        """
+        for wall in ('west', 'east'):
+            layout = atlas_layout(wall)
+            bricks = layout['bricks']
+            self.assertEqual({b['location_number'] for b in bricks}, set(wall_locations(wall)))
+            self.assertLessEqual(layout['width'], ATLAS_MAX_WIDTH)
+            self.assertEqual([(b['row'], b['column']) for b in bricks], sorted((b['row'], b['column']) for b in bricks))
+
+            rects = {(b['x'], b['y']) for b in bricks}
+            self.assertEqual(len(rects), len(bricks))
+            for brick in bricks:
+                self.assertEqual((brick['width'], brick['height']), RESOLUTION)
+                self.assertLessEqual(brick['x'] + brick['width'], layout['width'])
+                self.assertLessEqual(brick['y'] + brick['height'], layout['height'])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AtlasRenderTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=3)
+
+    def tearDown(self):
+        self.show.delete()
+
+    def test_render_atlas(self):
+        """
+        Test that the atlas has the show's frames at the layout's size, with
+        its sidecar, and is served until the wall changes.
+        """
+        path = render_atlas(self.show, 'east')
+        self.assertEqual(path, cached_atlas(self.show, 'east'))
+        layout = atlas_layout('east')
+        frames, _ = ffmpeg.input(path).output('pipe:', f='rawvideo', pix_fmt='gray').run(capture_stdout=True, quiet=True)
+        self.assertEqual(len(frames), 3 * layout['width'] * layout['height'])
+        with open(sidecar_path(path)) as sidecar:
+            self.assertEqual(json.load(sidecar), layout)
+
+        response = self.client.get(reverse('show-atlas', kwargs={'pk': self.show.id}), {'wall': 'east'})
+        self.assertIsInstance(response, FileResponse)
+        response.close()
+
+        Location.objects.get(show=self.show, location_number=30).save()
+        self.show.refresh_from_db()
+        self.assertIsNone(cached_atlas(self.show, 'east'))
+
+    def test_missing_atlas_is_queued(self):
+        """
+        Test that asking for an atlas that isn't rendered queues one job for
+        it, and that the layout is available meanwhile.
+        """
+        url = reverse('show-atlas', kwargs={'pk': self.show.id})
+        for _ in range(2):
+            response = self.client.get(url, {'wall': 'west'})
+            self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(show=self.show, kind=Job.JobKind.ATLAS)
+        self.assertEqual(job.params, {'version': self.show.wall_version, 'wall': 'west'})
+        self.assertEqual(response.data['id'], job.id)
+
+        response = self.client.get(reverse('show-atlas-sidecar', kwargs={'pk': self.show.id}), {'wall': 'west'})
+        self.assertEqual(response.data, atlas_layout('west'))
+        self.assertEqual(self.client.get(url, {'wall': 'north'}).status_code, 400)
@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase, override_settings
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from ..blank import blank_key, link_blank, render_blank
+from ..constants import RESOLUTION
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BlankVideoTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_key_depends_on_spec(self):
+        """
+        Test that blanks are keyed by everything determining their contents.
+        """
+        self.assertEqual(blank_key(90), blank_key(90))
+        self.assertNotEqual(blank_key(90), blank_key(91))
+        self.assertNotEqual(blank_key(90), blank_key(90, resolution=(RESOLUTION[0] * 2, RESOLUTION[1] * 2)))
+        self.assertNotEqual(blank_key(90), blank_key(90, fps=25))
+
+    def test_blank_has_exact_frames(self):
+        """
+        Test that a rendered blank has exactly the requested number of frames.
+        """
+        blank_path = render_blank(7)
+        frames = subprocess.run(['ffmpeg', '-v', 'error', '-i', blank_path, '-f', 'framemd5', '-'],
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(sum(line.startswith('0,') for line in frames.splitlines()), 7)
+
+    def test_blank_is_shared(self):
+        """
+        Test that shows needing the same blank are linked to one cached file,
+        which is only rendered once.
+        """
+        first = link_blank(5, os.path.join(MEDIA_ROOT, 'shows', '1', 'blank.mp4'))
+        cached_mtime = os.stat(render_blank(5)).st_mtime_ns
+        second = link_blank(5, os.path.join(MEDIA_ROOT, 'shows', '2', 'blank.mp4'))
+
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertTrue(os.path.samefile(first, render_blank(5)))
+        self.assertEqual(os.stat(render_blank(5)).st_mtime_ns, cached_mtime)
+
+        # Removing a show's blank leaves the cache intact
+        os.remove(first)
+        self.assertTrue(os.path.isfile(second))
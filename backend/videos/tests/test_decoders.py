@@ -0,0 +1,101 @@
+from django.test import SimpleTestCase
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from ..decoders import DecoderPool
+from ..constants import DECODER_MAX_SKIP, DECODER_MEMORY_ESTIMATE
+
+SIZE = (64, 36)
+FRAMES = 30
+
+
+class DecoderPoolTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dir = tempfile.mkdtemp()
+        # Videos whose frames get brighter by 8 levels each frame
+        cls.videos = [os.path.join(cls.dir, f'{i}.mp4') for i in range(3)]
+        for path in cls.videos:
+            subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 
+                            f"color=black:s={SIZE[0]}x{SIZE[1]}:r=30,geq=lum='N*8':cb=128:cr=128",
+                            '-frames:v', str(FRAMES), '-g', '10', '-pix_fmt', 'yuv420p', path], check=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.pool = DecoderPool()
+
+    def tearDown(self):
+        self.pool.close()
+
+    def assertFrame(self, image, frame: int):
+        """Asserts `image` is frame `frame` of a test video, by its brightness."""
+        self.assertEqual(image.shape, (SIZE[1], SIZE[0], 3))
+        # Luma of 8 per frame, expanded from limited range RGB
+        self.assertAlmostEqual(image.mean(), max(0, (frame * 8 - 16) * 255 / 219), delta=3)
+
+    def test_reads_exact_frames(self):
+        """
+        Test that the requested frame is decoded, wherever it is read from.
+        """
+        for frame in (0, 7, 8, 25, 3):
+            self.assertFrame(self.pool.read(self.videos[0], frame, 30, SIZE), frame)
+
+    def test_nearby_frames_read_on(self):
+        """
+        Test that frames just ahead reuse the open decoder, while going
+        backwards (or far ahead) is a miss.
+        """
+        self.pool.read(self.videos[0], 2, 30, SIZE)
+        self.pool.read(self.videos[0], 3, 30, SIZE)
+        self.pool.read(self.videos[0], 5, 30, SIZE)
+        self.assertEqual((self.pool.hits, self.pool.misses), (2, 1))
+
+        self.pool.read(self.videos[0], 1, 30, SIZE)
+        if 6 + DECODER_MAX_SKIP < FRAMES: self.pool.read(self.videos[0], 6 + DECODER_MAX_SKIP, 30, SIZE)
+        self.assertEqual(self.pool.stats()['open'], 1)
+        self.assertGreaterEqual(self.pool.misses, 2)
+
+    def test_least_recently_used_evicted(self):
+        """
+        Test that the pool keeps at most its size of decoders, closing the
+        least recently used, and that memory caps its size.
+        """
+        pool = DecoderPool(max_size=2)
+        try:
+            for path in (self.videos[0], self.videos[1], self.videos[0], self.videos[2]):
+                pool.read(path, 0, 30, SIZE)
+            self.assertEqual([key[0] for key in pool.readers], [self.videos[0], self.videos[2]])
+            self.assertEqual(pool.stats()['evictions'], 1)
+        finally:
+            pool.close()
+
+        self.assertEqual(DecoderPool(max_size=8, max_memory=3 * DECODER_MEMORY_ESTIMATE).max_size, 3)
+
+    def test_idle_decoders_closed(self):
+        """
+        Test that decoders idle past the timeout are closed on next use.
+        """
+        pool = DecoderPool(idle_timeout=0)
+        try:
+            pool.read(self.videos[0], 0, 30, SIZE)
+            reader = pool.readers[next(iter(pool.readers))]
+            pool.read(self.videos[1], 0, 30, SIZE)
+            self.assertIsNone(reader.process)
+            self.assertEqual(len(pool.readers), 1)
+        finally:
+            pool.close()
+
+    def test_past_end(self):
+        """
+        Test that reading past the end of a video raises a ValueError.
+        """
+        with self.assertRaises(ValueError):
+            self.pool.read(self.videos[0], FRAMES + 1, 30, SIZE)
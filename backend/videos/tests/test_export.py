@@ -0,0 +1,297 @@
+from rest_framework.test import APIClient, APITestCase
+from django.http import FileResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from io import BytesIO
+import os
+import shutil
+import tempfile
+import zipfile
+
+from ..api.jobs import submit_unique_job
+from ..constants import MANIFEST_HISTORY, NUM_BRICKS, VID_EXTENSION
+from ..export import ExportEntry, ZipStream, artifact_path, build_artifact, cached_artifact, evict_artifacts
+from ..layout import wall_locations
+from ..models import Show, Video, Location, Job, ExportManifest
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+
+
+class SmallZip64Stream(ZipStream):
+    """A ZipStream switching to ZIP64 fields at tiny sizes, to exercise them."""
+    ZIP64_LIMIT = 100
+    ZIP64_COUNT_LIMIT = 2
+
+
+class ZipStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.files = {'1.mp4': b'a' * 50, '2.mp4': os.urandom(300), '3.mp4': b''}
+        self.entries = []
+        for name, data in self.files.items():
+            path = os.path.join(self.dir, name)
+            with open(path, 'wb') as file: file.write(data)
+            self.entries.append(ExportEntry.from_path(name, path))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def check_zip(self, stream: ZipStream):
+        """Asserts `stream` is a valid ZIP of the test files, of its stated size."""
+        data = b''.join(stream)
+        self.assertEqual(len(data), len(stream))
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), list(self.files))
+            for name, contents in self.files.items():
+                self.assertEqual(archive.read(name), contents)
+                self.assertEqual(archive.getinfo(name).compress_type, zipfile.ZIP_STORED)
+
+    def test_stream_is_valid_zip(self):
+        """
+        Test that the streamed ZIP is readable, in chunks no larger than asked.
+        """
+        stream = ZipStream(self.entries, chunk_size=64)
+        self.assertLessEqual(max(map(len, ZipStream(self.entries[1:2], chunk_size=64))), 64)
+        self.check_zip(stream)
+
+    def test_zip64_records(self):
+        """
+        Test that ZIP64 sizes, offsets and end records are written correctly.
+        """
+        self.check_zip(SmallZip64Stream(self.entries, chunk_size=64))
+
+    def test_file_changed_while_streaming(self):
+        """
+        Test that a file shrinking after the size was given aborts the stream.
+        """
+        stream = ZipStream(self.entries)
+        with open(self.entries[1].path, 'wb') as file: file.write(b'short')
+        with self.assertRaises(IOError):
+            b''.join(stream)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DownloadAllVideosTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", artist="Test Artist", frame_count=5)
+
+    def tearDown(self):
+        self.show.delete()
+
+    def test_download_streams_every_location(self):
+        """
+        Test that the download is a streamed ZIP of a video per location, with
+        the blank video for empty ones, and an exact Content-Length.
+        """
+        os.makedirs(self.show.videos_path())
+        video_path = os.path.join(self.show.videos_path(), 'clip.mp4')
+        with open(video_path, 'wb') as file: file.write(b'video' * 100)
+        video = Video.objects.create(show=self.show, title="Clip", file=os.path.relpath(video_path, MEDIA_ROOT))
+        Location.objects.filter(show=self.show, location_number=7).update(video=video)
+
+        response = self.client.get(reverse('show-download-all-videos', kwargs={'pk': self.show.id}))
+        self.assertTrue(response.streaming)
+        data = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(data))
+
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            self.assertEqual(len(archive.namelist()), NUM_BRICKS)
+            self.assertEqual(archive.read(f'7.{VID_EXTENSION}'), b'video' * 100)
+            with open(self.show.blank_vid_path(), 'rb') as blank:
+                self.assertEqual(archive.read(f'1.{VID_EXTENSION}'), blank.read())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportArtifactTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=5)
+
+    def tearDown(self):
+        self.show.delete()
+
+    def download(self):
+        return self.client.get(reverse('show-download-all-videos', kwargs={'pk': self.show.id}))
+
+    def test_artifact_served_until_wall_changes(self):
+        """
+        Test that a built export is sent as a file for its wall version only,
+        and that rebuilding replaces the older version's export.
+        """
+        self.assertIsNone(cached_artifact(self.show))
+        old_path = build_artifact(self.show)
+        response = self.download()
+        self.assertIsInstance(response, FileResponse)
+        with open(old_path, 'rb') as artifact:
+            self.assertEqual(b''.join(response.streaming_content), artifact.read())
+
+        location = Location.objects.get(show=self.show, location_number=1)
+        location.save()
+        self.show.refresh_from_db()
+        self.assertIsNone(cached_artifact(self.show))
+        self.assertNotIsInstance(self.download(), FileResponse)
+
+        new_path = build_artifact(self.show)
+        self.assertEqual(new_path, artifact_path(self.show))
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_eviction_within_budget(self):
+        """
+        Test that least recently used exports are evicted past the disk budget,
+        but never the one being kept (even if it no longer exists).
+        """
+        other = Show.objects.create(title="Other Show", artist="Test Artist", frame_count=5)
+        try:
+            old_path = build_artifact(other)
+            os.utime(old_path, (0, 0))
+            new_path = build_artifact(self.show)
+
+            evict_artifacts(budget=os.path.getsize(new_path), keep=new_path)
+            self.assertFalse(os.path.exists(old_path))
+            self.assertTrue(os.path.exists(new_path))
+
+            evict_artifacts(budget=0, keep=new_path)
+            self.assertTrue(os.path.exists(new_path))
+
+            # An export to keep that has already gone doesn't stop eviction
+            evict_artifacts(budget=0, keep=old_path)
+            self.assertFalse(os.path.exists(new_path))
+        finally:
+            other.delete()
+
+    def test_approval_queues_export(self):
+        """
+        Test that approving a show queues one export job for its wall version.
+        """
+        url = reverse('show-detail', kwargs={'pk': self.show.id})
+        with self.captureOnCommitCallbacks():
+            self.client.patch(url, {'status': Show.ShowStatus.APPROVED}, format='json')
+            self.client.patch(url, {'title': "Renamed"}, format='json')
+        self.show.refresh_from_db()
+
+        jobs = Job.objects.filter(show=self.show, kind=Job.JobKind.EXPORT)
+        self.assertEqual(jobs.count(), 1)
+        self.assertEqual(jobs.get().params, {'version': self.show.wall_version})
+
+        # Identical jobs aren't queued twice
+        with self.captureOnCommitCallbacks():
+            job = submit_unique_job(Job.JobKind.EXPORT, self.show, {'version': self.show.wall_version})
+        self.assertEqual(job, jobs.get())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportManifestTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=5)
+
+    def tearDown(self):
+        self.show.delete()
+
+    def get_manifest(self, changes_since=None):
+        if changes_since is None:
+            return self.client.get(reverse('show-manifest', kwargs={'pk': self.show.id}))
+        return self.client.get(reverse('show-manifest-changes', kwargs={'pk': self.show.id}), {'since': changes_since})
+
+    def test_manifest_lists_every_location(self):
+        """
+        Test that the manifest has an entry per location, with empty ones all
+        referring to the one shared blank.
+        """
+        data = self.get_manifest().json()
+        self.assertEqual(len(data['locations']), NUM_BRICKS)
+        self.assertTrue(all(entry['blank'] for entry in data['locations']))
+        self.assertEqual({entry['hash'] for entry in data['locations']}, {data['blank']['hash']})
+        self.assertEqual({entry['url'] for entry in data['locations']}, {data['blank']['url']})
+
+    def test_changes_since_version(self):
+        """
+        Test that only locations whose contents changed since a fetched
+        manifest version are returned, and that unknown versions are refused.
+        """
+        old_version = self.get_manifest().json()['version']
+        self.assertEqual(self.get_manifest(changes_since=old_version).json()['locations'], [])
+
+        os.makedirs(self.show.videos_path(), exist_ok=True)
+        video_path = os.path.join(self.show.videos_path(), 'clip.mp4')
+        with open(video_path, 'wb') as file: file.write(b'video' * 100)
+        video = Video.objects.create(show=self.show, title="Clip", file=os.path.relpath(video_path, MEDIA_ROOT))
+        location = Location.objects.get(show=self.show, location_number=12)
+        location.video = video
+        location.save()
+
+        data = self.get_manifest(changes_since=old_version).json()
+        self.assertEqual(data['since'], old_version)
+        self.assertGreater(data['version'], old_version)
+        self.assertEqual([entry['location_number'] for entry in data['locations']], [12])
+        self.assertEqual(data['locations'][0]['size'], 500)
+        self.assertFalse(data['locations'][0]['blank'])
+
+        # The version handed out with the changes can be asked for in turn
+        self.assertEqual(self.get_manifest(changes_since=data['version']).json()['locations'], [])
+        self.assertEqual(self.get_manifest(changes_since=old_version + 1000).status_code, 410)
+
+    def test_manifest_recorded_once_per_version(self):
+        """
+        Test that each wall version's manifest is recorded once however often
+        it is fetched, and that only the latest MANIFEST_HISTORY are kept.
+        """
+        self.get_manifest()
+        self.get_manifest()
+        self.assertEqual(ExportManifest.objects.filter(show=self.show).count(), 1)
+
+        for _ in range(MANIFEST_HISTORY + 2):
+            Show.bump_wall_version(self.show.id)
+            self.get_manifest()
+        versions = ExportManifest.objects.filter(show=self.show).values_list('version', flat=True)
+        self.show.refresh_from_db()
+        self.assertEqual(sorted(versions), list(range(self.show.wall_version - MANIFEST_HISTORY + 1,
+                                                      self.show.wall_version + 1)))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PartialExportTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=5)
+
+    def tearDown(self):
+        self.show.delete()
+
+    def download_names(self, **params) -> list[str]:
+        response = self.client.get(reverse('show-download-all-videos', kwargs={'pk': self.show.id}), params)
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as archive:
+            return archive.namelist()
+
+    def test_wall_export(self):
+        """
+        Test that a wall's export holds just the locations on that wall.
+        """
+        names = self.download_names(wall='east')
+        self.assertEqual(len(names), len(wall_locations('east')))
+        self.assertEqual({int(name.split('.')[0]) for name in names}, set(wall_locations('east')))
+
+    def test_location_export(self):
+        """
+        Test that listed locations and ranges are exported, limited to a wall
+        if one is given too.
+        """
+        self.assertEqual(self.download_names(locations='3,10-12'), [f'{n}.{VID_EXTENSION}' for n in (3, 10, 11, 12)])
+        # Location 1 is on the west wall, 124 on the east
+        self.assertEqual(self.download_names(wall='east', locations='1,124'), [f'124.{VID_EXTENSION}'])
+
+    def test_invalid_selection(self):
+        """
+        Test that unknown walls and malformed or out of range locations are rejected.
+        """
+        url = reverse('show-download-all-videos', kwargs={'pk': self.show.id})
+        for params in ({'wall': 'north'}, {'locations': '0-3'}, {'locations': 'a'}, {'locations': f'{NUM_BRICKS + 1}'}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
@@ -0,0 +1,158 @@
+from django.test import SimpleTestCase
+from rest_framework.serializers import ValidationError
+
+import os
+import shutil
+import subprocess
+import tempfile
+
+from ..api.ingest import encode_ingest, is_still_image, plan_ingest, plan_segments, KEEP, COPY, ENCODE
+from ..constants import FRAME_RATE, RESOLUTION
+from ..media import MediaInfo
+
+def source(width=RESOLUTION[0], height=RESOLUTION[1], fps=FRAME_RATE, frames=90, codec='h264',
+           pix_fmt='yuv420p', has_b_frames=0) -> MediaInfo:
+    """Returns MediaInfo for a test source, conformant to the wall by default."""
+    return MediaInfo(width=width, height=height, fps=fps, frames=frames, codec=codec, pix_fmt=pix_fmt,
+                     bit_rate=None, size=0, content_hash='', has_b_frames=has_b_frames)
+
+
+class IngestPlanTests(SimpleTestCase):
+    def test_matching_source_is_kept(self):
+        """
+        Test that a conformant source of the right length isn't touched.
+        """
+        plan = plan_ingest(source(), 90, 0, 0)
+        self.assertEqual(plan.mode, KEEP)
+        self.assertIsNone(plan.trim_frames)
+        self.assertEqual(plan.pad_frames, 0)
+
+    def test_non_conformant_source_is_encoded(self):
+        """
+        Test that a source of the right length is still encoded if its codec,
+        pixel format or frame rate don't match the wall's.
+        """
+        for info in (source(codec='hevc'), source(pix_fmt='yuv444p'), source(fps=29.97)):
+            self.assertEqual(plan_ingest(info, 90, 0, 0).mode, ENCODE)
+
+    def test_conformant_long_source_is_copied(self):
+        """
+        Test that a conformant source without B-frames is trimmed by stream copy.
+        """
+        plan = plan_ingest(source(frames=100), 90, 0, 0)
+        self.assertEqual(plan.trim_frames, 90)
+        self.assertEqual(plan.mode, COPY)
+
+    def test_b_frames_force_encode_to_trim(self):
+        """
+        Test that a source with B-frames is re-encoded rather than trimmed by
+        stream copy, as cutting its tail could drop reordered frames.
+        """
+        plan = plan_ingest(source(frames=100, has_b_frames=2), 90, 0, 0)
+        self.assertEqual(plan.mode, ENCODE)
+
+    def test_remux_of_conformant_source_is_copied(self):
+        """
+        Test that a conformant source in another container is remuxed, and a
+        non-conformant one is encoded.
+        """
+        self.assertEqual(plan_ingest(source(), 90, 0, 0, remux=True).mode, COPY)
+        self.assertEqual(plan_ingest(source(codec='vp9'), 90, 0, 0, remux=True).mode, ENCODE)
+        self.assertEqual(plan_ingest(source(fps=29.97), 90, 0, 0, remux=True).mode, ENCODE)
+
+    def test_large_source_is_cropped(self):
+        """
+        Test that larger sources are cropped from the given coordinates.
+        """
+        plan = plan_ingest(source(width=1280, height=720, frames=100), 90, 10, 20)
+        self.assertEqual(plan.crop, (10, 20))
+        self.assertEqual(plan.trim_frames, 90)
+        self.assertEqual(plan.mode, ENCODE)
+
+    def test_short_source_is_padded(self):
+        """
+        Test that a source with too few frames is padded out to the show length.
+        """
+        plan = plan_ingest(source(frames=60), 90, 0, 0)
+        self.assertEqual(plan.pad_frames, 30)
+        self.assertEqual(plan.mode, ENCODE)
+
+    def test_image_is_encoded(self):
+        """
+        Test that images are always encoded, without trimming or padding.
+        """
+        plan = plan_ingest(source(width=1000, height=600, frames=0, codec='mjpeg'), 90, 0, 0, image=True)
+        self.assertEqual(plan.mode, ENCODE)
+        self.assertIsNone(plan.trim_frames)
+        self.assertEqual(plan.pad_frames, 0)
+
+    def test_small_source_rejected(self):
+        """
+        Test that sources smaller than the wall's resolution are rejected.
+        """
+        with self.assertRaises(ValidationError):
+            plan_ingest(source(width=640, height=360), 90, 0, 0)
+
+
+class GifIngestTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_gif_is_not_still_image(self):
+        """
+        Test that GIFs are ingested as animations whatever type they were sent
+        as, while other images are still images.
+        """
+        self.assertFalse(is_still_image('image/gif', 'gif'))
+        self.assertFalse(is_still_image('video/gif', 'gif'))
+        self.assertTrue(is_still_image('image/png', 'png'))
+        self.assertFalse(is_still_image('video/mp4', 'mp4'))
+
+    def test_gif_sent_as_image_is_encoded(self):
+        """
+        Test that a GIF sent as `image/gif` is encoded frame by frame from its
+        animation, rather than looped as a still image.
+        """
+        gif_path, out_path = os.path.join(self.dir, 'in.gif'), os.path.join(self.dir, 'out.mp4')
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+                        f'testsrc=s={RESOLUTION[0]}x{RESOLUTION[1]}:r={FRAME_RATE}', '-frames:v', '12', gif_path],
+                       check=True)
+        plan = plan_ingest(source(frames=12, codec='gif', pix_fmt='bgra'), 5, 0, 0,
+                           image=is_still_image('image/gif', 'gif'), remux=True)
+        encode_ingest(gif_path, out_path, plan)
+
+        decoded = subprocess.run(['ffmpeg', '-v', 'error', '-i', out_path, '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+                                 check=True, capture_output=True).stdout
+        frame_size = RESOLUTION[0] * RESOLUTION[1]
+        self.assertEqual(len(decoded), 5 * frame_size)
+        self.assertNotEqual(decoded[:frame_size], decoded[-frame_size:])
+
+
+class SegmentPlanTests(SimpleTestCase):
+    def test_segments_start_at_keyframes(self):
+        """
+        Test that segments are split at the keyframes nearest an even split,
+        and together cover exactly the show's frames.
+        """
+        plan = plan_ingest(source(frames=300), 290, 0, 0, remux=True)
+        keyframes = [(frame, frame / 30) for frame in range(0, 300, 30)]
+        segments = plan_segments(plan, keyframes, 4, min_frames=60)
+
+        self.assertEqual([s.start_frame for s in segments], [0, 60, 150, 210])
+        self.assertEqual(sum(s.frames for s in segments), 290)
+        self.assertEqual([s.last for s in segments], [False, False, False, True])
+        self.assertEqual(segments[2].start_time, 5.0)
+
+    def test_short_plan_is_one_segment(self):
+        """
+        Test that a plan too short to split, or a source without usable
+        keyframes, gives a single segment.
+        """
+        plan = plan_ingest(source(frames=100), 90, 0, 0)
+        self.assertEqual(len(plan_segments(plan, [(0, 0.0), (30, 1.0), (60, 2.0)], 4, min_frames=60)), 1)
+
+        plan = plan_ingest(source(frames=600), 600, 0, 0)
+        self.assertEqual(len(plan_segments(plan, [(0, 0.0)], 4, min_frames=60)), 1)
@@ -0,0 +1,109 @@
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status as http_status
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from datetime import timedelta
+
+from ..api.cropfile import parse_progress
+from ..api.jobs import run_job, submit_unique_job
+from ..constants import JOB_STALE_AFTER
+from ..helpers import obj_exists
+from ..models import Show, Job
+
+
+class ProgressParsingTests(SimpleTestCase):
+    def test_frame_lines_give_percent(self):
+        """
+        Test that ffmpeg `-progress` frame lines are converted to percentages.
+        """
+        self.assertEqual(parse_progress("frame=45\n", 90), 50.0)
+        self.assertEqual(parse_progress("frame=0", 90), 0.0)
+
+    def test_percent_is_capped(self):
+        """
+        Test that encoding past the expected frame count never exceeds 100%.
+        """
+        self.assertEqual(parse_progress("frame=120", 90), 100.0)
+
+    def test_other_lines_ignored(self):
+        """
+        Test that non-frame progress lines (and missing totals) give None.
+        """
+        self.assertIsNone(parse_progress("fps=30.0", 90))
+        self.assertIsNone(parse_progress("progress=continue", 90))
+        self.assertIsNone(parse_progress("frame=N/A", 90))
+        self.assertIsNone(parse_progress("frame=10", 0))
+
+
+class JobTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", artist="Test Artist", frame_count=5)
+
+    def tearDown(self):
+        if obj_exists(self.show): self.show.delete()
+
+    def test_get_job_status(self):
+        """
+        Test that a job's status and progress can be polled.
+        """
+        job = Job.objects.create(kind=Job.JobKind.INGEST, show=self.show, progress=40,
+                                 status=Job.JobStatus.RUNNING)
+        response = self.client.get(reverse('job-detail', kwargs={'pk': job.id}))
+
+        self.assertEqual(response.status_code, http_status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['status'], Job.JobStatus.RUNNING)
+        self.assertEqual(data['progress'], 40)
+        self.assertIsNone(data['video'])
+
+    def test_failed_job_records_error(self):
+        """
+        Test that a job whose handler raises is marked failed with its error,
+        rather than raising out of the worker.
+        """
+        job = Job.objects.create(kind=Job.JobKind.INGEST, show=self.show)
+        created_at = job.updated_at
+        run_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.JobStatus.FAILED)
+        self.assertIn("no longer exists", job.error)
+        self.assertGreater(job.updated_at, created_at)
+
+    def test_set_progress_is_clamped(self):
+        """
+        Test that job progress is stored as a whole percentage within 0-100.
+        """
+        job = Job.objects.create(kind=Job.JobKind.INGEST, show=self.show)
+        created_at = job.updated_at
+        job.set_progress(57.8)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, 57)
+        self.assertGreater(job.updated_at, created_at)
+
+        job.set_progress(140)
+        job.refresh_from_db()
+        self.assertEqual(job.progress, 100)
+
+    def test_stale_jobs_do_not_block_new_ones(self):
+        """
+        Test that an identical job still queued or running is reused, unless
+        it hasn't been updated for JOB_STALE_AFTER, when it is marked failed
+        and a new job queued instead.
+        """
+        params = {'wall': 'west'}
+        job = Job.objects.create(kind=Job.JobKind.ATLAS, show=self.show, params=params,
+                                 status=Job.JobStatus.RUNNING)
+        self.assertEqual(submit_unique_job(Job.JobKind.ATLAS, self.show, params).id, job.id)
+
+        Job.objects.filter(pk=job.id).update(updated_at=timezone.now() - timedelta(seconds=JOB_STALE_AFTER + 1))
+        self.assertFalse(Job.live_jobs().filter(pk=job.id).exists())
+        new_job = submit_unique_job(Job.JobKind.ATLAS, self.show, params)
+        self.assertNotEqual(new_job.id, job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.JobStatus.FAILED)
+        self.assertIn("stopped responding", job.error)
@@ -0,0 +1,57 @@
+from django.test import SimpleTestCase
+
+import hashlib
+import os
+import tempfile
+
+from ..media import MediaInfo, hash_file, parse_rate
+from ..models import Video
+
+INFO = MediaInfo(width=854, height=480, fps=30.0, frames=150, codec='h264', pix_fmt='yuv420p',
+                 bit_rate=1000000, size=2048, content_hash='ab' * 32)
+
+
+class MediaInfoTests(SimpleTestCase):
+    def test_parse_rate(self):
+        """
+        Test that ffprobe frame rates are parsed, with undefined rates as 0.
+        """
+        self.assertEqual(parse_rate('30/1'), 30.0)
+        self.assertAlmostEqual(parse_rate('30000/1001'), 29.97, places=2)
+        self.assertEqual(parse_rate('0/0'), 0.0)
+        self.assertEqual(parse_rate(None), 0.0)
+
+    def test_duration(self):
+        """
+        Test that duration is derived from frame count and frame rate.
+        """
+        self.assertEqual(INFO.duration, 5.0)
+        self.assertEqual(INFO.resolution, (854, 480))
+
+    def test_dict_round_trip(self):
+        """
+        Test that MediaInfo survives conversion to a dict (as stored on jobs).
+        """
+        self.assertEqual(MediaInfo.from_dict(INFO.to_dict()), INFO)
+
+    def test_hash_file(self):
+        """
+        Test that files are hashed with sha256.
+        """
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b'brick' * 1000)
+        try:
+            self.assertEqual(hash_file(file.name), hashlib.sha256(b'brick' * 1000).hexdigest())
+        finally:
+            os.remove(file.name)
+
+    def test_video_stores_media_info(self):
+        """
+        Test that MediaInfo stored on a video can be read back unchanged, and
+        that unprocessed videos have none.
+        """
+        video = Video()
+        self.assertIsNone(video.media_info())
+
+        video.set_media_info(INFO)
+        self.assertEqual(video.media_info(), INFO)
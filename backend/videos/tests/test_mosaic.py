@@ -0,0 +1,99 @@
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status as http_status
+from django.test import override_settings
+from django.urls import reverse
+
+from PIL import Image
+from io import BytesIO
+import os
+import shutil
+import tempfile
+
+from ..constants import RESOLUTION, MOSAIC_BACKGROUND
+from ..layout import LAYOUT, wall_size
+from ..models import Show, Video, Location
+from ..sprites import install_sprites
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+SCALE = 0.05
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MosaicTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", artist="Test Artist", frame_count=5)
+        self.video = Video.objects.create(show=self.show, title="Red", file='red.mp4')
+
+        # A sprite sheet of solid red thumbnails
+        buffer = BytesIO()
+        Image.new('RGB', (RESOLUTION[0] // 2, RESOLUTION[1] // 2), (255, 0, 0)).save(buffer, format='JPEG')
+        os.makedirs(self.video.thumbnail_path())
+        tmp_path = os.path.join(self.video.thumbnail_path(), 'sheet.tmp')
+        with open(tmp_path, 'wb') as sheet: sheet.write(buffer.getvalue())
+        install_sprites(tmp_path, self.video.sprite_path())
+
+    def tearDown(self):
+        self.show.delete()
+
+    def get_mosaic(self, **params):
+        url = reverse('show-mosaic', kwargs={'pk': self.show.id})
+        return self.client.get(url, {'scale': SCALE, **params})
+
+    def cell(self, image: Image.Image, location_number: int) -> tuple:
+        """Returns the colour at the centre of a location's brick in `image`."""
+        position = LAYOUT[location_number]
+        width, height = image.width // wall_size('west')[1], image.height // wall_size('west')[0]
+        return image.getpixel((position.column * width + width // 2, position.row * height + height // 2))
+
+    def test_mosaic_layout(self):
+        """
+        Test that the mosaic lays bricks out in the wall's grid, with assigned
+        videos' thumbnails, blank empty locations and background between bricks.
+        """
+        Location.objects.filter(show=self.show, location_number=1).update(video=self.video)
+        response = self.get_mosaic(frame=2, wall='west')
+        self.assertEqual(response.status_code, http_status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        image = Image.open(BytesIO(response.content)).convert('RGB')
+        rows, columns = wall_size('west')
+        self.assertEqual(image.size, (columns * round(RESOLUTION[0] * SCALE), rows * round(RESOLUTION[1] * SCALE)))
+
+        red, blank = self.cell(image, 1), self.cell(image, 2)
+        self.assertGreater(red[0], 200)
+        self.assertLess(red[1], 50)
+        self.assertLess(max(blank), 30)
+        self.assertGreater(min(image.getpixel((2, 2))), min(MOSAIC_BACKGROUND) - 30)
+
+    def test_mosaic_cached_by_wall_version(self):
+        """
+        Test that mosaics are cached until the show's wall changes.
+        """
+        first = self.get_mosaic()
+        self.show.refresh_from_db()
+        self.assertEqual(len(os.listdir(os.path.join(self.show.mosaics_path(), str(self.show.wall_version)))), 1)
+
+        location = Location.objects.get(show=self.show, location_number=1)
+        location.video = self.video
+        location.save()
+        self.show.refresh_from_db()
+
+        second = self.get_mosaic()
+        self.assertNotEqual(first.content, second.content)
+        # Mosaics of the old version are dropped
+        self.assertEqual(os.listdir(self.show.mosaics_path()), [str(self.show.wall_version)])
+
+    def test_invalid_parameters(self):
+        """
+        Test that out of range frames, unknown walls and bad scales are rejected.
+        """
+        self.assertEqual(self.get_mosaic(frame=5).status_code, http_status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_mosaic(wall='north').status_code, http_status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_mosaic(scale=2).status_code, http_status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_mosaic(frame='a').status_code, http_status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,139 @@
+from rest_framework.test import APIClient, APITestCase
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+import ffmpeg
+
+import os
+import shutil
+import tempfile
+
+from ..constants import PREVIEW_WALL_GAP
+from ..layout import LAYOUT, wall_locations
+from ..models import Show, Video, Location, Job
+from ..preview import latest_preview, preview_layout, render_preview, tile_size
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+
+
+class PreviewLayoutTests(SimpleTestCase):
+    def test_walls_side_by_side(self):
+        """
+        Test that every brick has its own place in the preview, with the east
+        wall right of the west wall and the gap between them.
+        """
+        layout = preview_layout()
+        width, height = tile_size()
+        self.assertEqual((width % 2, height % 2), (0, 0))
+        self.assertEqual(set(layout['bricks']), set(LAYOUT))
+        self.assertEqual(len(set(layout['bricks'].values())), len(LAYOUT))
+        for x, y in layout['bricks'].values():
+            self.assertLessEqual(x + width, layout['width'])
+            self.assertLessEqual(y + height, layout['height'])
+
+        west_right = max(layout['bricks'][n][0] for n in wall_locations('west')) + width
+        east_left = min(layout['bricks'][n][0] for n in wall_locations('east'))
+        self.assertGreaterEqual(east_left - west_right, PREVIEW_WALL_GAP * width)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PreviewRenderTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=3)
+        self.url = reverse('show-preview', kwargs={'pk': self.show.id})
+
+    def tearDown(self):
+        self.show.delete()
+
+    def tiles(self) -> dict[str, int]:
+        """Returns the modification time of each cached preview tile."""
+        tiles_dir = os.path.join(self.show.previews_path(), 'tiles')
+        return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(tiles_dir) if entry.is_file()}
+
+    def add_video(self, location_number: int) -> Video:
+        """Assigns a copy of the blank video to `location_number`."""
+        os.makedirs(self.show.videos_path(), exist_ok=True)
+        path = os.path.join(self.show.videos_path(), 'clip.mp4')
+        shutil.copyfile(self.show.generate_blank_video(), path)
+        video = Video.objects.create(show=self.show, title="Clip", file=os.path.relpath(path, MEDIA_ROOT))
+        Location.objects.filter(show=self.show, location_number=location_number).update(video=video)
+        return video
+
+    def test_preview_rerenders_only_new_tiles(self):
+        """
+        Test that the preview is the layout's size with the show's frames, and
+        that moving a video re-renders the preview without its tiles.
+        """
+        video = self.add_video(5)
+        self.show.refresh_from_db()
+        path = render_preview(self.show)
+        layout = preview_layout()
+        frames, _ = ffmpeg.input(path).output('pipe:', f='rawvideo', pix_fmt='gray').run(capture_stdout=True, quiet=True)
+        self.assertEqual(len(frames), 3 * layout['width'] * layout['height'])
+        tiles = self.tiles()
+        self.assertEqual(len(tiles), 2)
+
+        Location.objects.filter(show=self.show, location_number=5).update(video=None)
+        Location.objects.get(show=self.show, location_number=200).save()
+        Location.objects.filter(show=self.show, location_number=200).update(video=video)
+        self.show.refresh_from_db()
+        new_path = render_preview(self.show)
+        self.assertEqual(self.tiles(), tiles)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(latest_preview(self.show), (new_path, self.show.wall_version))
+
+    def test_preview_served_in_ranges(self):
+        """
+        Test that previews are sent whole or by byte range, and that an
+        unsatisfiable or outdated range is handled.
+        """
+        path = render_preview(self.show)
+        with open(path, 'rb') as file: data = file.read()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), data)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(data)}')
+        self.assertEqual(b''.join(response.streaming_content), data[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(b''.join(response.streaming_content), data[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(data)}')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_stale_preview_served_while_queued(self):
+        """
+        Test that a missing preview is queued, and that the previous one is
+        sent meanwhile once there is one.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get(pk=response.data['id']).kind, Job.JobKind.PREVIEW)
+
+        render_preview(self.show)
+        old_version = self.show.wall_version
+        self.client.patch(reverse('show-location', kwargs={'pk': self.show.id, 'location_number': 1}),
+                          {'video': None}, format='json')
+        self.show.refresh_from_db()
+        self.assertTrue(Job.objects.filter(show=self.show, kind=Job.JobKind.PREVIEW,
+                                           params={'version': self.show.wall_version}).exists())
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response['X-Wall-Version']), old_version)
+        response.close()
@@ -0,0 +1,118 @@
+from rest_framework.test import APIClient, APITestCase
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+
+import shutil
+import tempfile
+
+from ..constants import NUM_BRICKS
+from ..models import Show, Video, Location
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ShowFieldsTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", frame_count=5)
+        self.video = Video.objects.create(show=self.show, title="Clip", file='clip.mp4')
+        Location.objects.filter(show=self.show, location_number=3).update(video=self.video)
+        self.url = reverse('show-detail', kwargs={'pk': self.show.id})
+
+    def tearDown(self):
+        self.show.delete()
+
+    def test_default_fields(self):
+        """
+        Test that shows are sent with their locations by default, but not the
+        compact wall.
+        """
+        data = self.client.get(self.url).data
+        self.assertEqual(len(data['locations']), NUM_BRICKS)
+        self.assertEqual(data['videos'], [self.video.id])
+        self.assertNotIn('wall', data)
+
+    def test_sparse_fields(self):
+        """
+        Test that only the fields asked for are sent, for lists and single
+        shows, and that the wall is a video id or null per location.
+        """
+        response = self.client.get(reverse('show-list'), {'fields': 'id,title'})
+        self.assertEqual([dict(show) for show in response.data], [{'id': self.show.id, 'title': "Test Show"}])
+
+        data = self.client.get(self.url, {'fields': 'id,wall'}).data
+        self.assertEqual(set(data), {'id', 'wall'})
+        self.assertEqual(len(data['wall']), NUM_BRICKS)
+        self.assertEqual(data['wall'][2], self.video.id)
+        self.assertEqual(data['wall'].count(None), NUM_BRICKS - 1)
+
+    def test_expand(self):
+        """
+        Test that expanding adds optional fields and sends videos in full, and
+        that unknown fields are rejected.
+        """
+        data = self.client.get(self.url, {'fields': 'id', 'expand': 'videos,wall'}).data
+        self.assertEqual(set(data), {'id', 'videos', 'wall'})
+        self.assertEqual(data['videos'][0]['title'], "Clip")
+        self.assertIn('locations', self.client.get(self.url, {'expand': 'wall'}).data)
+
+        self.assertEqual(self.client.get(self.url, {'fields': 'id,nope'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'expand': 'title'}).status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ShowQueryTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.shows = []
+
+    def tearDown(self):
+        for show in self.shows: show.delete()
+
+    def add_shows(self, count: int):
+        """Adds `count` shows, each with its own artist and a video placed."""
+        for _ in range(count):
+            artist = User.objects.create(username=f"artist{len(self.shows)}")
+            show = Show.objects.create(title=f"Show {len(self.shows)}", frame_count=5, artist=str(artist.id))
+            video = Video.objects.create(show=show, title="Clip", file='clip.mp4')
+            Location.objects.filter(show=show, location_number=1).update(video=video)
+            self.shows.append(show)
+
+    def test_list_in_constant_queries(self):
+        """
+        Test that listing shows takes the same queries however many there are,
+        with each artist's username.
+        """
+        self.add_shows(1)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('show-list'))
+        self.add_shows(3)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('show-list'))
+        self.assertEqual([show['artist_username'] for show in response.data], ['artist0', 'artist1', 'artist2', 'artist3'])
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('show-list'), {'fields': 'id,title,status'})
+
+    def test_artist_shows_in_constant_queries(self):
+        """
+        Test that an artist's shows take the same queries however many there
+        are.
+        """
+        self.add_shows(1)
+        artist = self.shows[0].artist
+        url = reverse('show-artist', kwargs={'artist': artist})
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        self.shows += [Show.objects.create(title="More", frame_count=5, artist=artist) for _ in range(2)]
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual({show['artist_username'] for show in response.data}, {'artist0'})
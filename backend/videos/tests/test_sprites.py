@@ -0,0 +1,135 @@
+from rest_framework.test import APIClient, APITestCase
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from PIL import Image
+from datetime import timedelta
+from io import BytesIO
+import os
+import shutil
+import subprocess
+import tempfile
+
+from ..constants import JOB_STALE_AFTER, RESOLUTION
+from ..models import Show, Video, Job
+from ..sprites import SpriteSheet, install_sprites, render_sprites, tile_count, tile_size
+
+def jpeg(shade: int) -> bytes:
+    """Returns a small JPEG filled with grey level `shade`."""
+    buffer = BytesIO()
+    Image.new('RGB', (16, 8), (shade,) * 3).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+MEDIA_ROOT = tempfile.mkdtemp() + '/'
+
+
+class SpriteSheetTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_tile_count(self):
+        """
+        Test that tiles are kept on every multiple of the stride, including
+        for segments starting part way through a video.
+        """
+        self.assertEqual(tile_count(10, stride=5), 2)
+        self.assertEqual(tile_count(11, stride=5), 3)
+        self.assertEqual(tile_count(5, stride=5, start_frame=3), 1)
+        self.assertEqual(sum(tile_count(n, 5, start) for start, n in [(0, 7), (7, 9), (16, 4)]), tile_count(20, 5))
+
+    def test_tiles_are_sliced_from_sheet(self):
+        """
+        Test that an installed sheet is indexed, and each frame is served the
+        nearest tile's JPEG unchanged.
+        """
+        tiles = [jpeg(shade) for shade in (0, 128, 255)]
+        tmp_path = os.path.join(self.dir, 'sheet.tmp')
+        with open(tmp_path, 'wb') as sheet: sheet.write(b''.join(tiles))
+        sheet_path = os.path.join(self.dir, 'sprite.mjpeg')
+        install_sprites(tmp_path, sheet_path, stride=5)
+
+        sprites = SpriteSheet(sheet_path)
+        self.assertEqual(len(sprites), 3)
+        self.assertEqual(sprites.tile(0), tiles[0])
+        self.assertEqual(sprites.tile(2), tiles[0])
+        self.assertEqual(sprites.tile(3), tiles[1])
+        self.assertEqual(sprites.tile(100), tiles[2])
+
+    def test_missing_sheet(self):
+        """
+        Test that opening a sheet that hasn't been made raises FileNotFoundError.
+        """
+        with self.assertRaises(FileNotFoundError):
+            SpriteSheet(os.path.join(self.dir, 'sprite.mjpeg'))
+
+    def test_render_sprites(self):
+        """
+        Test that rendering a video's sheet keeps a thumbnail-sized tile every
+        stride frames.
+        """
+        video_path = os.path.join(self.dir, 'video.mp4')
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'testsrc=s={RESOLUTION[0]}x{RESOLUTION[1]}:r=30',
+                        '-frames:v', '12', video_path], check=True)
+        sheet_path = os.path.join(self.dir, 'sprites', 'sprite.mjpeg')
+        render_sprites(video_path, sheet_path, 12)
+
+        sprites = SpriteSheet(sheet_path)
+        self.assertEqual(len(sprites), tile_count(12))
+        self.assertEqual(Image.open(BytesIO(sprites.tile(11))).size, tile_size())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FrameTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.show = Show.objects.create(title="Test Show", artist="Test Artist", frame_count=5)
+        self.video = Video.objects.create(show=self.show, title="Grey", file='grey.mp4', frame_count=5)
+        os.makedirs(self.video.thumbnail_path())
+        tmp_path = os.path.join(self.video.thumbnail_path(), 'sheet.tmp')
+        with open(tmp_path, 'wb') as sheet: sheet.write(jpeg(128))
+        install_sprites(tmp_path, self.video.sprite_path())
+        self.url = reverse('video-frame', kwargs={'pk': self.video.id})
+
+    def tearDown(self):
+        self.show.delete()
+
+    def test_frame_from_sprites(self):
+        """
+        Test that frames are served from the sprite sheet, and malformed or
+        out of range frame numbers are rejected.
+        """
+        response = self.client.get(self.url, {'frame': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, jpeg(128))
+
+        for frame in ('abc', '1.5', 5, -1):
+            self.assertEqual(self.client.get(self.url, {'frame': frame}).status_code, 400)
+
+    def test_no_frames_while_processing(self):
+        """
+        Test that frames aren't served while the video's ingest job is still
+        to finish, as they'd be taken from the unprocessed upload.
+        """
+        job = Job.objects.create(kind=Job.JobKind.INGEST, show=self.show, video=self.video)
+        self.assertEqual(self.client.get(self.url, {'frame': 0}).status_code, 409)
+        Job.objects.filter(pk=job.pk).update(status=Job.JobStatus.DONE)
+        self.assertEqual(self.client.get(self.url, {'frame': 0}).status_code, 200)
+
+    def test_frames_despite_stale_job(self):
+        """
+        Test that an ingest job left running by a dead worker (see
+        JOB_STALE_AFTER) doesn't stop the video's frames being served.
+        """
+        Job.objects.create(kind=Job.JobKind.INGEST, show=self.show, video=self.video, status=Job.JobStatus.RUNNING)
+        self.assertEqual(self.client.get(self.url, {'frame': 0}).status_code, 409)
+        Job.objects.filter(video=self.video).update(updated_at=timezone.now() - timedelta(seconds=JOB_STALE_AFTER + 1))
+        self.assertEqual(self.client.get(self.url, {'frame': 0}).status_code, 200)
@@ -0,0 +1,94 @@
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, override_settings
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from ..uploadhandlers import StagingUploadHandler, container_matches, sniff_container, staging_path
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class ContainerSniffingTests(SimpleTestCase):
+    def test_known_containers(self):
+        """
+        Test that common upload formats are recognised from their first bytes.
+        """
+        self.assertEqual(sniff_container(b'\x00\x00\x00\x18ftypmp42'), 'mp4')
+        self.assertEqual(sniff_container(b'\x1a\x45\xdf\xa3\x01\x00'), 'matroska')
+        self.assertEqual(sniff_container(b'GIF89a\x10\x00'), 'gif')
+        self.assertEqual(sniff_container(b'RIFF\x00\x00\x00\x00AVI LIST'), 'avi')
+        self.assertEqual(sniff_container(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'webp')
+        self.assertEqual(sniff_container(b'\xff\xd8\xff\xe0\x00\x10JFIF'), 'jpeg')
+
+    def test_unknown_container(self):
+        """
+        Test that unrecognised bytes give no container.
+        """
+        self.assertIsNone(sniff_container(b'hello world, not a video'))
+        self.assertIsNone(sniff_container(b''))
+
+    def test_container_matches_type(self):
+        """
+        Test that still image containers must be sent as images and video
+        containers as videos, while GIFs may be sent as either.
+        """
+        self.assertTrue(container_matches('png', 'image/png'))
+        self.assertFalse(container_matches('png', 'video/mp4'))
+        self.assertTrue(container_matches('mp4', 'video/mp4'))
+        self.assertFalse(container_matches('mp4', 'image/png'))
+        self.assertTrue(container_matches('gif', 'image/gif'))
+        self.assertTrue(container_matches('gif', 'video/gif'))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class StagingUploadHandlerTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def stage(self, chunks: list[bytes]):
+        """Streams `chunks` through a StagingUploadHandler, returning the file."""
+        handler = StagingUploadHandler()
+        handler.new_file('file', 'clip.mp4', 'video/mp4', sum(map(len, chunks)))
+        start = 0
+        for chunk in chunks:
+            handler.receive_data_chunk(chunk, start)
+            start += len(chunk)
+        return handler.file_complete(start)
+
+    def test_upload_is_hashed_and_sniffed(self):
+        """
+        Test that the staged file holds the upload, hashed and sniffed as the
+        chunks arrived (including a header split across chunks).
+        """
+        chunks = [b'\x00\x00\x00', b'\x18ftypisom', b'x' * 5000]
+        file = self.stage(chunks)
+        data = b''.join(chunks)
+
+        self.assertEqual(file.size, len(data))
+        self.assertEqual(file.content_hash, hashlib.sha256(data).hexdigest())
+        self.assertEqual(file.container, 'mp4')
+        self.assertEqual(os.path.dirname(file.temporary_file_path()), staging_path())
+        with open(file.temporary_file_path(), 'rb') as staged:
+            self.assertEqual(staged.read(), data)
+        file.close()
+
+    def test_saving_moves_staged_file(self):
+        """
+        Test that saving a staged upload to storage renames it rather than
+        writing a copy.
+        """
+        file = self.stage([b'GIF89a' + b'y' * 100])
+        staged_path = file.temporary_file_path()
+        staged_inode = os.stat(staged_path).st_ino
+
+        storage = FileSystemStorage(location=MEDIA_ROOT)
+        saved_path = storage.path(storage.save('videos/clip.gif', file))
+        file.close()
+
+        self.assertFalse(os.path.exists(staged_path))
+        self.assertEqual(os.stat(saved_path).st_ino, staged_inode)
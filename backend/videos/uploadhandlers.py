@@ -0,0 +1,89 @@
+# videos/uploadhandlers.py
+# Upload handling for video files, streaming each upload to disk exactly once.
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+import hashlib
+import os
+import tempfile
+
+from .constants import UPLOAD_STAGING_PATH
+
+SNIFF_BYTES = 16    # Leading bytes of an upload kept to identify its container
+
+# Container formats recognised from their leading bytes, as (offset, magic bytes, name)
+CONTAINER_SIGNATURES = [
+    (4, b'ftyp', 'mp4'),            # MP4 / MOV / M4V (ISO base media)
+    (0, b'\x1a\x45\xdf\xa3', 'matroska'),  # MKV / WebM
+    (0, b'GIF87a', 'gif'),
+    (0, b'GIF89a', 'gif'),
+    (0, b'OggS', 'ogg'),
+    (0, b'FLV', 'flv'),
+    (0, b'\x89PNG', 'png'),
+    (0, b'\xff\xd8\xff', 'jpeg'),
+    (0, b'BM', 'bmp'),
+]
+# Containers only ever holding still images
+IMAGE_CONTAINERS = {'png', 'jpeg', 'bmp', 'webp'}
+# Containers sent as either images or videos, so not checked against their type
+EITHER_CONTAINERS = {'gif'}
+
+def staging_path() -> str:
+    """Returns the directory uploads are staged in. It sits inside MEDIA_ROOT so
+    that staged files can be renamed, not copied, into place."""
+    return os.path.join(settings.MEDIA_ROOT, UPLOAD_STAGING_PATH)
+
+def sniff_container(header: bytes) -> str | None:
+    """Identifies the container format of a file from its leading bytes
+    `header`, returning None if it isn't recognised."""
+    # RIFF containers name their type at bytes 8-11
+    if header[:4] == b'RIFF':
+        return {b'AVI ': 'avi', b'WEBP': 'webp'}.get(header[8:12])
+    for offset, magic, name in CONTAINER_SIGNATURES:
+        if header[offset:offset + len(magic)] == magic: return name
+    return None
+
+def container_matches(container: str, content_type: str) -> bool:
+    """Returns whether a file of sniffed `container` may be uploaded as
+    `content_type`: still image containers only as images, GIFs as any type
+    and every other container only as a video."""
+    if container in EITHER_CONTAINERS: return True
+    return (container in IMAGE_CONTAINERS) == content_type.startswith('image/')
+
+
+class StagedUploadedFile(TemporaryUploadedFile):
+    """An upload streamed to its own file in the staging directory, with its
+    sha256 `content_hash` and sniffed `container` format (see sniff_container)."""
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        os.makedirs(staging_path(), exist_ok=True)
+        file = tempfile.NamedTemporaryFile(suffix=".upload" + ext, dir=staging_path())
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+        self.content_hash = ''
+        self.container = None
+
+
+class StagingUploadHandler(TemporaryFileUploadHandler):
+    """Streams each uploaded file once into a per-upload staging file, hashing
+    and sniffing it as the bytes arrive. Validation can then inspect the staged
+    file in place, and saving it moves it into storage by rename."""
+    def new_file(self, *args, **kwargs):
+        super(TemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+        self.file = StagedUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.digest = hashlib.sha256()
+        self.header = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file.write(raw_data)
+        self.digest.update(raw_data)
+        if len(self.header) < SNIFF_BYTES:
+            self.header += raw_data[:SNIFF_BYTES - len(self.header)]
+
+    def file_complete(self, file_size):
+        self.file.content_hash = self.digest.hexdigest()
+        self.file.container = sniff_container(self.header)
+        return super().file_complete(file_size)
@@ -16,7 +16,9 @@ function ArtistAssignPage() {
     useEffect(() => {
         const fetchShows = async () => {
             try {
-                const response = await axios.get('api/shows/');
+                const response = await axios.get('api/shows/', {
+                    params: { fields: 'id,title,start_date,end_date,frame_count,artist,artist_username' }
+                });
                 const showData = response.data;
                 setShows(showData);
             } catch (error) {
@@ -36,11 +36,17 @@ const HistoryItem = ({ history }) => {
     );
 };
 
-// Fetch brick status history
+// Fetch brick status history, following the pages through to the end
 const fetchBrickHistory = async (brickId) => {
     try {
-        const response = await axios.get(`api/bricks/${brickId}/history/`);
-        return response.data;
+        let history = [];
+        let url = `api/bricks/${brickId}/history/`;
+        while (url) {
+            const response = await axios.get(url);
+            history = history.concat(response.data.results);
+            url = response.data.next;
+        }
+        return history;
     } catch (error) {
         console.error("Failed to fetch history:", error);
         return [];
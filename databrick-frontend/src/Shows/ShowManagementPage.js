@@ -8,6 +8,9 @@ import './ShowManagementPage.css';
 import { Input } from '../components/Input';
 import { AccessControlWrapper } from '../components/NoAccess';
 
+// Show fields the management list uses
+const SHOW_LIST_FIELDS = 'id,title,description,start_date,end_date,cover_image,artist,frame_count,status,artist_username';
+
 function ShowManagementPage() {
     const [showName, setShowName] = useState('');
     const [startDate, setStartDate] = useState('');
@@ -40,11 +43,13 @@ function ShowManagementPage() {
                     return
                 }
 
+                // Only fetch the fields the list shows, not every show's locations
+                const params = { fields: SHOW_LIST_FIELDS };
                 let response;
                 if (role === 'admin') {
-                    response = await axios.get(`api/shows/`);
+                    response = await axios.get(`api/shows/`, { params });
                 } else if (role === 'artist') {
-                    response = await axios.get(`api/shows/artist/${userId}/`);
+                    response = await axios.get(`api/shows/artist/${userId}/`, { params });
                 }
                 const showData = response.data;
                 setShows(showData);
@@ -2,12 +2,13 @@ import React, { useState, useEffect } from 'react';
 import axios from '../http';
 import axiosInstance from '../http';
 import PreviewWall from './PreviewWall';
+import { batchLocations } from './wallLocations';
 
 import { Button } from '../components/Button';
 import { Modal } from '../components/Modal';
 import './PreviewModal.css';
 
-const PreviewModal = ({ show, onClose, videos, locations, brokenBricks, setLocations, showId }) => {
+const PreviewModal = ({ show, onClose, videos, locations, brokenBricks, setLocations, wallVersion, setWallVersion, showId }) => {
     const [draggingVideo, setDraggingVideo] = useState(null);
     const [draggingSrc, setDraggingSrc] = useState(null);
     const [frameNumber, setFrameNumber] = useState(0);
@@ -55,105 +56,31 @@ const PreviewModal = ({ show, onClose, videos, locations, brokenBricks, setLocat
         setDraggingSrc(srcNumber);
     };
 
+    // Sends location edits as one request, applying just what they changed
+    const editLocations = (edits) => batchLocations(showId, wallVersion, edits, setLocations, setWallVersion);
+
     // update video locations when dropped
     const handleDrop = (destNumber) => {
-        // Function to update the video location
-        const updateLocationOnBackend = (locationNumber, updatedLocationData) => {
-            axios.patch(`api/shows/${showId}/locations/location_number=${locationNumber}/`, updatedLocationData, {
-                headers: {
-                    'Content-Type': 'multipart/form-data',
-                },
-            })
-                .then(response => {
-                    console.log('Video location updated:', response.data);
-                })
-                .catch(error => {
-                    console.error('Failed to update video location:', error);
-                });
-        };
-
         if (draggingVideo) {
 
-            if (destNumber < 0) {
-                resetModal();
-                return;
-            }
-
-            if (draggingSrc < 0) {
-                const destBrick = locations.find(location => location.location_number === destNumber)
-
-                if (!destBrick.video) {
-                    // Update the destination location with the dragged video
-                    setLocations(prevLocations =>
-                        prevLocations.map(location =>
-                            location.location_number === destNumber
-                                ? { ...location, video: draggingVideo.id } // Assign video to new location
-                                : location
-                        )
-                    );
-
-                    // Update the new location on the backend
-                    updateLocationOnBackend(destNumber, { video: draggingVideo.id });
-                }
-
+            if (destNumber < 0 || destNumber === draggingSrc) {
                 resetModal();
                 return;
             }
 
-            // Update the video's locations, considering the target wall
             const destBrick = locations.find(location => location.location_number === destNumber)
 
-            if (destBrick && destBrick.video) {
-                // Update the previous location by setting video to null
-                setLocations(prevLocations =>
-                    prevLocations.map(location =>
-                        location.location_number === draggingSrc
-                            ? { ...location, video: destBrick.video } // Clear previous video assignment
-                            : location
-                    )
-                );
-
-                // Update the previous location on the backend
-                updateLocationOnBackend(draggingSrc, { video: destBrick.video });
-
-                // Update the destination location with the dragged video
-                setLocations(prevLocations =>
-                    prevLocations.map(location =>
-                        location.location_number === destNumber
-                            ? { ...location, video: draggingVideo.id } // Assign video to new location
-                            : location
-                    )
-                );
-
-                // Update the new location on the backend
-                updateLocationOnBackend(destNumber, { video: draggingVideo.id });
-
-                return;
+            if (draggingSrc < 0) {
+                // Assign the dragged video to the destination, if it's empty
+                if (!destBrick.video) editLocations({ assign: [{ location: destNumber, video: draggingVideo.id }] });
+            }
+            else if (destBrick && destBrick.video) {
+                // Swap the videos of the two locations
+                editLocations({ swap: [[draggingSrc, destNumber]] });
             }
             else {
-                // Update the previous location by setting video to null
-                setLocations(prevLocations =>
-                    prevLocations.map(location =>
-                        location.location_number === draggingSrc
-                            ? { ...location, video: '' } // Clear previous video assignment
-                            : location
-                    )
-                );
-
-                // Update the previous location on the backend
-                updateLocationOnBackend(draggingSrc, { video: '' });
-
-                // Update the destination location with the dragged video
-                setLocations(prevLocations =>
-                    prevLocations.map(location =>
-                        location.location_number === destNumber
-                            ? { ...location, video: draggingVideo.id } // Assign video to new location
-                            : location
-                    )
-                );
-
-                // Update the new location on the backend
-                updateLocationOnBackend(destNumber, { video: draggingVideo.id });
+                // Move the video, leaving the previous location empty
+                editLocations({ move: [[draggingSrc, destNumber]] });
             }
 
             // Reset the dragging state
@@ -162,26 +89,7 @@ const PreviewModal = ({ show, onClose, videos, locations, brokenBricks, setLocat
     };
 
     const handleRemove = (brickNumber) => {
-        setLocations(prevLocations =>
-            prevLocations.map(location =>
-                location.location_number === brickNumber
-                    ? { ...location, video: null }
-                    : location
-            )
-        );
-
-        axios.patch(`api/shows/${showId}/locations/location_number=${brickNumber}/`, { video: '' }, {
-            headers: {
-                'Content-Type': 'multipart/form-data',
-            }
-        }
-        )
-            .then(response => {
-                console.log('Video location updated:', response.data);
-            })
-            .catch(error => {
-                console.error('Failed to update video location:', error);
-            });
+        editLocations({ clear: [brickNumber] });
     }
 
     if (!show) {
@@ -3,6 +3,7 @@ import axios from '../http';
 import VideoUploadModal from './VideoUploadModal';
 import VideoPlayerModal from './VideoPlayerModal';
 import PreviewModal from './PreviewModal';
+import { batchLocations, fetchWall } from './wallLocations';
 import { westWallBricks, eastWallBricks } from '../Constants';
 
 import { Button, DeleteButton } from '../components/Button'
@@ -73,7 +74,7 @@ const VideoItem = ({ video, index, handleSelectVideo, handleOpenVideo, handleDel
     );
 };
 
-const VideoList = ({ videos, setVideos, locations, setLocations, brokenBricks, showId, handleDragToWalls, editingControl = false }) => {
+const VideoList = ({ videos, setVideos, locations, setLocations, wallVersion, setWallVersion, brokenBricks, showId, handleDragToWalls, editingControl = false }) => {
     const [showVideoUploadModal, setShowVideoUploadModal] = useState(false);
     const [showPreviewModal, setShowPreviewModal] = useState(false);
     const [selectedVideoId, setSelectedVideoId] = useState(null);
@@ -112,8 +113,9 @@ const VideoList = ({ videos, setVideos, locations, setLocations, brokenBricks, s
             setSelectedVideosForAllocation(prevVideos => prevVideos.filter(selectedVideoId => selectedVideoId !== id));
 
             // Fetch updated locations from the backend
-            const response = await axios.get(`api/shows/${showId}/locations/`);
-            setLocations(response.data); // Update the locations state with the new data
+            const wall = await fetchWall(showId);
+            setLocations(wall.locations); // Update the locations state with the new data
+            setWallVersion(wall.version);
         } catch (error) {
             console.error("Error deleting video:", error);
         }
@@ -218,45 +220,15 @@ const VideoList = ({ videos, setVideos, locations, setLocations, brokenBricks, s
             });
         }
 
-        // Save the wall distribution
-        saveWallDistribution({
-            brickDistribution: newDistribution
-        }).then(() => {
-            axios.get(`api/shows/${showId}/locations/`)
-                .then(response => {
-                    setLocations(response.data);
-                    setIsRandomUpdated(true);
-                })
-                .catch(error => {
-                    console.error("Error fetching updated distribution:", error);
-                });
-        }).catch(error => {
-            console.error("Error saving wall distribution:", error);
-        });
+        // Save the wall distribution, applying just the locations it changed
+        const assign = Object.entries(newDistribution).map(([brick, video]) => ({ location: parseInt(brick), video }));
+        batchLocations(showId, wallVersion, { assign }, setLocations, setWallVersion)
+            .then(() => setIsRandomUpdated(true));
 
         // Clear selected videos after allocation
         setSelectedVideosForAllocation([]);
     };
 
-    const saveWallDistribution = async (wallData) => {
-        try {
-            console.log(wallData);
-            const formData = new FormData();
-            formData.append('brickDistribution', JSON.stringify(wallData.brickDistribution));
-
-            const response = await axios.post(`api/shows/${showId}/save_wall_distribution/`, wallData,
-                {
-                    headers: {
-                        'Content-Type': 'multipart/form-data'
-                    }
-                }
-            );
-            console.log('Wall distribution saved:', response.data);
-        } catch (error) {
-            console.error('Error saving wall distribution:', error);
-        }
-    };
-
     useEffect(() => {
         if (isRandomUpdated) {
             // setShowPreviewModal(true);
@@ -271,9 +243,10 @@ const VideoList = ({ videos, setVideos, locations, setLocations, brokenBricks, s
             axios.post(`api/shows/${showId}/clear_locations/`)
                 .then(response => {
                     // TODO: Update only the necessary locations here, as opposed to all of them!
-                    axios.get(`api/shows/${showId}/locations/`)
-                        .then(locationResponse => {
-                            setLocations(locationResponse.data);
+                    fetchWall(showId)
+                        .then(wall => {
+                            setLocations(wall.locations);
+                            setWallVersion(wall.version);
                         })
                         .catch(error => console.error('Error fetching locations:', error));
                     // setLocations(response.data.data);
@@ -334,6 +307,8 @@ const VideoList = ({ videos, setVideos, locations, setLocations, brokenBricks, s
                 locations={locations}
                 brokenBricks={brokenBricks}
                 setLocations={setLocations}
+                wallVersion={wallVersion}
+                setWallVersion={setWallVersion}
                 showId={showId}
             />
             {showAllocateModal && (
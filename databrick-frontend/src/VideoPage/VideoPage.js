@@ -6,12 +6,14 @@ import './VideoPage.css';
 import VideoList from './VideoList';
 import StatusList from '../BrickPage/StatusList';
 import WallContainer from './WallContainer';
+import { batchLocations } from './wallLocations';
 import { AccessControlWrapper } from '../components/NoAccess';
 
 const VideoPage = () => {
     const { showId } = useParams();
     const [videoList, setVideoList] = useState([]);
     const [videoLocations, setVideoLocations] = useState([]);
+    const [wallVersion, setWallVersion] = useState(null); // Wall version the locations are at
     const [brokenBricks, setBrokenBricks] = useState([]);
     const [statusList, setStatusList] = useState([]);
     const [draggingVideo, setDraggingVideo] = useState(null);
@@ -41,6 +43,7 @@ const VideoPage = () => {
 
                 setVideoList(videos);
                 setVideoLocations(locations);
+                setWallVersion(show.wall_version);
                 setShowTitle(show.title)
                 setShowStatus(show.status);
                 setBrokenBricks(bricks.length ? bricks.filter(brick => brick.statuses.length) : []);
@@ -65,21 +68,6 @@ const VideoPage = () => {
     const handleDrop = (destNumber) => {
         if (!editingControl) return;  // Disable dropping if editing is not allowed
 
-        // Function to update the video location
-        const updateLocationOnBackend = (locationNumber, updatedLocationData) => {
-            axios.patch(`api/shows/${showId}/locations/location_number=${locationNumber}/`, updatedLocationData, {
-                headers: {
-                    'Content-Type': 'multipart/form-data',
-                },
-            })
-                .then(response => {
-                    console.log('Video location updated:', response.data);
-                })
-                .catch(error => {
-                    console.error('Failed to update video location:', error);
-                });
-        };
-
         if (draggingVideo) {
 
             if (destNumber < 0) {
@@ -90,17 +78,9 @@ const VideoPage = () => {
             const destBrick = videoLocations.find(location => location.location_number === destNumber)
 
             if (!destBrick.video) {
-                // Update the destination location with the dragged video
-                setVideoLocations(prevLocations =>
-                    prevLocations.map(location =>
-                        location.location_number === destNumber
-                            ? { ...location, video: draggingVideo.id } // Assign video to new location
-                            : location
-                    )
-                );
-
-                // Update the new location on the backend
-                updateLocationOnBackend(destNumber, { video: draggingVideo.id });
+                // Assign the dragged video to the destination location
+                batchLocations(showId, wallVersion, { assign: [{ location: destNumber, video: draggingVideo.id }] },
+                    setVideoLocations, setWallVersion);
             }
 
             resetDragging();
@@ -149,6 +129,8 @@ const VideoPage = () => {
                         locations={videoLocations}
                         brokenBricks={brokenBricks}
                         setLocations={setVideoLocations}
+                        wallVersion={wallVersion}
+                        setWallVersion={setWallVersion}
                         showId={showId}
                         handleDropFromVideoList={handleDrop}
                         viewingStatus={viewingStatus}
@@ -171,6 +153,8 @@ const VideoPage = () => {
                                 setVideos={setVideoList}
                                 locations={videoLocations}
                                 setLocations={setVideoLocations}
+                                wallVersion={wallVersion}
+                                setWallVersion={setWallVersion}
                                 brokenBricks={brokenBricks}
                                 showId={showId}
                                 handleDragToWalls={handleDragStart}
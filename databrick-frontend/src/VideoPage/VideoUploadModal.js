@@ -7,6 +7,9 @@ import { Modal } from '../components/Modal';
 import { Button, DeleteButton } from '../components/Button';
 import './VideoUploadModal.css';
 
+// Milliseconds between checks on an upload's processing job
+const JOB_POLL_INTERVAL = 1000;
+
 const VideoUploadModal = ({ show, onClose, videos, setVideos, showId }) => {
     const fileInputRef = useRef(null);
     const [selectedFiles, setSelectedFiles] = useState([]);
@@ -14,6 +17,7 @@ const VideoUploadModal = ({ show, onClose, videos, setVideos, showId }) => {
     const [uploadStatus, setUploadStatus] = useState({});  // 'success', 'error', or null
     const [errorMessages, setErrorMessages] = useState({});      // Error message to display
     const [estimatedTimeLeft, setEstimatedTimeLeft] = useState({});
+    const [processingProgress, setProcessingProgress] = useState({});   // Percent processed by each upload's job
     const [isUploading, setIsUploading] = useState(false);
     const [constraints, setConstraints] = useState(null);
 
@@ -29,6 +33,7 @@ const VideoUploadModal = ({ show, onClose, videos, setVideos, showId }) => {
         setUploadStatus({});
         setErrorMessages({});
         setEstimatedTimeLeft({});
+        setProcessingProgress({});
         setCroppedFiles({});
         setFileCoordinates({});
         setIsUploading(false);
@@ -337,6 +342,21 @@ const VideoUploadModal = ({ show, onClose, videos, setVideos, showId }) => {
 
     };
 
+    // Polls the processing job of an upload until it finishes, tracking its
+    //  progress. Returns the processed video, or throws the job's error.
+    const waitForJob = async (fileName, job) => {
+        while (job.status !== 'done') {
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Processing failed.');
+            }
+            setProcessingProgress(prev => ({ ...prev, [fileName]: job.progress }));
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+            job = (await axios.get(`api/jobs/${job.id}/`)).data;
+        }
+        setProcessingProgress(prev => ({ ...prev, [fileName]: 100 }));
+        return job.video;
+    };
+
     const handleUpload = async () => {
         setIsUploading(true);
 
@@ -383,11 +403,10 @@ const VideoUploadModal = ({ show, onClose, videos, setVideos, showId }) => {
                     }
                 });
 
-                // Add the uploaded video to the video list
-                setVideos(prevVideos => [
-                    ...prevVideos,
-                    response.data, // Assuming response contains video details
-                ]);
+                // The video is processed in the background - only add it once done
+                setEstimatedTimeLeft(prev => ({ ...prev, [file.name]: 0 }));
+                const video = await waitForJob(file.name, response.data.job);
+                setVideos(prevVideos => [...prevVideos, video]);
                 setUploadStatus(prev => ({ ...prev, [file.name]: 'success' }));
             } catch (error) {
                 console.error("Error uploading file:", error);
@@ -515,7 +534,7 @@ const VideoUploadModal = ({ show, onClose, videos, setVideos, showId }) => {
                                 </div>
                                 <div className='feedback'>
                                     {''}
-                                    {uploadProgress[file.name] === 100 && !uploadStatus[file.name] && <p className="processing">Processing video...</p>}
+                                    {uploadProgress[file.name] === 100 && !uploadStatus[file.name] && <p className="processing">Processing video... {processingProgress[file.name] || 0}%</p>}
                                     {estimatedTimeLeft[file.name] > 0 && `Estimated time left: ${Math.round(estimatedTimeLeft[file.name])} seconds`}
                                     {uploadStatus[file.name] === 'success' && (<p className="success">Upload successful!</p>)}
                                     {uploadStatus[file.name] === 'error' && (<p className="error">Upload failed: {errorMessages[file.name]}</p>)}
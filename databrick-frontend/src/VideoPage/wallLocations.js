@@ -0,0 +1,39 @@
+import axios from '../http';
+
+// Fetches a show's locations, along with the wall version they are at
+export const fetchWall = async (showId) => {
+    const [locationResponse, showResponse] = await Promise.all([
+        axios.get(`api/shows/${showId}/locations/`),
+        axios.get(`api/shows/${showId}/`, { params: { fields: 'wall_version' } }),
+    ]);
+    return { locations: locationResponse.data, version: showResponse.data.wall_version };
+};
+
+// Replaces the locations in `locations` that are in `changed`
+const mergeLocations = (locations, changed) => {
+    const byNumber = new Map(changed.map(location => [location.location_number, location]));
+    return locations.map(location => byNumber.get(location.location_number) || location);
+};
+
+/*
+    Applies location edits (`assign`: [{ location, video }], `clear`: [location],
+    `swap` and `move`: [[location, location]]) in one request, made against wall
+    `version`. Only the changed locations are sent back, and applied locally. If
+    the wall was changed elsewhere since `version`, nothing is applied and the
+    whole wall is fetched again instead.
+*/
+export const batchLocations = async (showId, version, edits, setLocations, setVersion) => {
+    try {
+        const response = await axios.post(`api/shows/${showId}/locations/batch/`, { version, ...edits });
+        setLocations(prevLocations => mergeLocations(prevLocations, response.data.locations));
+        setVersion(response.data.version);
+    } catch (error) {
+        if (error.response && error.response.status === 409) {
+            const wall = await fetchWall(showId);
+            setLocations(wall.locations);
+            setVersion(wall.version);
+        } else {
+            console.error('Failed to update video locations:', error);
+        }
+    }
+};